@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+#
+# Benchmark the error measures, and compare with a baseline.
+#
+#
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import benchmarks
+
+
+if __name__ == '__main__':
+    base = os.path.basename(sys.argv[0])
+    args = sys.argv[1:]
+    if len(args) not in (3, 4):
+        print('Syntax: ' + base + ' <cell|all> <measure|all> <output>'
+              ' (baseline)')
+        print()
+        print('Measures: ' + ', '.join(benchmarks.measures))
+        print('Results are stored as JSON in <output>. If a baseline file is')
+        print('given, the results are compared to it, and the script exits')
+        print('with an error if any regression is found.')
+        sys.exit(1)
+
+    # Note: "all" does not include synthetic data.
+    cells = range(1, 10) if args[0] == 'all' else [
+        int(x) for x in args[0].split(',')]
+    measures = None if args[1] == 'all' else args[1].split(',')
+    for measure in measures or []:
+        if measure not in benchmarks.measures:
+            print('Unknown error measure: ' + measure)
+            sys.exit(1)
+
+    data = benchmarks.suite(cells, measures)
+    benchmarks.save(args[2], data)
+    print('Results written to ' + args[2])
+
+    if len(args) == 4:
+        problems = benchmarks.compare(data, benchmarks.load(args[3]))
+        if problems:
+            print()
+            print('REGRESSIONS FOUND (compared to ' + args[3] + '):')
+            for problem in problems:
+                print('  ' + problem)
+            sys.exit(1)
+        print('No regressions compared to ' + args[3])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+#
+# Benchmark short, seeded fits: how many evaluations (and how much time) it
+# takes to get within a given distance of the best known score.
+#
+#
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import benchmarks
+
+
+if __name__ == '__main__':
+    base = os.path.basename(sys.argv[0])
+    args = sys.argv[1:]
+    if len(args) not in (3, 4, 5):
+        print('Syntax: ' + base + ' <cell|default> <method> <output>'
+              ' (seeds=3) (transformation=a)')
+        print()
+        print('The default cells are ' + ', '.join(
+            [str(x) for x in benchmarks.fit_cells]) + '.')
+        print('Multiple methods can be given, e.g. 2,3,4. A transformation')
+        print('code sets the search and sample transformations, e.g. "a" or')
+        print('"nf". Results (including progress curves) are stored as JSON')
+        print('in <output>.')
+        sys.exit(1)
+
+    cell_list = benchmarks.fit_cells if args[0] == 'default' else [
+        int(x) for x in args[0].split(',')]
+    method_list = [int(x) for x in args[1].split(',')]
+    seeds = range(1, 1 + (int(args[3]) if len(args) > 3 else 3))
+    code = args[4] if len(args) > 4 else 'a'
+    if len(code) == 1:
+        code *= 2
+    search, sample = code
+
+    data = benchmarks.fit_suite(
+        cell_list, method_list, seeds, search_transformation=search,
+        sample_transformation=sample)
+    benchmarks.save(args[2], data)
+
+    # Show summary
+    print()
+    print('Cell | Method | Target | Reached | Evaluations | Time (s)')
+    for s in data['summary']:
+        print(' | '.join([
+            str(s['cell']).rjust(4),
+            str(s['method']).rjust(6),
+            str(s['target']).rjust(6),
+            (str(s['reached']) + '/' + str(s['fits'])).rjust(7),
+            ('' if s['evaluations'] is None else str(
+                int(s['evaluations']))).rjust(11),
+            ('' if s['time'] is None else '{:.1f}'.format(
+                s['time'])).rjust(8),
+        ]))
+    print()
+    print('Results written to ' + args[2])
@@ -3,13 +3,13 @@
 # Table: Best midpoints for all 9 cells, for all 4 methods.
 #
 from __future__ import division, print_function
+import math
 import os
 import sys
-import numpy as np
 
 # Load project modules
 sys.path.append(os.path.abspath(os.path.join('python')))
-import results
+import report
 
 # Parameter formatting string
 fmat = '{:<2.1f}'
@@ -23,8 +23,8 @@ for icell in range(10):
     for imethod in range(4):
         method = 1 + imethod
         head.append('Method ' + str(method))
-        parameters = results.load_parameters(cell, method)
-        a1, a2, a3, a4 = [np.log(x) for x in parameters[0:8:2]]
+        parameters = report.best_parameters(cell, method)
+        a1, a2, a3, a4 = [math.log(x) for x in parameters[0:8:2]]
         b1, b2, b3, b4 = parameters[1::2]
         body[0].append(fmat.format((a2 - a1) / (b1 + b2)))
         body[1].append(fmat.format((a4 - a3) / (b3 + b4)))
@@ -9,7 +9,7 @@ import sys
 
 # Load project modules
 sys.path.append(os.path.abspath(os.path.join('python')))
-import results
+import report
 
 # Parameter formatting string
 pfmat = '{:<1.5e}'
@@ -23,7 +23,7 @@ for icell in range(9):
     for imethod in range(4):
         method = 1 + imethod
         head.append('Method ' + str(method))
-        parameters = results.load_parameters(cell, method)
+        parameters = report.best_parameters(cell, method)
         for p, b in zip(parameters, body):
             b.append(pfmat.format(p))
     tables.append([head] + body)
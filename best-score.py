@@ -3,14 +3,12 @@
 # Count the number of fitting results available.
 #
 #
-import numpy as np
 import os
 import sys
 
 # Load project modules
 sys.path.append(os.path.abspath('python'))
-import results
-import transformations
+import report
 
 
 row_opts = [
@@ -56,9 +54,9 @@ for i, ropt in enumerate(row_opts):
 
     row = [name]
     for cell in cells:
-        fs = results.load_errors(cell, *ropt[1:])
-        if len(fs):
-            f0 = fmat.format(fs[0])
+        best = report.summary(cell, *ropt[1:])['best']
+        if best is not None:
+            f0 = fmat.format(best)
             # Remove extra 0
             #assert(f0[6] == '0')
             #f0 = f0[:6] + f0[7:]
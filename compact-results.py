@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+#
+# Move all finished runs into per-configuration archives.
+#
+#
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import results
+
+
+n = results.compact_all()
+print('Archived ' + str(n) + ' runs.')
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+#
+# Convert binary optimisation logs to CSV.
+#
+#
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import logs
+
+
+base = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+if len(args) < 1:
+    print('Syntax: ' + base + ' <log.bin> (log.bin ...)')
+    print()
+    print('Writes a CSV file, in the same format as the PINTS logs, next to')
+    print('each binary optimisation log (e.g. for use with external tools).')
+    sys.exit(1)
+
+for path in args:
+    if os.path.splitext(path)[1] != '.bin':
+        print('Not a binary log, skipping ' + path)
+        continue
+    csv = os.path.splitext(path)[0] + '.csv'
+    logs.save_csv(csv, logs.load(path))
+    print('Written ' + csv)
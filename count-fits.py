@@ -8,7 +8,7 @@ import sys
 
 # Load project modules
 sys.path.append(os.path.abspath('python'))
-import results
+import report
 
 
 row_opts = [
@@ -94,17 +94,17 @@ for ropt in row_opts:
             row.append('XX')
             continue
 
-        try:
-            parameters = results.load_parameters(
-                cell, method, search_transformation, sample_transformation,
-                start_from_m1, method_1b, True)
-        except FileNotFoundError:
-            row.append('0')
-            continue
         if method == 1 and not method_1b:
+            try:
+                report.best_parameters(cell, method)
+            except FileNotFoundError:
+                row.append('0')
+                continue
             row.append('1')
         else:
-            row.append(str(len(parameters)))
+            row.append(str(report.count(
+                cell, method, search_transformation, sample_transformation,
+                start_from_m1, method_1b)))
     rows.append(row)
 
 # Set column widths
@@ -84,9 +84,8 @@ for i, trans in enumerate([t0, t1, t2]):
 
     # Sample
     b = boundaries.Boundaries(t0, trans)
-    ps = np.array([b.sample() for i in range(50)])
-    for p in ps:
-        assert(b.check(p))
+    ps = b.sample(50)
+    assert(np.all(b.check_batch(ps)))
 
     # Join (p1, p5), (p2, p6), etc., discard conductances
     p1 = np.concatenate((ps[:, 0], ps[:, 4]))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+#
+# Check that the exact sampler for rate-constrained parameter pairs gives the
+# same distribution as the original rejection sampler.
+#
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import numpy as np
+import scipy.stats
+
+# Load project modules
+sys.path.append(os.path.abspath(os.path.join('..', '..', 'python')))
+import boundaries
+import transformations
+
+
+#
+# Check input arguments
+#
+base = os.path.splitext(os.path.basename(__file__))[0]
+args = sys.argv[1:]
+if len(args) > 1:
+    print('Syntax: ' + base + '.py (samples)')
+    print()
+    print('Draws (a, b) pairs with the exact and the rejection sampler, for')
+    print('each sample transformation and both rate voltages, and compares')
+    print('the marginals of a, b, and the rate with a two-sample')
+    print('Kolmogorov-Smirnov test.')
+    sys.exit(1)
+
+n = int(args[0]) if args else 100000
+np.random.seed(1)
+
+# Sample transformations, by code
+sample_transformations = [
+    transformations.ATransformation(),
+    transformations.NullTransformation(),
+    transformations.FullTransformation(),
+    transformations.KineticTransformation(),
+]
+search_transformation = transformations.NullTransformation()
+
+# Compare samplers
+print('Code | Voltage | Marginal | KS statistic | p-value')
+pmin, tests = 1, 0
+for t in sample_transformations:
+    b = boundaries.Boundaries(search_transformation, t)
+    for v in (b.vmax, -b.vmin):
+        a1, b1 = b._sample_partial(v, n)
+        a2, b2 = b._sample_partial_rejection(v, n)
+        marginals = [
+            ('a', a1, a2),
+            ('b', b1, b2),
+            ('rate', a1 * np.exp(b1 * v), a2 * np.exp(b2 * v)),
+        ]
+        for name, x1, x2 in marginals:
+            d, p = scipy.stats.ks_2samp(x1, x2)
+            pmin = min(pmin, p)
+            tests += 1
+            print(' | '.join([
+                t.code().rjust(4),
+                str(v).rjust(7),
+                name.rjust(8),
+                '{:.4f}'.format(d).rjust(12),
+                '{:.3g}'.format(p).rjust(7),
+            ]))
+
+print()
+print('Lowest p-value: ' + '{:.3g}'.format(pmin) + ' (over ' + str(tests)
+      + ' tests)')
@@ -3,7 +3,6 @@
 # Figure: Plot starting points on Method 2 surface
 #
 from __future__ import division, print_function
-import myokit
 import numpy as np
 import os
 import sys
@@ -17,6 +16,7 @@ from matplotlib.gridspec import GridSpecFromSubplotSpec as SubGridSpec
 sys.path.append(os.path.abspath(os.path.join('..', '..', 'python')))
 import boundaries
 import results
+import surfaces
 import transformations
 
 
@@ -127,26 +127,17 @@ filename1 = os.path.abspath(os.path.join('..', '..', 'surface', filename1))
 filename2 = os.path.abspath(os.path.join('..', '..', 'surface', filename2))
 for quad in [1, 2, 3, 4]:
     n = 256
-    fname = filename1 + str(quad) + '.csv'
-    if not os.path.exists(fname):
-        fname = filename2 + str(quad) + '.csv'
-        if not os.path.exists(fname):
+    fname = surfaces.find_map(filename1 + str(quad))
+    if fname is None:
+        fname = surfaces.find_map(filename2 + str(quad))
+        if fname is None:
             print('File not found: ')
-            print('  ' + fname)
+            print('  ' + filename2 + str(quad) + '.npz')
             continue
         n = 16
 
     print('Loading results from ' + fname)
-    d = myokit.DataLog.load_csv(fname).npview()
-
-    # Extract ps and qs and fs
-    ps = np.array([d['p' + str(1 + i)] for i in range(9)]).T
-    qs = np.copy(ps)
-    qs[:, 0] = np.log(qs[:, 0])
-    qs[:, 2] = np.log(qs[:, 2])
-    qs[:, 4] = np.log(qs[:, 4])
-    qs[:, 6] = np.log(qs[:, 6])
-    fs = d['f']
+    qs, fs = surfaces.load_points(fname)
 
     # Transform f for plotting
     gs = -np.log(np.abs(fs))
@@ -259,9 +250,8 @@ for row, tcode in enumerate('naf'):
     # Sample and plot
     trans = transformations.create(tcode)
     b = boundaries.Boundaries(t0, trans)
-    ps = np.array([b.sample() for i in range(100)])
-    for p in ps:
-        assert(b.check(p))
+    ps = b.sample(100)
+    assert(np.all(b.check_batch(ps)))
     kw = {
         'color': 'white',
         'alpha': 1,
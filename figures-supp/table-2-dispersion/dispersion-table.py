@@ -33,18 +33,15 @@ for cell in range(1, 11):
     for method in [2, 3, 4]:
         imethod = method - 1
 
-        # Get scores, parameters
-        rs, ps, es, ts, ns = results.load(cell, method)
-        if len(rs) == 0:
+        # Get parameters of best fits (within 1% of the best error)
+        ps = results.query(cell, method, columns='parameters', within=0.01)
+        if len(ps) == 0:
             row.append(0)
             row.append(0)
             row.append(0)
             continue
 
         # Get maximum error in parameters of best fits
-        i = es / es[0] - 1 < 0.01
-        es = es[i]
-        ps = ps[i]
         spread = 100 * np.max(np.abs(ps / ps[0] - 1))
 
         # Count how many results were also close in parameter space
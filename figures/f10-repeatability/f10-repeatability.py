@@ -69,23 +69,21 @@ for method in [2, 3, 4]:
     pclose = []
     for cell in 1 + np.arange(9):
 
-        # Get scores
-        rs, ps, es, ts, ns = results.load(cell, method)
-        if len(rs) == 0:
+        # Get number of results
+        n = results.count(cell, method)
+        if n == 0:
             eclose.append(0)
             pclose.append(0)
             continue
 
         # Count how many scores were within 1% of best
-        i = es / es[0] - 1 < 0.01
-        es = es[i]
-        ps = ps[i]
-        eclose.append(100 * len(es) / len(rs))
+        ps = results.query(cell, method, columns='parameters', within=0.01)
+        eclose.append(100 * len(ps) / n)
 
         # Count how many results were also close in parameter space
         ds = np.max(ps / ps[0] - 1, axis=1)
         ds = ds[ds < 0.01]
-        pclose.append(100 * len(ds) / len(rs))
+        pclose.append(100 * len(ds) / n)
 
     # Y-position for bar charts
     d = 1 / 11
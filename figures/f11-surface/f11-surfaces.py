@@ -3,7 +3,6 @@
 # Figure: Plot error surface in prior
 #
 from __future__ import division, print_function
-import myokit
 import numpy as np
 import os
 import sys
@@ -16,6 +15,7 @@ from matplotlib.gridspec import GridSpecFromSubplotSpec as SubGridSpec
 # Load project modules
 sys.path.append(os.path.abspath(os.path.join('..', '..', 'python')))
 import results
+import surfaces
 
 
 #
@@ -207,26 +207,17 @@ for row, method in enumerate(methods):
     for quad in [1, 2, 3, 4]:
 
         n = 256
-        fname = filename1 + str(quad) + '.csv'
-        if not os.path.exists(fname):
-            fname = filename2 + str(quad) + '.csv'
-            if not os.path.exists(fname):
+        fname = surfaces.find_map(filename1 + str(quad))
+        if fname is None:
+            fname = surfaces.find_map(filename2 + str(quad))
+            if fname is None:
                 print('File not found: ')
-                print('  ' + fname)
+                print('  ' + filename2 + str(quad) + '.npz')
                 continue
             n = 16
 
         print('Loading results from ' + fname)
-        d = myokit.DataLog.load_csv(fname).npview()
-
-        # Extract ps and qs and fs
-        ps = np.array([d['p' + str(1 + i)] for i in range(9)]).T
-        qs = np.copy(ps)
-        qs[:, 0] = np.log(qs[:, 0])
-        qs[:, 2] = np.log(qs[:, 2])
-        qs[:, 4] = np.log(qs[:, 4])
-        qs[:, 6] = np.log(qs[:, 6])
-        fs = d['f']
+        qs, fs = surfaces.load_points(fname)
 
         # Transform f for plotting
         gs = -np.log(np.abs(fs))
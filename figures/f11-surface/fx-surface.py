@@ -3,7 +3,6 @@
 # Figure: Plot error surface in prior
 #
 from __future__ import division, print_function
-import myokit
 import numpy as np
 import os
 import sys
@@ -16,6 +15,7 @@ from matplotlib.gridspec import GridSpecFromSubplotSpec as SubGridSpec
 # Load project modules
 sys.path.append(os.path.abspath(os.path.join('..', '..', 'python')))
 import results
+import surfaces
 
 
 #
@@ -179,24 +179,16 @@ else:
 axes = [ax0, ax1, ax2, ax3]
 for quad in [1, 2, 3, 4]:
 
-    fname = os.path.join('..', '..', 'surface', filename + '-' + str(quad))
-    fname = os.path.abspath(fname) + '.csv'
-    if not os.path.exists(fname):
+    root = os.path.join('..', '..', 'surface', filename + '-' + str(quad))
+    root = os.path.abspath(root)
+    fname = surfaces.find_map(root)
+    if fname is None:
         print('File not found: ')
-        print('  ' + fname)
+        print('  ' + root + '.npz')
         continue
 
     print('Loading results from ' + fname)
-    d = myokit.DataLog.load_csv(fname).npview()
-
-    # Extract ps and qs and fs
-    ps = np.array([d['p' + str(1 + i)] for i in range(9)]).T
-    qs = np.copy(ps)
-    qs[:, 0] = np.log(qs[:, 0])
-    qs[:, 2] = np.log(qs[:, 2])
-    qs[:, 4] = np.log(qs[:, 4])
-    qs[:, 6] = np.log(qs[:, 6])
-    fs = d['f']
+    qs, fs = surfaces.load_points(fname)
 
     # Transform f for plotting
     gs = -np.log(np.abs(fs))
@@ -3,14 +3,12 @@
 # Count the number of fitting results available.
 #
 #
-import numpy as np
 import os
 import sys
 
 # Load project modules
 sys.path.append(os.path.abspath('python'))
-import results
-import transformations
+import report
 
 
 row_opts = [
@@ -67,20 +65,19 @@ rows = [header]
 for i, ropt in enumerate(row_opts):
     name, method, search, sample, start_from_m1, method_1b = ropt
 
-    times = []
-    for cell in cells:
-        times.extend(
-            results.load_times(
-                cell, method, search, sample, start_from_m1, method_1b))
+    times = report.values(
+        cells, method, search, sample, start_from_m1, method_1b,
+        column='time')
 
     row = [name]
     if times:
-        row.append(format_time(np.mean(times)))
-        row.append(format_time(np.mean(times) * 50))
-        row.append(format_time(np.min(times)))
-        row.append(format_time(np.percentile(times, 10)))
-        row.append(format_time(np.percentile(times, 90)))
-        row.append(format_time(np.max(times)))
+        q = report.quantiles(
+            cells, method, search, sample, start_from_m1, method_1b,
+            column='time', q=[0, 0.1, 0.9, 1])
+        mean = sum(times) / len(times)
+        row.append(format_time(mean))
+        row.append(format_time(mean * 50))
+        row.extend([format_time(x) for x in q])
     else:
         row.extend([''] * 6)
     rows.append(row)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#
+# Show live metrics from running fits.
+#
+#
+import json
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import metrics
+
+
+base = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+if len(args) not in (1, 2):
+    print('Syntax: ' + base + ' <metrics directory> (port)')
+    print()
+    print('If a port is given, metrics are served as JSON on localhost.')
+    sys.exit(1)
+path = args[0]
+
+
+def table(runs):
+    """ Formats a list of run summaries as a table. """
+    def fmt(x, f='{:.4g}'):
+        return '' if x is None else f.format(x)
+
+    rows = [['Run', 'Host', 'Status', 'Iter.', 'Eval.', 'Eval/s', 'Best',
+             'Fail', 'T/out', 'Inf', 'Util.']]
+    for s in runs:
+        rows.append([
+            s['run'], s['host'], s['status'], fmt(s['iteration'], '{}'),
+            str(s['evaluations']), fmt(s['evaluations-per-second'], '{:.1f}'),
+            fmt(s['best']), str(s['failures']), str(s['timeouts']),
+            str(s['non-finite']), fmt(s['utilisation'], '{:.0%}'),
+        ])
+    widths = [max([len(row[i]) for row in rows]) for i in range(len(rows[0]))]
+    lines = []
+    for i, row in enumerate(rows):
+        lines.append(' | '.join(
+            [x + ' ' * (w - len(x)) for x, w in zip(row, widths)]))
+        if i == 0:
+            lines.append('-+-'.join(['-' * w for w in widths]))
+    return '\n'.join(lines)
+
+
+if len(args) == 1:
+    print(table(metrics.aggregate(path)))
+    sys.exit(0)
+
+# Serve as JSON
+import http.server
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        runs = metrics.aggregate(path)
+        if self.path.startswith('/text'):
+            body, kind = table(runs), 'text/plain'
+        else:
+            body, kind = json.dumps(runs, indent=1), 'application/json'
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', kind)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+port = int(args[1])
+print('Serving metrics from ' + path + ' on http://localhost:' + str(port))
+print('Use /text for a plain text table.')
+http.server.HTTPServer(('localhost', port), Handler).serve_forever()
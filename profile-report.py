@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+#
+# Show where time is spent in error evaluations, aggregated over all processes
+# that wrote a profile (run fits with FWOW_PROFILE=<directory> to profile).
+#
+#
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import profiling
+
+
+base = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+if len(args) not in (1, 2):
+    print('Syntax: ' + base + ' <profile directory> (collapsed stack file)')
+    print()
+    print('If a file name is given, the profile is also written in the')
+    print('collapsed stack format, e.g. for flamegraph.pl or speedscope.')
+    sys.exit(1)
+path = args[0]
+
+profile = profiling.aggregate(path)
+if not profile:
+    print('No profiles found in ' + path)
+    sys.exit(1)
+
+# Show sections as a tree, with time per call and fraction of top-level time
+roots = sum([t for stack, (n, t, own) in profile.items() if ';' not in stack])
+rows = [['Section', 'Calls', 'Total (s)', 'Self (s)', 'Per call (ms)', '%']]
+for stack in sorted(profile):
+    n, t, own = profile[stack]
+    depth = stack.count(';')
+    rows.append([
+        '  ' * depth + stack.rpartition(';')[2], str(n), '{:.3f}'.format(t),
+        '{:.3f}'.format(own), '{:.3f}'.format(1e3 * t / n),
+        '{:.1f}'.format(100 * t / roots) if roots else '',
+    ])
+widths = [max([len(row[i]) for row in rows]) for i in range(len(rows[0]))]
+for i, row in enumerate(rows):
+    print(' | '.join([row[0] + ' ' * (widths[0] - len(row[0]))] + [
+        ' ' * (w - len(x)) + x for x, w in zip(row[1:], widths[1:])]))
+    if i == 0:
+        print('-+-'.join(['-' * w for w in widths]))
+
+if len(args) == 2:
+    with open(args[1], 'w') as f:
+        for line in profiling.collapsed(profile):
+            f.write(line + '\n')
+    print('Collapsed stacks written to ' + args[1])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# Append-only archives of finished runs.
+#
+from __future__ import division, print_function
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Load project modules
+import logs
+
+
+# Archives start with a short header, followed by one record per run
+header = b'FWOWARC1'
+
+# Each record starts with a fixed-size part: a marker, the run index, the
+# error, time, and evaluations, the 9 parameters, and the number of log rows.
+# This is followed by the log rows (see logs.binary_record), and a CRC32 of
+# everything before it.
+record_start = struct.Struct('<4sqddq9dq')
+record_marker = b'RUN1'
+record_crc = struct.Struct('<I')
+
+
+class Record(object):
+    """
+    A finished run, as stored in an archive.
+
+    Has attributes ``run``, ``parameters``, ``error``, ``time``,
+    ``evaluations``, and ``log``, where ``log`` is a tuple ``(iterations,
+    evaluations, best, times)`` as returned by :meth:`logs.load()`.
+    """
+    def __init__(self, run, parameters, error, time, evaluations, log=None):
+        self.run = int(run)
+        self.parameters = np.array(parameters, dtype=float)
+        self.error = float(error)
+        self.time = float(time)
+        self.evaluations = int(evaluations)
+        if log is None:
+            log = ([], [], [], [])
+        self.log = (
+            np.asarray(log[0], dtype=int),
+            np.asarray(log[1], dtype=int),
+            np.asarray(log[2], dtype=float),
+            np.asarray(log[3], dtype=float),
+        )
+        if len(self.parameters) != 9:
+            raise ValueError('Expecting 9 parameters.')
+
+    def pack(self):
+        """ Returns this record's binary representation. """
+        rows = np.empty(len(self.log[0]), dtype=logs.binary_dtype)
+        for name, column in zip(logs.binary_dtype.names, self.log):
+            rows[name] = column
+        data = record_start.pack(
+            record_marker, self.run, self.error, self.time, self.evaluations,
+            *(list(self.parameters) + [len(rows)])) + rows.tobytes()
+        return data + record_crc.pack(zlib.crc32(data) & 0xffffffff)
+
+
+def append(path, records):
+    """
+    Appends the given ``records`` to the archive at ``path``, creating it if
+    necessary.
+
+    All records are written with a single call, after which the file is synced
+    to disk. If this is interrupted, :meth:`read()` ignores the incomplete
+    final record, and the next call to :meth:`append()` removes it before
+    writing (so that new records are not hidden behind it).
+    """
+    records = list(records)
+    if not records:
+        return
+    data = b''.join([record.pack() for record in records])
+
+    # Remove any incomplete or damaged records left by an interrupted write
+    size = os.path.getsize(path) if os.path.isfile(path) else 0
+    if 0 < size < len(header):
+        size = 0
+    elif size > 0:
+        size = _scan(path)[1]
+
+    with open(path, 'ab') as f:
+        f.truncate(size)
+        if size == 0:
+            data = header + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read(path):
+    """
+    Reads and returns a list of the :class:`Record` objects in the archive at
+    ``path``, in the order they were written.
+
+    Reading stops at the first incomplete or damaged record.
+    """
+    return _scan(path)[0]
+
+
+def _scan(path):
+    """
+    Reads the archive at ``path``, and returns a tuple ``(records, size)``
+    with all records up to the first incomplete or damaged record, and the
+    number of bytes these take up (including the header).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(header)] != header:
+        raise ValueError('Not a results archive: ' + path)
+
+    records = []
+    i = len(header)
+    while i + record_start.size <= len(data):
+        fields = record_start.unpack_from(data, i)
+        n = fields[-1]
+        j = i + record_start.size + n * logs.binary_dtype.itemsize
+        if fields[0] != record_marker or j + record_crc.size > len(data):
+            break
+        crc = record_crc.unpack_from(data, j)[0]
+        if crc != zlib.crc32(data[i:j]) & 0xffffffff:
+            print('Damaged record in ' + path + ', ignoring rest of file.')
+            break
+        rows = np.frombuffer(
+            data[i + record_start.size:j], dtype=logs.binary_dtype)
+        log = [rows[name] for name in logs.binary_dtype.names]
+        records.append(Record(
+            fields[1], fields[5:14], fields[2], fields[3], fields[4], log))
+        i = j + record_crc.size
+    return records, i
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+#
+# Benchmarks for the error measures, with comparison against a baseline, and
+# for short fits.
+#
+from __future__ import division, print_function
+import json
+import multiprocessing
+import platform
+import queue
+import resource
+import socket
+import sys
+import time
+import timeit
+
+import numpy as np
+import pints
+
+# Load project modules
+import boundaries
+import cells
+import errors
+import fitting
+import results
+import transformations
+
+
+# Error measures to benchmark, and the methods that use them
+measures = ['E1', 'E2', 'E3', 'E4', 'EAP']
+methods = {'E1': 1, 'E2': 2, 'E3': 3, 'E4': 4, 'EAP': 5}
+
+# Results that should go down for an improvement (throughput should go up)
+lower_is_better = [
+    'construction', 'latency-median', 'latency-p95', 'rss', 'rss-workers']
+
+# Cells to run fitting benchmarks on: synthetic data and a few real cells
+fit_cells = [10, 1, 5, 9]
+
+# Targets for fitting benchmarks, as multiples of the best known score
+fit_targets = [2, 1.1, 1.01, 1.001]
+
+
+def parameter_sets(measure, cell, n=10):
+    """
+    Returns a list of (up to) ``n`` parameter sets (in model space) to
+    benchmark an error ``measure`` for the given ``cell`` with.
+
+    The parameters are the best results stored for the method that uses the
+    measure, or for Method 4 if no such results are available.
+    """
+    method = methods[measure]
+    if method == 1:
+        try:
+            return [results.load_parameters(cell, 1)]
+        except (IOError, OSError):
+            method = 4
+    ps = results.query(cell, method, columns='parameters', top=n)
+    if len(ps) == 0 and method != 4:
+        ps = results.query(cell, 4, columns='parameters', top=n)
+    if len(ps) == 0:
+        raise ValueError(
+            'No stored results to benchmark ' + measure + ' for cell '
+            + str(cell) + '.')
+    return list(ps)
+
+
+def peak_rss(children=False):
+    """
+    Returns the peak resident set size of this process, in MB.
+
+    If ``children`` is set, the peak resident set size of the largest child
+    process that has finished (e.g. a worker process) is returned instead, or
+    0 if there are no such processes.
+    """
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    rss = resource.getrusage(who).ru_maxrss
+    # Reported in kilobytes on Linux, but in bytes on macOS
+    return rss / (1024**2 if sys.platform == 'darwin' else 1024)
+
+
+def run(measure, cell, n=10, repeats=5, workers=(1, ), batch=None):
+    """
+    Benchmarks the error ``measure`` (e.g. ``'E2'``) for a single ``cell``,
+    in the current process, and returns a dict with the results.
+
+    Arguments:
+
+    ``n``
+        The number of stored parameter sets to evaluate, see
+        :meth:`parameter_sets()`.
+    ``repeats``
+        The number of times each parameter set is evaluated to measure the
+        latency of a single evaluation.
+    ``workers``
+        A sequence of worker counts to measure the throughput with.
+    ``batch``
+        The number of evaluations per throughput measurement. Defaults to
+        four times the largest number of workers, or ``n``, whichever is
+        larger.
+
+    The returned dict contains the ``measure`` and ``cell``, the
+    ``construction`` time, the ``latency-median`` and ``latency-p95`` of
+    single evaluations, the ``throughput`` (evaluations per second) for each
+    worker count, the ``scores`` for each parameter set, the ``rss`` (peak
+    resident set size, in MB, of this process), and the ``rss-workers`` (the
+    peak resident set size of the largest worker process, or 0 if only a
+    single worker was used). All times are in seconds.
+    """
+    ps = parameter_sets(measure, cell, n)
+
+    # Construction
+    t0 = timeit.default_timer()
+    f = getattr(errors, measure)(cell)
+    construction = timeit.default_timer() - t0
+
+    # Latency of single evaluations
+    scores = []
+    latencies = []
+    with np.errstate(all='ignore'):
+        for p in ps:
+            for i in range(repeats):
+                t0 = timeit.default_timer()
+                s = f(p)
+                latencies.append(timeit.default_timer() - t0)
+            scores.append(float(s))
+
+    # Throughput with 1, 2, ..., N workers
+    workers = [int(w) for w in workers]
+    if batch is None:
+        batch = max(len(ps), 4 * max(workers))
+    xs = [ps[i % len(ps)] for i in range(batch)]
+    throughput = {}
+    for w in workers:
+        if w == 1:
+            e = pints.SequentialEvaluator(f)
+        else:
+            e = pints.ParallelEvaluator(f, n_workers=w)
+            e.evaluate(xs[:w])     # Start workers
+        t0 = timeit.default_timer()
+        e.evaluate(xs)
+        throughput[str(w)] = batch / (timeit.default_timer() - t0)
+        del e
+
+    return {
+        'measure': measure,
+        'cell': int(cell),
+        'construction': construction,
+        'latency-median': float(np.median(latencies)),
+        'latency-p95': float(np.percentile(latencies, 95)),
+        'throughput': throughput,
+        'scores': scores,
+        'rss': peak_rss(),
+        'rss-workers': peak_rss(children=True),
+    }
+
+
+def _run_child(q, args, kwargs):
+    """ Runs a benchmark in a child process, see :meth:`run_isolated()`. """
+    try:
+        q.put(run(*args, **kwargs))
+    except Exception as e:
+        q.put(e)
+
+
+def run_isolated(measure, cell, **kwargs):
+    """
+    Like :meth:`run()`, but runs the benchmark in a freshly started process,
+    so that the peak memory usage (and any caching) of one benchmark does not
+    affect the next.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    q = ctx.Queue()
+    p = ctx.Process(target=_run_child, args=(q, (measure, cell), kwargs))
+    p.start()
+    try:
+        while True:
+            try:
+                r = q.get(timeout=1)
+                break
+            except queue.Empty:
+                if not p.is_alive():
+                    raise RuntimeError(
+                        'Benchmark process stopped unexpectedly.')
+    finally:
+        p.join()
+    if isinstance(r, Exception):
+        raise r
+    return r
+
+
+def environment():
+    """ Returns a dict describing the machine and software versions. """
+    import myokit
+    return {
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': multiprocessing.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pints': pints.__version__,
+        'myokit': myokit.__version__,
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def default_workers():
+    """ Returns the worker counts 1, 2, 4, ..., up to the number of CPUs. """
+    n = multiprocessing.cpu_count()
+    workers = [1]
+    while workers[-1] * 2 < n:
+        workers.append(workers[-1] * 2)
+    if n > 1:
+        workers.append(n)
+    return workers
+
+
+def suite(cell_list, measure_list=None, workers=None, **kwargs):
+    """
+    Benchmarks each error measure in ``measure_list`` (default: all) for each
+    cell in ``cell_list``, each in a separate process, and returns a dict with
+    an ``environment`` description, a list of ``results``, and a list of
+    ``failures`` (dicts with the ``measure``, ``cell``, and ``error`` message
+    of each benchmark that failed).
+
+    Any further arguments are passed to :meth:`run()`.
+    """
+    measure_list = measures if measure_list is None else list(measure_list)
+    workers = default_workers() if workers is None else list(workers)
+    rs, failures = [], []
+    for measure in measure_list:
+        for cell in cell_list:
+            print('Benchmarking ' + measure + ' for cell ' + str(cell))
+            try:
+                r = run_isolated(measure, cell, workers=workers, **kwargs)
+            except Exception as e:
+                print('  Failed: ' + str(e))
+                failures.append(
+                    {'measure': measure, 'cell': int(cell), 'error': str(e)})
+                continue
+            print('  Latency ' + '{:.3g}'.format(1e3 * r['latency-median'])
+                  + ' ms, throughput ' + ', '.join([
+                      '{:.1f}'.format(t) + '/s (' + w + ')'
+                      for w, t in sorted(
+                          r['throughput'].items(), key=lambda x: int(x[0]))]))
+            rs.append(r)
+    return {'environment': environment(), 'results': rs, 'failures': failures}
+
+
+def save(path, data):
+    """ Stores benchmark results ``data`` as JSON at ``path``. """
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def load(path):
+    """ Loads benchmark results stored with :meth:`save()`. """
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare(current, baseline, tolerance=0.2, score_tolerance=1e-6):
+    """
+    Compares the benchmark results ``current`` to ``baseline`` and returns a
+    list of regressions (as strings).
+
+    A timing or memory result is a regression if it is worse than the baseline
+    by more than a fraction ``tolerance``. In addition, a change in any of the
+    scores by more than a relative ``score_tolerance`` is reported, as speed
+    improvements should not change results. Benchmarks that failed but are in
+    the baseline are reported too, while benchmarks that are not in the
+    baseline are ignored.
+    """
+    old = dict(((r['measure'], r['cell']), r) for r in baseline['results'])
+    problems = []
+    for r in current.get('failures', []):
+        if (r['measure'], r['cell']) in old:
+            problems.append(
+                r['measure'] + ' cell ' + str(r['cell']) + ': failed: '
+                + r['error'])
+    for r in current['results']:
+        b = old.get((r['measure'], r['cell']))
+        if b is None:
+            continue
+        name = r['measure'] + ' cell ' + str(r['cell']) + ': '
+
+        for key in lower_is_better:
+            if key not in b:
+                continue    # Baseline from an older version
+            if r[key] > b[key] * (1 + tolerance):
+                problems.append(
+                    name + key + ' increased from ' + '{:.4g}'.format(b[key])
+                    + ' to ' + '{:.4g}'.format(r[key]))
+        for w, t in sorted(r['throughput'].items()):
+            t0 = b['throughput'].get(w)
+            if t0 is not None and t * (1 + tolerance) < t0:
+                problems.append(
+                    name + 'throughput with ' + w + ' workers decreased from '
+                    + '{:.4g}'.format(t0) + ' to ' + '{:.4g}'.format(t))
+
+        if len(r['scores']) != len(b['scores']):
+            problems.append(name + 'different number of parameter sets')
+        elif not np.allclose(
+                r['scores'], b['scores'], rtol=score_tolerance, atol=0):
+            problems.append(name + 'scores changed')
+    return problems
+
+
+class _Curve(object):
+    """ Collects the rows logged by a :class:`fitting.LoggingCMAES`. """
+    def __init__(self):
+        self.evaluations = []
+        self.best = []
+        self.times = []
+
+    def log(self, iteration, evaluations, best, time):
+        self.evaluations.append(int(evaluations))
+        self.best.append(float(best))
+        self.times.append(float(time))
+
+
+def fit(cell, method, search_transformation='a', sample_transformation='a',
+        seed=1, max_iterations=300, targets=None, tolerance=None,
+        parallel=True):
+    """
+    Runs a short, seeded CMA-ES fit to ``cell`` with ``method``, as in
+    :meth:`fitting.fit()`, but without storing any results. Returns a dict
+    describing the fit's progress towards the best known score.
+
+    Arguments:
+
+    ``seed``
+        The seed for NumPy's random number generator, used to choose the
+        starting point and by CMA-ES.
+    ``max_iterations``
+        The maximum number of CMA-ES iterations.
+    ``targets``
+        A list of target scores, as multiples of the best known score for this
+        configuration (see :meth:`results.query()`). Defaults to
+        ``fit_targets``. The fit stops once the last target is reached.
+    ``tolerance``
+        An optional solver tolerance for numerically simulated protocols.
+    ``parallel``
+        Set to ``False`` to evaluate sequentially.
+
+    The returned dict contains the configuration, the ``reference`` (best
+    known) score (or ``None`` if there are no stored results), the final
+    ``best`` score, the number of ``evaluations``, the ``time`` taken, the
+    progress ``curve`` (lists of ``evaluations``, ``best``, and ``times``
+    after every iteration), and for each target its ``score`` and the
+    ``evaluations`` and ``time`` needed to reach it (or ``None`` if not
+    reached). Times are in seconds, and start when CMA-ES starts (choosing
+    the starting point is not included).
+    """
+    cell = int(cell)
+    method = int(method)
+    targets = sorted(fit_targets if targets is None else targets)[::-1]
+    method_1b = (method == 1)
+
+    # Best known score
+    reference = results.query(
+        cell, method, search_transformation, sample_transformation,
+        method_1b=method_1b, columns='error', top=1)
+    reference = float(reference[0]) if len(reference) else None
+
+    # Create error measure and boundaries as in fitting.fit()
+    search = transformations.create(search_transformation)
+    sample = transformations.create(sample_transformation)
+    g_fixed = None
+    if method == 1:
+        g_fixed = results.load_parameters(cell, 1)[-1]
+    bounds = boundaries.Boundaries(
+        search, sample, None if method == 1 else cells.lower_conductance(cell))
+    f = fitting.error_measure(cell, method, search, g_fixed)
+    if tolerance is not None and hasattr(f, 'set_tolerances'):
+        f.set_tolerances(tolerance)
+
+    # Choose a starting point
+    np.random.seed(seed)
+    q0 = f0 = float('inf')
+    with np.errstate(all='ignore'):
+        while not np.isfinite(f0):
+            q0 = bounds.sample()[0]
+            f0 = f(q0)
+
+    # Run
+    curve = _Curve()
+    opt = pints.OptimisationController(
+        f, q0, boundaries=bounds, method=fitting.LoggingCMAES)
+    opt.set_max_iterations(max_iterations)
+    opt.set_parallel(parallel)
+    opt.set_log_to_screen(False)
+    if reference is not None:
+        opt.set_threshold(reference * targets[-1])
+    opt.optimiser().set_log(curve)
+    with np.errstate(all='ignore'):
+        q, s = opt.run()
+
+    # Find first iteration to reach each target
+    reached = []
+    for target in targets:
+        r = {'target': target, 'score': None, 'evaluations': None,
+             'time': None}
+        if reference is not None:
+            r['score'] = reference * target
+            for e, b, t in zip(curve.evaluations, curve.best, curve.times):
+                if b <= r['score']:
+                    r['evaluations'] = e
+                    r['time'] = t
+                    break
+        reached.append(r)
+
+    return {
+        'cell': cell,
+        'method': method,
+        'search-transformation': search.code(),
+        'sample-transformation': sample.code(),
+        'seed': int(seed),
+        'tolerance': tolerance,
+        'reference': reference,
+        'best': float(s),
+        'evaluations': opt.evaluations(),
+        'time': opt.time(),
+        'curve': {
+            'evaluations': curve.evaluations,
+            'best': curve.best,
+            'times': curve.times,
+        },
+        'targets': reached,
+    }
+
+
+def fit_suite(cell_list, method_list, seeds=(1, 2, 3), **kwargs):
+    """
+    Runs a fitting benchmark (see :meth:`fit()`) for every combination of
+    cell, method, and seed, and returns a dict with an ``environment``
+    description, a list of ``fits``, and a ``summary`` (see
+    :meth:`summarise_fits()`).
+
+    Any further arguments are passed to :meth:`fit()`.
+    """
+    fits = []
+    for method in method_list:
+        for cell in cell_list:
+            for seed in seeds:
+                print('Fitting cell ' + str(cell) + ' with method '
+                      + str(method) + ', seed ' + str(seed))
+                r = fit(cell, method, seed=seed, **kwargs)
+                print('  Best ' + str(r['best']) + ' after '
+                      + str(r['evaluations']) + ' evaluations, '
+                      + '{:.1f}'.format(r['time']) + ' seconds')
+                fits.append(r)
+    return {
+        'environment': environment(),
+        'fits': fits,
+        'summary': summarise_fits(fits),
+    }
+
+
+def summarise_fits(fits):
+    """
+    Summarises a list of fitting benchmarks, per configuration and target.
+
+    Returns a list of dicts with the configuration (``cell``, ``method``,
+    transformations, and ``tolerance``), the ``target``, the number of
+    ``fits`` and the number of fits that ``reached`` the target, and the
+    median ``evaluations`` and ``time`` needed by the fits that reached it.
+    """
+    groups = {}
+    for r in fits:
+        key = (r['cell'], r['method'], r['search-transformation'],
+               r['sample-transformation'], r['tolerance'])
+        groups.setdefault(key, []).append(r)
+
+    summary = []
+    for key in sorted(groups, key=str):
+        rs = groups[key]
+        for i, target in enumerate(rs[0]['targets']):
+            hits = [r['targets'][i] for r in rs
+                    if r['targets'][i]['evaluations'] is not None]
+            summary.append({
+                'cell': key[0],
+                'method': key[1],
+                'search-transformation': key[2],
+                'sample-transformation': key[3],
+                'tolerance': key[4],
+                'target': target['target'],
+                'fits': len(rs),
+                'reached': len(hits),
+                'evaluations': float(np.median(
+                    [h['evaluations'] for h in hits])) if hits else None,
+                'time': float(np.median(
+                    [h['time'] for h in hits])) if hits else None,
+            })
+    return summary
@@ -94,128 +94,252 @@ class Boundaries(pints.Boundaries):
     def n_parameters(self):
         return 9 if self._conductance else 8
 
+    def widths(self):
+        """
+        Returns the width of the rectangular boundaries on each parameter,
+        measured in the transformed (search) space.
+        """
+        t = self._search_transformation
+        return np.abs(t.transform(self.upper) - t.transform(self.lower))
+
     def check(self, transformed_parameters):
+        return bool(self.check_batch(
+            np.reshape(transformed_parameters, (1, -1)))[0])
 
-        debug = False
+    def check_batch(self, transformed_parameters):
+        """
+        Checks a whole population of points at once.
 
+        Takes an array of shape ``(n, n_parameters)`` (in the transformed
+        space) and returns a boolean array of length ``n``, indicating which
+        points are within the boundaries.
+        """
         # Transform parameters back to model space
         parameters = self._search_transformation.detransform(
-            transformed_parameters)
+            np.atleast_2d(transformed_parameters))
 
         # Check parameter boundaries
-        if np.any(parameters < self.lower):
-            if debug:
-                print('Lower')
-            return False
-        if np.any(parameters > self.upper):
-            if debug:
-                print('Upper')
-            return False
+        ok = np.all(parameters >= self.lower, axis=1)
+        ok &= np.all(parameters <= self.upper, axis=1)
 
         # Check maximum rate constants
-        p1, p2, p3, p4, p5, p6, p7, p8 = parameters[:8]
-
-        # Check positive signed rates
-        r = p1 * np.exp(p2 * self.vmax)
-        if r < self.rmin or r > self.rmax:
-            if debug:
-                print('r1')
-            return False
-        r = p5 * np.exp(p6 * self.vmax)
-        if r < self.rmin or r > self.rmax:
-            if debug:
-                print('r2')
-            return False
-
-        # Check negative signed rates
-        r = p3 * np.exp(-p4 * self.vmin)
-        if r < self.rmin or r > self.rmax:
-            if debug:
-                print('r3')
-            return False
-        r = p7 * np.exp(-p8 * self.vmin)
-        if r < self.rmin or r > self.rmax:
-            if debug:
-                print('r4')
-            return False
-
-        return True
-
-    def _sample_partial(self, v):
+        with np.errstate(all='ignore'):
+            p1, p2, p3, p4, p5, p6, p7, p8 = parameters[:, :8].T
+            rates = (
+                # Positive signed rates
+                p1 * np.exp(p2 * self.vmax),
+                p5 * np.exp(p6 * self.vmax),
+                # Negative signed rates
+                p3 * np.exp(-p4 * self.vmin),
+                p7 * np.exp(-p8 * self.vmin),
+            )
+        for r in rates:
+            ok &= (r >= self.rmin) & (r <= self.rmax)
+
+        return ok
+
+    def _sample_partial(self, v, n):
         """
-        Sample a pair of parameters, uniformly in the a-transformed space, that
-        satisfy the maximum transition rate constraints.
+        Sample ``n`` pairs of parameters, uniformly in the space set by the
+        sample transformation, that satisfy the maximum transition rate
+        constraints.
+
+        Returns a tuple ``(a, b)`` of arrays of length ``n``.
+
+        Instead of rejection sampling, this draws the "a" coordinate ``x`` from
+        its exact marginal distribution, by inverting the cumulative area of
+        the feasible region, and then draws the "b" coordinate ``y`` uniformly
+        from the feasible interval at ``x``. The cost does not depend on the
+        size of the feasible region.
         """
-        if self._sample_transformation_code == 'a':
-            for i in range(100):
+        code = self._sample_transformation_code
+        if code not in ('a', 'n', 'f', 'k'):
+            raise ValueError(
+                'Unknown transformation code: '
+                + str(self._sample_transformation_code))
+
+        # Coordinates in sampling space: x for a, and y for b.
+        # For a given a, the rate constraint rmin <= a * exp(b * v) <= rmax
+        # becomes beta(x, L) <= b <= beta(x, U), with L = log(rmin) and
+        # U = log(rmax). Here beta(x, K) = (K - log(a)) / v decreases with x.
+        L, U = np.log(self.rmin), np.log(self.rmax)
+        log_x = code != 'n'
+        log_y = code in ('f', 'k')
+
+        def x_to_a(x):
+            return np.exp(x) if log_x else x
+
+        def a_to_x(a):
+            return np.log(a) if log_x else a
+
+        def y_to_b(y):
+            return np.exp(y) if log_y else y
+
+        def b_to_y(b):
+            return np.log(b) if log_y else b
+
+        def beta(x, K):
+            return (K - (x if log_x else np.log(x))) / v
+
+        def solve(K, b):
+            # The x for which beta(x, K) == b
+            return K - v * b if log_x else np.exp(K - v * b)
+
+        def integral(x, K):
+            # Antiderivative of b_to_y(beta(x, K)) with respect to x
+            if not log_x:
+                return x * (K + 1 - np.log(x)) / v
+            elif log_y:
+                return -(K - x) * (np.log((K - x) / v) - 1)
+            return (K * x - 0.5 * x**2) / v
+
+        # Bounds on y, and the x-range in which the feasible y-interval is
+        # non-empty
+        ylo, yhi = b_to_y(self.lower_beta), b_to_y(self.upper_beta)
+        xlo = max(a_to_x(self.lower_alpha), solve(L, self.upper_beta))
+        xhi = min(a_to_x(self.upper_alpha), solve(U, self.lower_beta))
+        if xlo >= xhi:
+            raise ValueError('Feasible region for rate constraint is empty.')
+
+        # Points at which the upper and lower limits on b stop being set by
+        # the rate constraints
+        xu = solve(U, self.upper_beta)
+        xl = solve(L, self.lower_beta)
+
+        def area(x):
+            # Area of the feasible region between xlo and x: the integral of
+            # the upper y-limit min(yhi, y(beta(x, U))), minus the integral of
+            # the lower y-limit max(ylo, y(beta(x, L))).
+            hi = (
+                yhi * np.maximum(0, np.minimum(x, xu) - xlo)
+                + integral(np.maximum(x, xu), U)
+                - integral(max(xlo, xu), U))
+            lo = (
+                integral(np.minimum(x, xl), L)
+                - integral(min(xlo, xl), L)
+                + ylo * np.maximum(0, x - max(xlo, xl)))
+            return hi - lo
+
+        # Invert the cumulative area by bisection. Each step halves the
+        # interval, so 64 steps give full double precision.
+        target = np.random.uniform(0, area(xhi), n)
+        x0 = np.ones(n) * xlo
+        x1 = np.ones(n) * xhi
+        for i in range(64):
+            x = 0.5 * (x0 + x1)
+            below = area(x) < target
+            x0 = np.where(below, x, x0)
+            x1 = np.where(below, x1, x)
+        x = 0.5 * (x0 + x1)
+
+        # Sample y uniformly within the feasible interval
+        y0 = b_to_y(np.maximum(self.lower_beta, beta(x, L)))
+        y1 = b_to_y(np.minimum(self.upper_beta, beta(x, U)))
+        y = np.random.uniform(y0, y1)
+
+        return x_to_a(x), y_to_b(y)
+
+    def _sample_partial_rejection(self, v, n):
+        """
+        Sample ``n`` pairs of parameters, uniformly in the space set by the
+        sample transformation, that satisfy the maximum transition rate
+        constraints.
+
+        This is the original rejection sampler, which gives the same
+        distribution as :meth:`_sample_partial()` but whose cost grows as the
+        feasible region gets thinner. It is kept as a reference to check the
+        exact sampler against, see ``figures-supp/s16-starting-points/
+        sx-boundaries-ks.py``.
+
+        Returns a tuple ``(a, b)`` of arrays of length ``n``.
+        """
+        code = self._sample_transformation_code
+        if code == 'a':
+            max_iterations = 100
+
+            def draw(m):
                 a = np.exp(np.random.uniform(
-                        np.log(self.lower_alpha), np.log(self.upper_alpha)))
-                b = np.random.uniform(self.lower_beta, self.upper_beta)
-                r = a * np.exp(b * v)
-                if r >= self.rmin and r <= self.rmax:
-                    return a, b
-            raise ValueError('Too many iterations')
-        elif self._sample_transformation_code == 'n':
-            for i in range(1000):
-                a = np.random.uniform(self.lower_alpha, self.upper_alpha)
-                b = np.random.uniform(self.lower_beta, self.upper_beta)
-                r = a * np.exp(b * v)
-                if r >= self.rmin and r <= self.rmax:
-                    return a, b
-            raise ValueError('Too many iterations')
-        elif self._sample_transformation_code in ['f', 'k']:
-            for i in range(100):
+                    np.log(self.lower_alpha), np.log(self.upper_alpha), m))
+                b = np.random.uniform(self.lower_beta, self.upper_beta, m)
+                return a, b
+
+        elif code == 'n':
+            max_iterations = 1000
+
+            def draw(m):
+                a = np.random.uniform(self.lower_alpha, self.upper_alpha, m)
+                b = np.random.uniform(self.lower_beta, self.upper_beta, m)
+                return a, b
+
+        elif code in ['f', 'k']:
+            max_iterations = 100
+
+            def draw(m):
                 a = np.exp(np.random.uniform(
-                        np.log(self.lower_alpha), np.log(self.upper_alpha)))
+                    np.log(self.lower_alpha), np.log(self.upper_alpha), m))
                 b = np.exp(np.random.uniform(
-                        np.log(self.lower_beta), np.log(self.upper_beta)))
-                r = a * np.exp(b * v)
-                if r >= self.rmin and r <= self.rmax:
-                    return a, b
-            raise ValueError('Too many iterations')
+                    np.log(self.lower_beta), np.log(self.upper_beta), m))
+                return a, b
+
         else:
             raise ValueError(
                 'Unknown transformation code: '
                 + str(self._sample_transformation_code))
 
-    def _sample_conductance(self):
+        # Rejection sampling, done in batches: each round redraws only the
+        # pairs that have not been accepted yet.
+        a = np.zeros(n)
+        b = np.zeros(n)
+        todo = np.arange(n)
+        for i in range(max_iterations):
+            ta, tb = draw(len(todo))
+            r = ta * np.exp(tb * v)
+            ok = (r >= self.rmin) & (r <= self.rmax)
+            a[todo[ok]] = ta[ok]
+            b[todo[ok]] = tb[ok]
+            todo = todo[~ok]
+            if len(todo) == 0:
+                return a, b
+        raise ValueError('Too many iterations')
+
+    def _sample_conductance(self, n):
         """
-        Samples a conductance.
+        Samples ``n`` conductances.
         """
         if self._sample_transformation_code in ['a', 'n', 'k']:
             return np.random.uniform(
-                self.lower_conductance, self.upper_conductance)
+                self.lower_conductance, self.upper_conductance, n)
         elif self._sample_transformation_code == 'f':
             return np.exp(np.random.uniform(
-                np.log(self.lower_conductance), np.log(self.upper_conductance)
-                ))
+                np.log(self.lower_conductance), np.log(self.upper_conductance),
+                n))
         else:
             raise ValueError(
                 'Unknown transformation code: '
                 + str(self._sample_transformation_code))
 
     def sample(self, n=1):
+        """
+        Returns ``n`` points sampled from within the boundaries, as an array of
+        shape ``(n, n_parameters)`` in the search space.
+        """
+        n = int(n)
+        if n < 1:
+            raise ValueError('Number of samples must be at least 1.')
 
-        if n > 1:
-            raise NotImplementedError
-
-        p = np.zeros(9 if self._conductance else 8)
+        p = np.zeros((n, self.n_parameters()))
 
         # Sample forward rates
-        p[0:2] = self._sample_partial(self.vmax)
-        p[4:6] = self._sample_partial(self.vmax)
+        p[:, 0], p[:, 1] = self._sample_partial(self.vmax, n)
+        p[:, 4], p[:, 5] = self._sample_partial(self.vmax, n)
 
         # Sample backward rates
-        p[2:4] = self._sample_partial(-self.vmin)
-        p[6:8] = self._sample_partial(-self.vmin)
+        p[:, 2], p[:, 3] = self._sample_partial(-self.vmin, n)
+        p[:, 6], p[:, 7] = self._sample_partial(-self.vmin, n)
 
         # Sample conductance
         if self._conductance:
-            p[8] = self._sample_conductance()
+            p[:, 8] = self._sample_conductance(n)
 
         # Transform from model to search space
-        p = self._search_transformation.transform(p)
-
-        # The Boundaries interface requires a matrix ``(n, n_parameters)``
-        p.reshape(1, 9 if self._conductance else 8)
-        return p
+        return self._search_transformation.transform(p)
@@ -51,20 +51,10 @@ def load(cell, protocol, cached=None, cap_filter=True):
         return cached
 
     # Get path to data file
-    trad = os.path.join(DATA, 'traditional-data')
-    data_files = {
-        1: os.path.join(trad, 'pr1-activation-kinetics-1-cell-' + str(cell)),
-        2: os.path.join(trad, 'pr2-activation-kinetics-2-cell-' + str(cell)),
-        3: os.path.join(trad, 'pr3-steady-activation-cell-' + str(cell)),
-        4: os.path.join(trad, 'pr4-inactivation-cell-' + str(cell)),
-        5: os.path.join(trad, 'pr5-deactivation-cell-' + str(cell)),
-        6: os.path.join(DATA, 'validation-data', 'ap-cell-' + str(cell)),
-        7: os.path.join(DATA, 'sine-wave-data', 'cell-' + str(cell)),
-    }
-    data_file = data_files[protocol]
+    data_file = data_path(cell, protocol)
 
     # Load protocol for capacitance filtering.
-    variant = protocol < 3 and (cell == 7 or cell == 8)
+    variant = protocol_variant(cell, protocol)
     if variant:
         print('Loading variant protocol for capacitance filtering')
     else:
@@ -104,6 +94,32 @@ def load(cell, protocol, cached=None, cap_filter=True):
     return log
 
 
+def data_path(cell, protocol):
+    """
+    Returns the path to the data file for the given cell and protocol, without
+    the extension (``.zip`` or ``.csv``).
+    """
+    trad = os.path.join(DATA, 'traditional-data')
+    data_files = {
+        1: os.path.join(trad, 'pr1-activation-kinetics-1-cell-' + str(cell)),
+        2: os.path.join(trad, 'pr2-activation-kinetics-2-cell-' + str(cell)),
+        3: os.path.join(trad, 'pr3-steady-activation-cell-' + str(cell)),
+        4: os.path.join(trad, 'pr4-inactivation-cell-' + str(cell)),
+        5: os.path.join(trad, 'pr5-deactivation-cell-' + str(cell)),
+        6: os.path.join(DATA, 'validation-data', 'ap-cell-' + str(cell)),
+        7: os.path.join(DATA, 'sine-wave-data', 'cell-' + str(cell)),
+    }
+    return data_files[protocol]
+
+
+def protocol_variant(cell, protocol):
+    """
+    Returns ``True`` if the data for the given cell and protocol was recorded
+    with a variant protocol (see :meth:`load_myokit_protocol()`).
+    """
+    return protocol < 3 and (cell == 7 or cell == 8)
+
+
 def save(cell, protocol, log):
     """
     Stores synthetic data for the given cell and protocol.
@@ -128,17 +144,7 @@ def save(cell, protocol, log):
             raise ValueError('Missing log entry: ' + key)
 
     # Get path to data file
-    trad = os.path.join(DATA, 'traditional-data')
-    data_files = {
-        1: os.path.join(trad, 'pr1-activation-kinetics-1-cell-' + str(cell)),
-        2: os.path.join(trad, 'pr2-activation-kinetics-2-cell-' + str(cell)),
-        3: os.path.join(trad, 'pr3-steady-activation-cell-' + str(cell)),
-        4: os.path.join(trad, 'pr4-inactivation-cell-' + str(cell)),
-        5: os.path.join(trad, 'pr5-deactivation-cell-' + str(cell)),
-        6: os.path.join(DATA, 'validation-data', 'ap-cell-' + str(cell)),
-        7: os.path.join(DATA, 'sine-wave-data', 'cell-' + str(cell)),
-    }
-    data_file = os.path.abspath(data_files[protocol])
+    data_file = os.path.abspath(data_path(cell, protocol))
 
     # Store
     print('Storing cell ' + str(cell) + ' data for protocol ' + str(protocol)
@@ -159,6 +165,14 @@ def load_myokit_protocol(protocol, variant=False):
     Loads the Myokit protocol with the given index (1-7). For Pr6 and Pr7, the
     protocol only has the steps for capacitance filtering.
     """
+    return myokit.load_protocol(myokit_protocol_path(protocol, variant))
+
+
+def myokit_protocol_path(protocol, variant=False):
+    """
+    Returns the path to the Myokit protocol with the given index (1-7), see
+    :meth:`load_myokit_protocol()`.
+    """
     protocol_files = {
         1: os.path.join(PROTO, 'pr1-activation-kinetics-1.mmt'),
         2: os.path.join(PROTO, 'pr2-activation-kinetics-2.mmt'),
@@ -172,16 +186,12 @@ def load_myokit_protocol(protocol, variant=False):
     # Load variants for Pr1 and Pr2 for cells 7 and 8
     if variant:
         if protocol == 1:
-            protocol = os.path.join(PROTO, 'pr1b.mmt')
+            return os.path.join(PROTO, 'pr1b.mmt')
         elif protocol == 2:
-            protocol = os.path.join(PROTO, 'pr2b.mmt')
+            return os.path.join(PROTO, 'pr2b.mmt')
         else:
             raise ValueError('Variants only exist for Pr1 and Pr2')
-    else:
-        protocol = protocol_files[protocol]
-
-    # Load Myokit protocol
-    return myokit.load_protocol(protocol)
+    return protocol_files[protocol]
 
 
 def load_ap_protocol():
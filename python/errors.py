@@ -11,7 +11,9 @@ import pints
 # Load project modules
 import cells
 import data
+import metrics
 import model
+import profiling
 import sumstat
 import transformations
 
@@ -189,6 +191,7 @@ class E2(pints.ErrorMeasure):
     def n_parameters(self):
         return 9
 
+    @profiling.timed('E2.simulate')
     def simulate(self, parameters):
 
         # Transform parameters back to model space
@@ -207,26 +210,30 @@ class E2(pints.ErrorMeasure):
             # Run simulation
             t = self.times[i]
             try:
-                d = s.run(t[-1] + 0.1, log_times=t).npview()
+                with profiling.timer('run'):
+                    d = s.run(t[-1] + 0.1, log_times=t).npview()
             except myokit.SimulationError:
+                metrics.count('simulation-failures')
                 return float('inf')
 
             # Store in same format as experimental data
-            e = myokit.DataLog()
-            e.set_time_key('time')
-            e['time'] = d['engine.time']
-            e['current'] = d['ikr.IKr']
+            with profiling.timer('DataLog'):
+                e = myokit.DataLog()
+                e.set_time_key('time')
+                e['time'] = d['engine.time']
+                e['current'] = d['ikr.IKr']
             logs[i] = e
 
         # Calculate summary statistics
         try:
-            stats = sumstat.all_summary_statistics(
-                self.cell,
-                pr2_log=logs[0],
-                pr3_log=logs[1],
-                pr4_log=logs[2],
-                pr5_log=logs[3]
-            )
+            with profiling.timer('sumstat'):
+                stats = sumstat.all_summary_statistics(
+                    self.cell,
+                    pr2_log=logs[0],
+                    pr3_log=logs[1],
+                    pr4_log=logs[2],
+                    pr5_log=logs[3]
+                )
         except Exception:
             import traceback
             e = traceback.format_exc()
@@ -274,7 +281,8 @@ class WholeTraceError(pints.ErrorMeasure):
             transformation = transformations.NullTransformation()
         self._transformation = transformation
 
-        # Store problems
+        # Store forward models and problems
+        self._models = []
         self._problems = []
 
         # Set individual errors and weights
@@ -297,6 +305,8 @@ class WholeTraceError(pints.ErrorMeasure):
                 start_steady=True
             )
 
+            self._models.append(m)
+
             # Load data, create single output problem
             log = data.load(cell, protocol, cap_filter=cap_filter)
             time = log.time()
@@ -322,6 +332,15 @@ class WholeTraceError(pints.ErrorMeasure):
         """ Return the problems, e.g. for synthetic data generation. """
         return self._problems
 
+    def set_tolerances(self, tol=None):
+        """
+        Sets the solver tolerance for all numerically simulated protocols, or
+        restores the default if ``tol=None``.
+        """
+        for m in self._models:
+            m.set_tolerances(m.default_tolerance if tol is None else tol)
+
+    @profiling.timed('WholeTraceError')
     def __call__(self, parameters):
 
         # Transform parameters back to model space
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+#
+# Exploration of the error surface in any number of dimensions, using
+# space-filling designs and lines through an optimum.
+#
+# Points are sampled in the search space of a transformation, varying a subset
+# of the parameters inside the (rectangular) parameter boundaries, while the
+# remaining parameters are fixed at the optimum.
+#
+from __future__ import division, print_function
+
+import numpy as np
+import pints
+
+
+# Supported designs
+designs = ['lhs', 'sobol', 'lines']
+
+
+class Exploration(object):
+    """
+    The results of an exploration: a set of points and their errors.
+
+    Attributes:
+
+    ``design``
+        The design used to choose the points, see :meth:`sample()`.
+    ``indices``
+        The (zero-based) indices of the parameters that were varied.
+    ``qopt``
+        The point (in search space) that the other parameters were fixed at.
+    ``xs``
+        An array of shape ``(n, len(indices))`` with the varied coordinates of
+        each point, in search space.
+    ``fs``
+        The error at each point.
+    ``inside``
+        A boolean array indicating which points satisfy the boundaries,
+        including the constraints on the maximum transition rates.
+    ``lines``
+        For the ``'lines'`` design, the index of the line each point is on.
+        For other designs, this is ``-1`` for every point.
+    ``info``
+        A dict with any further information, e.g. the cell and method.
+    """
+    def __init__(self, design, indices, qopt, xs, fs, inside, lines=None,
+                 info=None):
+        self.design = str(design)
+        self.indices = np.array(indices, dtype=int)
+        self.qopt = np.array(qopt, dtype=float)
+        self.xs = np.array(xs, dtype=float).reshape((-1, len(self.indices)))
+        self.fs = np.array(fs, dtype=float)
+        self.inside = np.array(inside, dtype=bool)
+        if lines is None:
+            lines = -np.ones(len(self.fs), dtype=int)
+        self.lines = np.array(lines, dtype=int)
+        self.info = dict(info) if info else {}
+        n = len(self.xs)
+        if not (len(self.fs) == len(self.inside) == len(self.lines) == n):
+            raise ValueError('All arrays must have the same length.')
+
+    def __len__(self):
+        return len(self.fs)
+
+    def points(self):
+        """ Returns the full points, as an array of shape ``(n, 9)``. """
+        return expand(self.qopt, self.indices, self.xs)
+
+    def save(self, path):
+        """
+        Stores this exploration at ``path``, in a compressed NumPy ``.npz``
+        file. Only the varied coordinates are stored, and these are stored
+        once.
+        """
+        info = np.array(
+            [str(k) + '=' + str(v) for k, v in sorted(self.info.items())],
+            dtype=str)
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f, design=np.array(self.design), indices=self.indices,
+                qopt=self.qopt, xs=self.xs, fs=self.fs, inside=self.inside,
+                lines=self.lines, info=info)
+
+
+def load(path):
+    """
+    Loads an exploration stored with :meth:`Exploration.save()`.
+
+    The values in the exploration's ``info`` dict are returned as strings.
+    """
+    with np.load(path) as d:
+        info = dict([x.split('=', 1) for x in d['info']])
+        return Exploration(
+            str(d['design']), d['indices'], d['qopt'], d['xs'], d['fs'],
+            d['inside'], d['lines'], info)
+
+
+def expand(qopt, indices, xs):
+    """
+    Returns an array of shape ``(n, 9)`` with the points ``qopt``, with the
+    parameters at ``indices`` replaced by the coordinates in ``xs``.
+    """
+    xs = np.asarray(xs, dtype=float)
+    qs = np.tile(np.asarray(qopt, dtype=float), (len(xs), 1))
+    qs[:, indices] = xs
+    return qs
+
+
+def search_box(bounds, transformation):
+    """
+    Returns the ``lower`` and ``upper`` limits of a
+    :class:`boundaries.Boundaries` object, in the search space of the given
+    ``transformation``.
+    """
+    lower = transformation.transform(bounds.lower)
+    upper = transformation.transform(bounds.upper)
+    return np.minimum(lower, upper), np.maximum(lower, upper)
+
+
+def sample(design, qopt, indices, lower, upper, n, seed=None,
+           points_per_line=32):
+    """
+    Samples ``n`` points for an exploration around ``qopt``, varying the
+    parameters with the given ``indices``, within the box given by ``lower``
+    and ``upper`` (all in search space).
+
+    Supported designs are:
+
+    ``'lhs'``
+        A Latin hypercube design on the box.
+    ``'sobol'``
+        A scrambled Sobol sequence on the box (``n`` is preferably a power of
+        two).
+    ``'lines'``
+        Random lines through ``qopt``, with directions drawn uniformly from
+        the unit sphere (after scaling each parameter by the size of the box),
+        each with ``points_per_line`` equally spaced points from one side of
+        the box to the other. The number of lines is ``n`` divided by
+        ``points_per_line``, rounded up.
+
+    Returns a tuple ``(xs, lines)``, where ``xs`` is an array of shape ``(n,
+    len(indices))`` with the varied coordinates, and ``lines`` indicates the
+    line each point is on (or ``-1`` if not using lines).
+    """
+    indices = np.asarray(indices, dtype=int)
+    lo = np.asarray(lower, dtype=float)[indices]
+    hi = np.asarray(upper, dtype=float)[indices]
+    d = len(indices)
+    n = int(n)
+
+    if design in ('lhs', 'sobol'):
+        from scipy.stats import qmc
+        if design == 'lhs':
+            sampler = qmc.LatinHypercube(d, seed=seed)
+        else:
+            sampler = qmc.Sobol(d, scramble=True, seed=seed)
+        xs = lo + sampler.random(n) * (hi - lo)
+        return xs, -np.ones(n, dtype=int)
+
+    elif design == 'lines':
+        rng = np.random.default_rng(seed)
+        x0 = np.asarray(qopt, dtype=float)[indices]
+        k = (n + points_per_line - 1) // points_per_line
+        xs, lines = [], []
+        for i in range(k):
+            # Random direction, in coordinates scaled by the box size
+            u = rng.standard_normal(d)
+            u *= (hi - lo) / np.sqrt(np.sum(u**2))
+
+            # Find where the line leaves the box, on either side of x0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ta = (lo - x0) / u
+                tb = (hi - x0) / u
+            t0 = np.max(np.where(u != 0, np.minimum(ta, tb), -np.inf))
+            t1 = np.min(np.where(u != 0, np.maximum(ta, tb), np.inf))
+            ts = np.linspace(t0, t1, points_per_line)
+            xs.append(x0 + ts[:, None] * u)
+            lines.append(np.ones(points_per_line, dtype=int) * i)
+        return np.concatenate(xs)[:n], np.concatenate(lines)[:n]
+
+    raise ValueError(
+        'Unknown design: ' + str(design) + '. Expecting one of: '
+        + ', '.join(designs) + '.')
+
+
+def evaluate(f, qs, workers=None, chunk=None):
+    """
+    Evaluates the error ``f`` at the points ``qs``, in chunks of ``chunk``
+    points (default: 16 per worker), using ``workers`` processes (or
+    sequentially if ``workers=1``). Returns an array with the errors.
+    """
+    if workers == 1:
+        evaluator = pints.SequentialEvaluator(f)
+    else:
+        evaluator = pints.ParallelEvaluator(f, n_workers=workers)
+    if chunk is None:
+        chunk = 16 * (pints.ParallelEvaluator.cpu_count()
+                      if workers is None else workers)
+
+    fs = np.zeros(len(qs))
+    imax = (len(qs) + chunk - 1) // chunk
+    for i in range(imax):
+        lo, hi = i * chunk, (i + 1) * chunk
+        with np.errstate(all='ignore'):
+            fs[lo:hi] = evaluator.evaluate(qs[lo:hi])
+        print(str(1 + i) + ' out of ' + str(imax))
+    return fs
+
+
+def explore(f, bounds, transformation, qopt, indices, design, n, seed=None,
+            workers=None, info=None, **kwargs):
+    """
+    Samples ``n`` points with the given ``design`` (see :meth:`sample()`),
+    varying the parameters at ``indices`` within ``bounds`` (a
+    :class:`boundaries.Boundaries` object), around ``qopt`` (in the search
+    space of ``transformation``), and evaluates them on the error ``f``.
+
+    Any further arguments are passed to :meth:`sample()`. Returns an
+    :class:`Exploration`, with a copy of the dict ``info``.
+    """
+    lower, upper = search_box(bounds, transformation)
+    xs, lines = sample(
+        design, qopt, indices, lower, upper, n, seed=seed, **kwargs)
+    qs = expand(qopt, indices, xs)
+    inside = bounds.check_batch(qs)
+    fs = evaluate(f, qs, workers)
+    return Exploration(design, indices, qopt, xs, fs, inside, lines, info)
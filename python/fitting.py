@@ -5,6 +5,7 @@
 from __future__ import division, print_function
 import os
 import sys
+import timeit
 import pints
 import numpy as np
 
@@ -12,17 +13,93 @@ import numpy as np
 import boundaries
 import cells
 import errors
+import logs
+import metrics
 import results
 import transformations
 
 
 debug = False
 
+# Store optimiser logs in a compact binary format, instead of CSV. All readers
+# in this project use logs.load(), which reads both. Binary logs can be
+# converted to CSV with convert-logs.py.
+binary_logs = False
+
+
+class LoggingCMAES(pints.CMAES):
+    """
+    CMA-ES optimiser that adds a row to a :class:`logs.BufferedLog` after
+    every iteration, instead of relying on PINTS' (unbuffered) file logging.
+    """
+    def __init__(self, x0, sigma0=None, boundaries=None):
+        super(LoggingCMAES, self).__init__(x0, sigma0, boundaries)
+        self._log = None
+        self._run = None
+        self._timer = None
+        self._iterations = 0
+        self._evaluations = 0
+
+    def ask(self):
+        # Start timing when the first points are requested
+        if self._timer is None:
+            self._timer = pints.Timer()
+        return super(LoggingCMAES, self).ask()
+
+    def set_log(self, log):
+        """ Sets the :class:`logs.BufferedLog` to write to. """
+        self._log = log
+
+    def set_run(self, run):
+        """ Sets the run name used in :mod:`metrics` records. """
+        self._run = run
+
+    def tell(self, fx):
+        super(LoggingCMAES, self).tell(fx)
+        self._evaluations += len(fx)
+        if self._log is not None:
+            self._log.log(
+                self._iterations, self._evaluations, self.f_best(),
+                self._timer.time())
+        if self._run is not None:
+            rate = self._evaluations / self._timer.time()
+            metrics.write(
+                'iteration', run=self._run, iteration=self._iterations,
+                evaluations=self._evaluations, best=self.f_best(),
+                **{'evaluations-per-second': rate})
+        self._iterations += 1
+
+
+class MonitoredError(pints.ErrorMeasure):
+    """
+    Wraps an error measure ``f``, and reports the time taken by each
+    evaluation, and whether it returned a finite score, to a
+    :class:`metrics.Monitor` for the run named ``run``.
+    """
+    def __init__(self, f, run):
+        super(MonitoredError, self).__init__()
+        self._f = f
+        self._monitor = metrics.Monitor(run, metrics.stream())
+
+    def __call__(self, x):
+        t = timeit.default_timer()
+        fx = self._f(x)
+        self._monitor.evaluated(timeit.default_timer() - t, np.isfinite(fx))
+        return fx
+
+    def n_parameters(self):
+        return self._f.n_parameters()
+
 
 def cmd(method, search_transformation='a', sample_transformation='a',
-        start_from_m1=False, method_1b=False):
+        start_from_m1=False, method_1b=False, screen=None,
+        screen_tolerance=None, start_from=None, start_top=1, start_sigma=None):
     """
     Handles command-line arguments to run a fit with one or all cells.
+
+    Starting point screening can be enabled with ``screen`` and
+    ``screen_tolerance``, and warm starts with ``start_from``, ``start_top``,
+    and ``start_sigma``, see :meth:`fit()`.
     """
     # Check input arguments
     base = os.path.basename(sys.argv[0])
@@ -57,17 +134,50 @@ def cmd(method, search_transformation='a', sample_transformation='a',
     # Run
     for cell in cell_list:
         fit(cell, method, search_transformation, sample_transformation,
-        start_from_m1, method_1b, repeats, cap)
+            start_from_m1, method_1b, repeats, cap, screen, screen_tolerance,
+            start_from, start_top, start_sigma)
 
 
 def fit(cell, method, search_transformation='a', sample_transformation='a',
-        start_from_m1=False, method_1b=False, repeats=1, cap=None):
+        start_from_m1=False, method_1b=False, repeats=1, cap=None,
+        screen=None, screen_tolerance=None, start_from=None, start_top=1,
+        start_sigma=None):
     """
     Performs a fit to data from cell ``cell``, using method ``method`` and the
     given configuration.
 
     If ``start_from_m1`` is set to ``True``, a single repeat will be run. Else,
     the number of repeats will be set by ``repeats`` and ``cap``.
+
+    By default, each repeat starts from a point sampled from the boundaries. If
+    ``screen`` is set to an integer ``n``, then ``n`` points are sampled and
+    evaluated first, and the repeats are started from the best of these, each
+    from a different basin (see :meth:`screen_starting_points()`). To make
+    screening cheaper, a looser solver tolerance can be set with
+    ``screen_tolerance``. This is only possible for methods with numerically
+    simulated protocols (methods 3, 4, and 5), and a ``ValueError`` is raised
+    for other methods.
+
+    Alternatively, a fit can be warm-started from stored results, by passing a
+    dict ``start_from`` of arguments to :meth:`results.load()`, e.g.
+    ``start_from=dict(method=2)`` to start from the best Method 2 result for
+    this cell, or ``start_from=dict(cell=4)`` to start from the best result
+    obtained with this method for cell 4. The repeats cycle through the best
+    ``start_top`` results, and if ``start_sigma`` is set the initial CMA-ES
+    step size is derived from the spread of the stored results (see
+    :meth:`warm_starts()`). If ``start_from_m1`` is set, a single run is
+    started exactly from the Method 1 result (without the checks and clipping
+    of :meth:`warm_starts()`), and the results are stored as e.g. method 2b.
+
+    Results of screened and warm-started runs are stored separately from runs
+    with random starting points, in configurations selected with
+    ``start='screened'`` and ``start='warm'`` (see :meth:`names.root_name()`),
+    so that statistics over repeats are not mixed. The starting points
+    themselves are stored with :meth:`results.save_start()`.
+
+    If :mod:`metrics` are enabled (e.g. by setting the environment variable
+    ``FWOW_METRICS`` to a directory), each run reports its progress, and its
+    workers report their evaluations, failures, and timeouts.
     """
     # Check cell and method (better checking happens below)
     cell = int(cell)
@@ -98,19 +208,10 @@ def fit(cell, method, search_transformation='a', sample_transformation='a',
     )
 
     # Define error function
+    g_fixed = None
     if method == 1:
         g_fixed = results.load_parameters(cell, 1)[-1]
-        f = errors.E1(cell, search_transformation, fixed_conductance=g_fixed)
-    elif method == 2:
-        f = errors.E2(cell, search_transformation)
-    elif method == 3:
-        f = errors.E3(cell, search_transformation)
-    elif method == 4:
-        f = errors.E4(cell, search_transformation)
-    elif method == 5:
-        f = errors.EAP(cell, search_transformation)
-    else:
-        raise ValueError('Method not supported: ' + str(method))
+    f = error_measure(cell, method, search_transformation, g_fixed)
 
     # Check number of repeats
     if start_from_m1:
@@ -131,6 +232,45 @@ def fit(cell, method, search_transformation='a', sample_transformation='a',
             raise ValueError(
                 'Cap on total number of runs must be at least 1 (or None).')
 
+    # Choose stored results to start from
+    sigma0 = None
+    starts = None
+    if start_from_m1:
+        if screen or start_from is not None:
+            raise ValueError(
+                'Starting point screening or warm starts cannot be used with'
+                ' start_from_m1.')
+    if start_from is not None:
+        if screen:
+            raise ValueError(
+                'Starting point screening cannot be combined with a warm'
+                ' start.')
+        starts, sigma0 = warm_starts(
+            cell, method, search_transformation, bounds, start_from,
+            start_top, start_sigma)
+
+    # Screen starting points
+    if screen_tolerance is not None:
+        if not screen:
+            raise ValueError(
+                'A screening tolerance can only be set if screening is'
+                ' enabled.')
+        if not hasattr(f, 'set_tolerances'):
+            raise ValueError(
+                'A screening tolerance cannot be set for method '
+                + method_name + ', which does not use numerically simulated'
+                ' protocols.')
+    if screen:
+        starts = screen_starting_points(
+            f, bounds, screen, repeats, tolerance=screen_tolerance)
+
+    # Choose configuration to store results in
+    start = None
+    if screen:
+        start = 'screened'
+    elif start_from is not None:
+        start = 'warm'
+
     # Run
     scores = []
     for i in range(repeats):
@@ -141,7 +281,7 @@ def fit(cell, method, search_transformation='a', sample_transformation='a',
             n = results.count(
                 cell, method,
                 search_transformation.code(), sample_transformation.code(),
-                start_from_m1, method_1b, False)
+                start_from_m1, method_1b, False, start=start)
             if n >= cap:
                 print()
                 print('Maximum number of runs reached: terminating.')
@@ -159,6 +299,10 @@ def fit(cell, method, search_transformation='a', sample_transformation='a',
         print()
         if start_from_m1:
             print('Starting from Method 1 result.')
+        elif start_from is not None:
+            print('Starting from stored result.')
+        elif starts is not None:
+            print('Starting from screened point.')
         else:
             print('Starting point sampled from boundaries.')
 
@@ -166,33 +310,56 @@ def fit(cell, method, search_transformation='a', sample_transformation='a',
         with results.reserve_base_name(
                 cell, method,
                 search_transformation.code(), sample_transformation.code(),
-                start_from_m1, method_1b) as base:
+                start_from_m1, method_1b, start) as base:
             print('Storing results using base ' + base)
 
             # Choose starting point
             if start_from_m1:
-                # Start from method 1 results
+                # Start exactly from the method 1 result
                 p0 = results.load_parameters(cell, 1)   # Model space
                 q0 = search_transformation.transform(p0)       # Search space
+            elif starts is not None:
+                # Start from the next best stored or screened point
+                q0, f0, info = starts[i % len(starts)]
+                if f0 is None:
+                    f0 = f(q0)
+                results.save_start(
+                    base, search_transformation.detransform(q0), f0, info)
             else:
                 # Choose random starting point
                 # Allow resampling, in case error calculation fails
                 print('Choosing starting point')
                 q0 = f0 = float('inf')
                 while not np.isfinite(f0):
-                    q0 = bounds.sample()    # Search space
-                    f0 = f(q0)              # Initial score
+                    q0 = bounds.sample()[0]     # Search space
+                    f0 = f(q0)                  # Initial score
+
+            # Report live metrics, if enabled
+            fm, run = f, None
+            if metrics.enabled():
+                run = os.path.relpath(base, results.ROOT)
+                metrics.write(
+                    'run-start', run=run, cell=cell, method=method_name,
+                    workers=pints.ParallelEvaluator.cpu_count())
+                fm = MonitoredError(f, run)
 
             # Create optimiser
             opt = pints.OptimisationController(
-                f, q0, boundaries=bounds, method=pints.CMAES)
-            opt.set_log_to_file(base + '.csv', True)
+                fm, q0, sigma0=sigma0, boundaries=bounds, method=LoggingCMAES)
             opt.set_max_iterations(3 if debug else None)
             opt.set_parallel(True)
+            opt.optimiser().set_run(run)
 
-            # Run optimisation
-            with np.errstate(all='ignore'):             # Ignore numpy warnings
-                q, s = opt.run()                        # Search space
+            # Run optimisation, with buffered logging
+            path = base + ('.bin' if binary_logs else '.csv')
+            with logs.BufferedLog(path) as log:
+                opt.optimiser().set_log(log)
+                with np.errstate(all='ignore'):         # Ignore numpy warnings
+                    q, s = opt.run()                    # Search space
+            if run is not None:
+                metrics.write(
+                    'run-end', run=run, best=s, duration=opt.time(),
+                    evaluations=opt.evaluations())
             p = search_transformation.detransform(q)    # Model space
             if method_1b:
                 p = np.concatenate((p, [g_fixed]))
@@ -215,3 +382,202 @@ def fit(cell, method, search_transformation='a', sample_transformation='a',
     print(np.std(scores))
     print('Worst score:')
     print(scores[-1])
+
+
+def error_measure(cell, method, transformation, fixed_conductance=None):
+    """
+    Creates and returns the error measure used to fit ``cell`` with
+    ``method``, working in the search space of the given ``transformation``.
+
+    For Method 1 (which can only be used as Method 1b) a ``fixed_conductance``
+    must be given.
+    """
+    if method == 1:
+        return errors.E1(
+            cell, transformation, fixed_conductance=fixed_conductance)
+    elif method == 2:
+        return errors.E2(cell, transformation)
+    elif method == 3:
+        return errors.E3(cell, transformation)
+    elif method == 4:
+        return errors.E4(cell, transformation)
+    elif method == 5:
+        return errors.EAP(cell, transformation)
+    raise ValueError('Method not supported: ' + str(method))
+
+
+def screen_starting_points(f, bounds, n, k, tolerance=None, radius=0.1,
+                           parallel=True):
+    """
+    Samples ``n`` points from ``bounds``, evaluates them on the error measure
+    ``f``, and returns (up to) ``k`` of the best points, each from a different
+    basin.
+
+    Points are ranked by their score, and then selected greedily: a point is
+    skipped if it lies within a distance ``radius`` of a point that has already
+    been selected. Distances are measured in the search space, after dividing
+    each parameter by the width of its boundaries (see
+    :meth:`boundaries.Boundaries.widths()`), so that ``radius`` is a fraction
+    of the search space (between 0 and 1) whatever the transformation. If fewer
+    than ``k`` distinct points are found, the best of the skipped points are
+    used to make up the numbers. Points with a non-finite score are never
+    selected.
+
+    If ``tolerance`` is given, the screening is performed with this (looser)
+    solver tolerance, after which the default tolerance is restored. This is
+    only possible if ``f`` has a method ``set_tolerances`` (i.e. if it uses
+    numerically simulated protocols), otherwise a ``ValueError`` is raised.
+
+    Returns a list of tuples ``(q, f, info)`` where ``q`` is a starting point
+    (in the search space), ``f`` is its screened score, and ``info`` is a dict
+    with the point's rank among all candidates and the screening cost (the
+    number of candidates and evaluations, and the time taken).
+    """
+    n = int(n)
+    k = int(k)
+    if n < 1:
+        raise ValueError('Number of screening points must be at least 1.')
+    if k < 1:
+        raise ValueError('Number of selected points must be at least 1.')
+    if radius < 0 or radius > 1:
+        raise ValueError('Screening radius must be in the range [0, 1].')
+    if tolerance is not None and not hasattr(f, 'set_tolerances'):
+        raise ValueError(
+            'A screening tolerance can only be set for error measures with'
+            ' numerically simulated protocols.')
+
+    print('Screening ' + str(n) + ' starting points')
+    timer = pints.Timer()
+
+    # Sample and evaluate
+    qs = bounds.sample(n)
+    if parallel:
+        evaluator = pints.ParallelEvaluator(f)
+    else:
+        evaluator = pints.SequentialEvaluator(f)
+    low_fidelity = tolerance is not None
+    if low_fidelity:
+        f.set_tolerances(tolerance)
+    try:
+        with np.errstate(all='ignore'):
+            fs = np.array(evaluator.evaluate(qs), dtype=float)
+    finally:
+        if low_fidelity:
+            f.set_tolerances(None)
+
+    # Rank by score, discard failed evaluations
+    order = np.argsort(fs)
+    order = order[np.isfinite(fs[order])]
+    if len(order) == 0:
+        raise ValueError('No finite scores found while screening.')
+
+    # Select best points from different basins
+    zs = qs / bounds.widths()
+    chosen, skipped = [], []
+    for i in order:
+        if len(chosen) == k:
+            break
+        if chosen:
+            d = np.sqrt(np.mean((zs[chosen] - zs[i])**2, axis=1))
+            if np.min(d) < radius:
+                skipped.append(i)
+                continue
+        chosen.append(i)
+    print('Found ' + str(len(chosen)) + ' distinct starting points')
+    chosen += skipped[:k - len(chosen)]
+
+    # Store screening cost, and rank of each point among all candidates
+    time = timer.time()
+    print('Screening took ' + str(time) + ' seconds')
+    ranks = np.empty(n, dtype=int)
+    ranks[order] = np.arange(len(order))
+    starts = []
+    for i in chosen:
+        info = {
+            'source': 'screened',
+            'rank': ranks[i],
+            'candidates': n,
+            'screen-evaluations': n,
+            'screen-time': time,
+            'screen-tolerance': tolerance if low_fidelity else 'default',
+        }
+        starts.append((qs[i], fs[i], info))
+    return starts
+
+
+def warm_starts(cell, method, transformation, bounds, start_from, n=1,
+                spread=None):
+    """
+    Returns starting points for a fit to ``cell`` with ``method``, taken from
+    the stored results selected by ``start_from``.
+
+    ``start_from`` must be a dict of arguments to :meth:`results.load()`. If
+    its ``cell`` or ``method`` entries are omitted, the cell and method being
+    fitted are used. The ``n`` best stored results that lie within ``bounds``
+    are returned, in the search space set by ``transformation``. Conductances
+    from other cells are first clipped to this cell's conductance boundaries.
+
+    If ``spread`` is set, an initial CMA-ES step size ``sigma0`` is derived
+    from all stored results with an error within a fraction ``spread`` of the
+    best, as the median of the standard deviations of each parameter in the
+    search space. PINTS' CMA-ES uses a single step size (and reduces a vector
+    to its minimum), so the median is used to stop the parameter with the
+    narrowest spread (e.g. one on a linear instead of a log scale) from
+    setting the step size for all others.
+
+    Returns a tuple ``(starts, sigma0)``, where ``starts`` is a list of tuples
+    ``(q, None, info)``, with ``info`` a dict describing the source of each
+    point, and where ``sigma0`` is ``None`` if no spread could be determined.
+    """
+    source = dict(start_from)
+    source.setdefault('cell', cell)
+    source.setdefault('method', method)
+    name = ', '.join(k + '=' + str(v) for k, v in sorted(source.items()))
+    print('Loading starting points from results for ' + name)
+
+    # Load stored results, in model space, ordered by error
+    if source['method'] == 1 and not source.get('method_1b', False):
+        # Method 1 stores a single parameter set, without an error
+        ps = np.array([results.load_parameters(**source)])
+        rs, es = [None], np.array([float('nan')])
+    else:
+        rs, ps, es, ts, ns = results.load(**source)
+        if len(ps) == 0:
+            raise ValueError('No stored results found for ' + name)
+
+    # Drop fixed conductance (method 1b), or clip to this cell's range
+    n_parameters = bounds.n_parameters()
+    ps = np.array(ps[:, :n_parameters])
+    if n_parameters == 9:
+        ps[:, 8] = np.clip(ps[:, 8], bounds.lower[8], bounds.upper[8])
+
+    # Keep results within the boundaries
+    qs = transformation.transform(ps)
+    inside = bounds.check_batch(qs)
+    if not np.any(inside):
+        raise ValueError('No stored results within the boundaries for ' + name)
+    rs = [r for r, ok in zip(rs, inside) if ok]
+    qs, es = qs[inside], es[inside]
+
+    starts = []
+    for q, r, e in list(zip(qs, rs, es))[:int(n)]:
+        info = {
+            'source': 'results',
+            'source-config': name,
+            'source-run': r,
+            'source-error': e,
+        }
+        starts.append((q, None, info))
+
+    # Derive step size from spread of near-best results
+    sigma0 = None
+    if spread is not None:
+        near = qs[es <= es[0] * (1 + spread)]
+        if len(near) > 1:
+            sigma0 = float(np.median(np.std(near, axis=0)))
+            if sigma0 > 0:
+                print('Using sigma0 = ' + str(sigma0) + ', derived from '
+                      + str(len(near)) + ' stored results.')
+            else:
+                sigma0 = None
+    return starts, sigma0
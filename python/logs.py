@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+#
+# Buffered writing, and reading, of optimisation logs.
+#
+from __future__ import division, print_function
+import atexit
+import multiprocessing
+import os
+import struct
+import tempfile
+import timeit
+
+import numpy as np
+
+
+# Column names, as used in the CSV logs written by PINTS
+csv_header = '"Iter.","Eval.","Best","Time m:s"\n'
+
+# Binary logs: a short header, followed by fixed-size records
+binary_header = b'FWOWLOG1'
+binary_record = struct.Struct('<qqdd')
+binary_dtype = np.dtype([
+    ('iteration', '<i8'),
+    ('evaluations', '<i8'),
+    ('best', '<f8'),
+    ('time', '<f8'),
+])
+
+
+class BufferedLog(object):
+    """
+    Writes an optimisation log with rows ``(iteration, evaluations, best,
+    time)``, but buffers the rows in memory and writes them in batches.
+
+    Arguments:
+
+    ``path``
+        The file to write to. If the extension is ``.bin``, a compact binary
+        log is written. Otherwise, a CSV file is written in the same format as
+        the PINTS logs. Binary logs can only be read with :meth:`load()` (which
+        all readers in this project use), but can be converted to CSV with
+        :meth:`save_csv()`.
+    ``max_rows``
+        The maximum number of rows to buffer before writing.
+    ``max_time``
+        The maximum time (in seconds) to buffer rows for before writing.
+
+    Rows are also written when :meth:`close()` is called, and when Python
+    exits. Each write appends all buffered rows with a single call, followed
+    by an ``fsync``, so that a crash loses at most the rows since the last
+    write. A partially written final row is ignored by :meth:`load()`.
+
+    Can be used as a context manager, which calls :meth:`close()` on exit.
+    """
+    def __init__(self, path, max_rows=1000, max_time=60):
+        self._path = path
+        self._binary = os.path.splitext(path)[1] == '.bin'
+        self._max_rows = int(max_rows)
+        self._max_time = float(max_time)
+
+        # Buffered rows, and time of last write
+        self._rows = []
+        self._last = timeit.default_timer()
+
+        # Create file with header
+        header = binary_header if self._binary else csv_header.encode('ascii')
+        self._write(header, 'wb')
+
+        # Write remaining rows at exit
+        self._closed = False
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Writes any buffered rows and closes the log.
+        """
+        if not self._closed:
+            self.flush()
+            self._closed = True
+            atexit.unregister(self.close)
+
+    def flush(self):
+        """
+        Writes all buffered rows to disk.
+        """
+        if self._closed:
+            raise ValueError('Log has been closed.')
+        if self._rows:
+            if self._binary:
+                chunk = b''.join(
+                    [binary_record.pack(*row) for row in self._rows])
+            else:
+                chunk = _csv_rows(self._rows).encode('ascii')
+            self._write(chunk, 'ab')
+            self._rows = []
+        self._last = timeit.default_timer()
+
+    def log(self, iteration, evaluations, best, time):
+        """
+        Adds a row to the log, and writes buffered rows if either the row or
+        the time budget has been exceeded.
+        """
+        if self._closed:
+            raise ValueError('Log has been closed.')
+        self._rows.append(
+            (int(iteration), int(evaluations), float(best), float(time)))
+        if len(self._rows) >= self._max_rows:
+            self.flush()
+        elif timeit.default_timer() - self._last > self._max_time:
+            self.flush()
+
+    def path(self):
+        """ Returns the path this log is written to. """
+        return self._path
+
+    def _write(self, data, mode):
+        """ Writes ``data`` in a single call, and syncs to disk. """
+        with open(self._path, mode) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _csv_rows(rows):
+    """ Formats rows ``(iteration, evaluations, best, time)`` as CSV. """
+    return ''.join([
+        str(i) + ',' + str(e) + ',' + '{:.17e}'.format(b) + ',' + str(t) + '\n'
+        for i, e, b, t in rows])
+
+
+def save_csv(path, log):
+    """
+    Writes a ``log`` as returned by :meth:`load()` to a CSV file at ``path``,
+    in the same format as the PINTS logs.
+
+    The file is replaced atomically, so that readers see either the old or the
+    new file.
+    """
+    rows = zip(log[0], log[1], log[2], log[3])
+    data = csv_header + _csv_rows(
+        [(int(i), int(e), float(b), float(t)) for i, e, b, t in rows])
+    fd, temp = tempfile.mkstemp(
+        prefix='.temp-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def load(base):
+    """
+    Loads the optimisation log stored at ``base + '.bin'`` or (if no binary
+    log is found) at ``base + '.csv'``. A full path to either file can also be
+    given.
+
+    Returns a tuple ``(iterations, evaluations, best, times)`` of NumPy arrays.
+    """
+    path = base
+    if not os.path.splitext(base)[1] in ('.bin', '.csv'):
+        path = base + '.bin'
+        if not os.path.isfile(path):
+            path = base + '.csv'
+
+    if os.path.splitext(path)[1] == '.bin':
+        with open(path, 'rb') as f:
+            if f.read(len(binary_header)) != binary_header:
+                raise ValueError('Not a binary optimisation log: ' + path)
+            raw = f.read()
+
+        # Ignore partially written final record
+        raw = raw[:len(raw) - len(raw) % binary_dtype.itemsize]
+        d = np.frombuffer(raw, dtype=binary_dtype)
+        return (
+            d['iteration'].astype(int),
+            d['evaluations'].astype(int),
+            d['best'].astype(float),
+            d['time'].astype(float),
+        )
+
+    # Read CSV, ignoring a partially written final line
+    with open(path, 'r') as f:
+        text = f.read()
+    lines = text.split('\n')
+    header = [x.strip('"') for x in lines[0].split(',')]
+    lines = [line for line in lines[1:-1] if line]
+
+    # PINTS logs may contain additional columns, e.g. "Current"
+    columns = [
+        header.index('Iter.'),
+        header.index('Eval.'),
+        header.index('Best'),
+        [i for i, x in enumerate(header) if x.startswith('Time')][0],
+    ]
+    d = np.array(
+        [[float(x) for x in line.split(',')] for line in lines]
+    ).reshape((-1, len(header)))
+    return (
+        d[:, columns[0]].astype(int),
+        d[:, columns[1]].astype(int),
+        d[:, columns[2]],
+        d[:, columns[3]],
+    )
+
+
+class Traces(object):
+    """
+    A set of optimisation logs, stored as a ragged array.
+
+    The logs are concatenated into flat arrays ``iterations``,
+    ``evaluations``, ``best``, and ``times``. The rows for the ``i``-th log
+    are given by ``offsets[i]:offsets[i + 1]``, and ``runs[i]`` holds its run
+    index.
+    """
+    def __init__(self, runs, offsets, iterations, evaluations, best, times):
+        self.runs = np.asarray(runs, dtype=int)
+        self.offsets = np.asarray(offsets, dtype=int)
+        self.iterations = np.asarray(iterations, dtype=int)
+        self.evaluations = np.asarray(evaluations, dtype=int)
+        self.best = np.asarray(best, dtype=float)
+        self.times = np.asarray(times, dtype=float)
+        if len(self.offsets) != len(self.runs) + 1:
+            raise ValueError('Offsets must have one entry more than runs.')
+
+    def __len__(self):
+        return len(self.runs)
+
+    def trace(self, i):
+        """
+        Returns a tuple ``(iterations, evaluations, best, times)`` for the
+        ``i``-th log.
+        """
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return (self.iterations[a:b], self.evaluations[a:b], self.best[a:b],
+                self.times[a:b])
+
+    def final(self):
+        """
+        Returns a tuple ``(iterations, evaluations, best, times)`` with the
+        final row of each log (logs without rows are skipped).
+        """
+        lengths = np.diff(self.offsets)
+        i = self.offsets[1:][lengths > 0] - 1
+        return (self.iterations[i], self.evaluations[i], self.best[i],
+                self.times[i])
+
+
+def load_many(runs, paths, processes=None):
+    """
+    Loads the optimisation logs at ``paths`` (see :meth:`load()`) in parallel
+    and returns a :class:`Traces` object, using ``runs`` as run indices.
+
+    The number of worker processes can be set with ``processes``, set to
+    ``1`` to load the logs sequentially.
+    """
+    paths = list(paths)
+    if processes is None:
+        processes = min(multiprocessing.cpu_count(), len(paths) // 50)
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            parts = pool.map(load, paths, chunksize=16)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        parts = [load(path) for path in paths]
+    return concatenate(runs, parts)
+
+
+def load_cached(runs, paths, cache, processes=None):
+    """
+    Like :meth:`load_many()`, but stores the consolidated logs in a single
+    binary file ``cache`` (an ``.npz`` file).
+
+    The cache stores the size and modification time of each log, so that only
+    new or changed logs need to be read the next time. Logs that are no longer
+    in ``paths`` are dropped. The cache is only rewritten if anything changed,
+    and is not written at all if its directory is read-only.
+    """
+    runs, paths = list(runs), list(paths)
+    names = [os.path.basename(path) for path in paths]
+    stats = [os.stat(path) for path in paths]
+    stats = [(st.st_mtime_ns, st.st_size) for st in stats]
+
+    # Read cached logs
+    cached = {}
+    try:
+        with np.load(cache) as d:
+            traces = Traces(
+                d['runs'], d['offsets'], d['iterations'], d['evaluations'],
+                d['best'], d['times'])
+            for i, name in enumerate(d['names']):
+                key = (str(name), int(d['mtimes'][i]), int(d['sizes'][i]))
+                cached[key] = traces.trace(i)
+    except (IOError, OSError, KeyError, ValueError):
+        pass
+
+    # Load new and changed logs
+    todo = [i for i, name in enumerate(names)
+            if (name, ) + stats[i] not in cached]
+    if todo or len(cached) != len(paths):
+        fresh = load_many(
+            [runs[i] for i in todo], [paths[i] for i in todo], processes)
+        for j, i in enumerate(todo):
+            cached[(names[i], ) + stats[i]] = fresh.trace(j)
+    parts = [cached[(name, ) + st] for name, st in zip(names, stats)]
+    traces = concatenate(runs, parts)
+
+    # Update cache, replacing the old file atomically
+    if todo or len(cached) != len(paths):
+        try:
+            fd, temp = tempfile.mkstemp(
+                prefix=os.path.basename(cache) + '-',
+                dir=os.path.dirname(cache))
+        except (IOError, OSError):
+            return traces   # Unable to write cache, e.g. read-only directory
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f, runs=traces.runs, offsets=traces.offsets,
+                    iterations=traces.iterations,
+                    evaluations=traces.evaluations, best=traces.best,
+                    times=traces.times, names=np.array(names, dtype=str),
+                    mtimes=np.array([st[0] for st in stats], dtype=np.int64),
+                    sizes=np.array([st[1] for st in stats], dtype=np.int64))
+            os.replace(temp, cache)
+        except Exception:
+            os.remove(temp)
+            raise
+    return traces
+
+
+def concatenate(runs, parts):
+    """
+    Creates a :class:`Traces` object from a list of run indices ``runs`` and a
+    list ``parts`` of tuples as returned by :meth:`load()`.
+    """
+    offsets = np.cumsum([0] + [len(part[0]) for part in parts])
+    if parts:
+        columns = [np.concatenate([part[i] for part in parts])
+                   for i in range(4)]
+    else:
+        columns = [[]] * 4
+    return Traces(runs, offsets, *columns)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+#
+# Live metrics from running fits, written as JSON lines.
+#
+# Metrics are disabled by default. They can be enabled by setting the
+# environment variable FWOW_METRICS to a directory, or by calling enable().
+# Each fitting process then writes a stream of JSON records to a file
+# ``metrics-<host>-<pid>.jsonl`` in this directory, to which its worker
+# processes append as well. Use aggregate() to summarise all streams.
+#
+# This module only uses the standard library, so that it can be used from
+# monitoring scripts that need to start quickly.
+#
+import atexit
+import glob
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import signal
+import socket
+import time
+
+
+# Directory to write metrics to, or None if disabled
+directory = os.environ.get('FWOW_METRICS') or None
+
+# Counters for events in this process (e.g. simulation failures)
+_counters = {}
+
+# Path of the stream for this (fitting) process
+_stream = None
+
+
+def count(name, n=1):
+    """
+    Increments the counter ``name`` for this process by ``n``.
+
+    This does nothing if metrics are disabled.
+    """
+    if directory is not None:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def counters():
+    """ Returns a copy of the counters for this process. """
+    return dict(_counters)
+
+
+def enable(path):
+    """
+    Enables metrics, and writes them to the directory at ``path``.
+
+    The directory is also stored in the environment variable
+    ``FWOW_METRICS``, so that subprocesses use the same setting.
+    """
+    global directory, _stream
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    directory = os.environ['FWOW_METRICS'] = path
+    _stream = None
+
+
+def enabled():
+    """ Returns ``True`` if metrics are enabled. """
+    return directory is not None
+
+
+def stream():
+    """
+    Returns the path of the metrics stream for this process.
+
+    Subprocesses can write to their parent's stream by passing this path to
+    :meth:`write()`.
+    """
+    global _stream
+    if _stream is None:
+        _stream = os.path.join(
+            directory,
+            'metrics-' + socket.gethostname() + '-' + str(os.getpid())
+            + '.jsonl')
+    return _stream
+
+
+def write(kind, path=None, **fields):
+    """
+    Writes a record of the given ``kind`` (e.g. ``'iteration'``) with the given
+    ``fields`` to the stream at ``path`` (or this process' stream if not
+    given), along with the current time, host, and process id.
+
+    Each record is appended with a single ``write`` to a file opened with
+    ``O_APPEND``, so that records from different processes do not interleave
+    (on local file systems). This does nothing if metrics are disabled.
+    """
+    if directory is None:
+        return
+    record = {
+        'kind': kind,
+        'time': time.time(),
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+    }
+    record.update(fields)
+    line = (json.dumps(record, sort_keys=True) + '\n').encode('utf-8')
+    fd = os.open(
+        path or stream(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read(path):
+    """
+    Reads and returns a list of all records in the stream at ``path``.
+
+    Incomplete or damaged lines are ignored.
+    """
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass
+    return records
+
+
+def aggregate(path=None, stalled=300):
+    """
+    Reads all metrics streams in the directory at ``path`` (or the current
+    metrics directory), and returns a list with a summary dict per run.
+
+    Each summary contains the run's ``run`` name, ``host``, and ``pid``, its
+    ``cell`` and ``method``, its latest ``iteration``, ``evaluations``,
+    ``evaluations-per-second``, and ``best`` score, the numbers of simulation
+    ``failures``, ``timeouts``, and ``non-finite`` scores reported by its
+    workers, the worker ``utilisation`` (the fraction of time the workers
+    spent evaluating), and its ``status``: ``'running'``, ``'finished'``, or
+    ``'stalled'`` (if no record has been written for ``stalled`` seconds).
+    """
+    path = path or directory
+    runs = {}
+    workers = {}
+    for filename in sorted(glob.glob(os.path.join(path, '*.jsonl'))):
+        for r in read(filename):
+            name = r.get('run')
+            if name is None:
+                continue
+            s = runs.setdefault(name, {
+                'run': name,
+                'host': r['host'],
+                'cell': None,
+                'method': None,
+                'iteration': None,
+                'evaluations': 0,
+                'evaluations-per-second': None,
+                'best': None,
+                'failures': 0,
+                'timeouts': 0,
+                'non-finite': 0,
+                'utilisation': None,
+                'status': 'running',
+                'start': r['time'],
+                'last': r['time'],
+            })
+            s['last'] = max(s['last'], r['time'])
+            kind = r['kind']
+            if kind == 'run-start':
+                s.update(pid=r['pid'], cell=r['cell'], method=r['method'],
+                         start=r['time'], workers=r['workers'])
+            elif kind == 'iteration':
+                s.update(iteration=r['iteration'], best=r['best'],
+                         evaluations=r['evaluations'])
+                s['evaluations-per-second'] = r['evaluations-per-second']
+            elif kind == 'run-end':
+                s['status'] = 'finished'
+                s['best'] = r['best']
+            elif kind == 'worker':
+                # Worker records are cumulative per worker process
+                workers[(name, r['host'], r['pid'])] = r
+
+    # Add worker totals
+    busy = {}
+    for (name, host, pid), r in workers.items():
+        s = runs[name]
+        s['failures'] += r['failures']
+        s['timeouts'] += r['timeouts']
+        s['non-finite'] += r['non-finite']
+        busy[name] = busy.get(name, 0) + r['busy']
+
+    now = time.time()
+    for name, s in runs.items():
+        elapsed = s['last'] - s['start']
+        if name in busy and elapsed > 0 and s.get('workers'):
+            s['utilisation'] = busy[name] / (elapsed * s['workers'])
+        if s['status'] == 'running' and now - s['last'] > stalled:
+            s['status'] = 'stalled'
+    return sorted(runs.values(), key=lambda s: s['start'])
+
+
+class Monitor(object):
+    """
+    Keeps track of the evaluations performed by a (worker) process for a run
+    named ``run``, and periodically writes a cumulative ``'worker'`` record
+    to the stream at ``path``.
+
+    Records are written every ``every`` evaluations, or when ``interval``
+    seconds have passed since the last record. A final record is written when
+    the process exits, or when a worker process is stopped with ``SIGTERM``
+    (as PINTS does).
+    """
+    def __init__(self, run, path, every=50, interval=10):
+        self._run = run
+        self._path = path
+        self._every = int(every)
+        self._interval = float(interval)
+        self._pid = None
+
+    def _reset(self):
+        """ Resets the totals (after forking into a new process). """
+        self._pid = os.getpid()
+        self._evaluations = 0
+        self._written = 0
+        self._busy = 0
+        self._non_finite = 0
+        self._start = self._last = time.time()
+        self._base = dict(_counters)
+
+        # Write the remaining totals on exit. Forked worker processes exit
+        # without calling atexit handlers, but do run multiprocessing's
+        # finalizers. PINTS stops its workers with SIGTERM, so handle that too,
+        # and then pass the signal on to any previously installed handler.
+        atexit.register(self.flush)
+        if multiprocessing.parent_process() is not None:
+            multiprocessing.util.Finalize(None, self.flush, exitpriority=0)
+            try:
+                previous = signal.signal(signal.SIGTERM, self._terminate)
+            except ValueError:
+                pass    # Not in the main thread
+            else:
+                self._previous = previous
+
+    def _terminate(self, signum, frame):
+        """ Writes the totals and then exits, when a worker is terminated. """
+        try:
+            self.flush()
+        finally:
+            previous = self._previous
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                os.kill(os.getpid(), signal.SIGTERM)
+
+    def evaluated(self, duration, finite):
+        """
+        Records an evaluation that took ``duration`` seconds, and returned a
+        finite (or non-finite) score.
+        """
+        if self._pid != os.getpid():
+            self._reset()
+        self._evaluations += 1
+        self._busy += duration
+        if not finite:
+            self._non_finite += 1
+        if (self._evaluations % self._every == 0
+                or time.time() - self._last > self._interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes a record with the totals for this process, if anything has been
+        evaluated since the last record was written.
+        """
+        if self._pid != os.getpid() or self._evaluations == self._written:
+            return
+        now = self._last = time.time()
+        self._written = self._evaluations
+
+        # Counters since this monitor started
+        n = {}
+        for key in ('simulation-failures', 'timeouts'):
+            n[key] = _counters.get(key, 0) - self._base.get(key, 0)
+
+        write(
+            'worker', self._path, run=self._run,
+            evaluations=self._evaluations, busy=self._busy,
+            elapsed=now - self._start, failures=n['simulation-failures'],
+            timeouts=n['timeouts'], **{'non-finite': self._non_finite})
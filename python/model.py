@@ -9,6 +9,8 @@ import myokit.lib.hh
 import pints
 
 import data
+import metrics
+import profiling
 
 
 class Model(pints.ForwardModel):
@@ -43,6 +45,9 @@ class Model(pints.ForwardModel):
         'ikr.p9',
     ]
 
+    # Default solver tolerance, for numerical simulations
+    default_tolerance = 1e-8
+
     def __init__(
             self, protocol, reversal_potential, sine_wave=False,
             start_steady=False, analytical=False):
@@ -90,7 +95,7 @@ class Model(pints.ForwardModel):
                 self.simulation.set_max_step_size(0.1)
 
             # Set solver tolerances
-            self.simulation.set_tolerance(1e-8, 1e-8)
+            self.set_tolerances(self.default_tolerance)
 
         else:
             if sine_wave:
@@ -112,8 +117,14 @@ class Model(pints.ForwardModel):
         return len(self.parameters)
 
     def set_tolerances(self, tol):
-        self.simulation.set_tolerance(tol, tol)
+        """
+        Sets the solver tolerance. Analytical simulations are exact, so this
+        has no effect on them.
+        """
+        if not self._analytical:
+            self.simulation.set_tolerance(tol, tol)
 
+    @profiling.timed('Model.simulate')
     def simulate(self, parameters, times):
 
         # Update model parameters
@@ -123,21 +134,24 @@ class Model(pints.ForwardModel):
         # Run
         self.simulation.reset()
         try:
-            if self._analytical:
-                d = self.simulation.run(
-                    times[-1] + 0.5 * times[1],
-                    log_times=times,
-                    ).npview()
-            else:
-                d = self.simulation.run(
-                    times[-1] + 0.5 * times[1],
-                    log_times=times,
-                    log=['ikr.IKr', 'membrane.V'],
-                    progress=self._timeout,
-                    ).npview()
+            with profiling.timer('run'):
+                if self._analytical:
+                    d = self.simulation.run(
+                        times[-1] + 0.5 * times[1],
+                        log_times=times,
+                        ).npview()
+                else:
+                    d = self.simulation.run(
+                        times[-1] + 0.5 * times[1],
+                        log_times=times,
+                        log=['ikr.IKr', 'membrane.V'],
+                        progress=self._timeout,
+                        ).npview()
         except myokit.SimulationError:
+            metrics.count('simulation-failures')
             return times * float('inf')
         except myokit.SimulationCancelledError:
+            metrics.count('timeouts')
             return times * float('inf')
 
         # Store membrane potential for debugging
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+#
+# Python module that knows how result files are named.
+#
+# This module only uses the standard library, so that it can be imported by
+# scripts that need to start quickly.
+#
+import glob
+import os
+import re
+
+
+# Get root of this project
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Location of the results index (see :meth:`report.index()`)
+INDEX = os.path.join(ROOT, 'results.sqlite')
+
+# Codes for the transformations in ``transformations.codes`` (which is not
+# imported here, to avoid importing NumPy)
+transformation_codes = ['a', 'f', 'k', 'n']
+
+# Ways of choosing starting points that are stored separately from the default
+# (random) starts: screened points, and warm starts from stored results
+start_codes = ['screened', 'warm']
+
+
+def natural_sort(s):
+    """
+    Key function for natural sorting.
+    """
+    pat = re.compile('([0-9]+)')
+    return [int(t) if t.isdigit() else t.lower() for t in pat.split(s)]
+
+
+def root_name(cell, method,
+              search_transformation='a', sample_transformation='a',
+              start_from_m1=False, method_1b=False, start=None):
+    """
+    Returns a dirname and base filename for the given info: To create a full
+    filename, add a repeat number and a file extension.
+
+    Runs with screened or warm-started starting points (see
+    :meth:`fitting.fit()`) are stored in separate directories, selected by
+    setting ``start`` to one of ``start_codes``.
+    """
+    cell = int(cell)
+    method = int(method)
+    if cell < 1 or cell > 10:
+        raise ValueError('Unknown cell: ' + str(cell))
+    if method < 1 or method > 5:
+        raise ValueError('Unknown method: ' + str(method))
+
+    # Transformation codes must exist
+    if search_transformation not in transformation_codes:
+        raise ValueError(
+            'Unknown transformation code: ' + str(search_transformation))
+    if sample_transformation not in transformation_codes:
+        raise ValueError(
+            'Unknown transformation code: ' + str(search_transformation))
+
+    # Method 1 cannot use transformations
+    if method == 1 and not method_1b:
+        if search_transformation != 'a' or sample_transformation != 'a':
+            raise ValueError(
+                'Method 1 results cannot be requested for specific parameter'
+                ' transformations.')
+
+    # Method 1 cannot use start_from_m1
+    if method == 1 and start_from_m1:
+            raise ValueError('Start-from-m1 cannot be used with method 1.')
+
+    # Method 1b cannot be used with methods other than method 1
+    if method != 1 and method_1b:
+        raise ValueError('Method-1b can only be used with method 1.')
+
+    # Starting point codes must exist, and can't be combined with method 1
+    # results or start_from_m1
+    if start is not None:
+        if start not in start_codes:
+            raise ValueError('Unknown starting point code: ' + str(start))
+        if start_from_m1 or (method == 1 and not method_1b):
+            raise ValueError(
+                'Starting point codes cannot be used with method 1 results'
+                ' or start-from-m1.')
+
+    # Get directory name
+    dirname = 'method-' + str(method) if method < 5 else 'surface-ap-fit'
+    if start_from_m1 or method_1b:
+        dirname += 'b'
+    if search_transformation != 'a' or sample_transformation != 'a':
+        dirname += '-' + search_transformation + sample_transformation
+    if start is not None:
+        dirname += '-' + start
+    dirname = os.path.join(ROOT, dirname)
+
+    # Get root of file name
+    root = 'cell-' + str(cell) + '-fit-' + str(method)
+    if start_from_m1 or method_1b:
+        root += 'b'
+    # TODO Add transformation name too?
+    if method_1b or method > 1:
+        root += '-run-'
+
+    return (dirname, root)
+
+
+def find_runs(dirname, root, extension='.txt'):
+    """
+    Returns a list of tuples ``(run, path)`` for every file in ``dirname``
+    named ``root + run + extension``, where ``run`` is an integer index.
+
+    If ``extension`` is ``None``, files with any extension are returned. Files
+    that only share the root (e.g. ``root + run + '-start.txt'``) are ignored.
+    """
+    ext = r'\.[^.]+' if extension is None else re.escape(extension)
+    pattern = re.compile(re.escape(root) + r'([0-9]+)' + ext + '$')
+    runs = []
+    for path in glob.glob(os.path.join(dirname, root + '*')):
+        m = pattern.match(os.path.basename(path))
+        if m is not None:
+            runs.append((int(m.group(1)), path))
+    return runs
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+#
+# Lightweight profiling of the hot paths in error evaluations.
+#
+# Profiling is disabled by default. It can be enabled by setting the
+# environment variable FWOW_PROFILE to a directory, or by calling enable().
+# Code sections are then timed with
+#
+#   with profiling.timer('name'):
+#       ...
+#
+# and nested sections are recorded as stacks, e.g. ``E2;simulate``. Each
+# process (including PINTS worker processes) periodically writes its totals
+# to a file ``profile-<host>-<pid>.json`` in the profiling directory. Use
+# aggregate() to combine these files, and collapsed() to export them in the
+# "collapsed stack" format read by flamegraph tools.
+#
+# When profiling is disabled, timer() returns a shared object that does
+# nothing, so that the cost is a function call and an attribute lookup.
+#
+# This module only uses the standard library.
+#
+import atexit
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import timeit
+
+
+# Directory to write profiles to, or None if disabled
+directory = os.environ.get('FWOW_PROFILE') or None
+
+# Minimum time (in seconds) between writes of this process' totals
+interval = 10
+
+# Totals for this process, as a dict mapping stacks (tuples of names) to lists
+# [calls, time], and the stack of currently running sections
+_totals = {}
+_stack = []
+
+# Process the totals belong to, and time of last write
+_pid = None
+_last = 0
+
+
+class _NullTimer(object):
+    """ A timer that does nothing, used when profiling is disabled. """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_null = _NullTimer()
+
+
+class _Timer(object):
+    """ Times a code section, see :meth:`timer()`. """
+    __slots__ = ('_name', '_start')
+
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        if _pid != os.getpid():
+            _reset()
+        _stack.append(self._name)
+        self._start = timeit.default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        t = timeit.default_timer() - self._start
+        key = tuple(_stack)
+        _stack.pop()
+        total = _totals.get(key)
+        if total is None:
+            _totals[key] = [1, t]
+        else:
+            total[0] += 1
+            total[1] += t
+
+        # Write totals periodically, when leaving a top-level section
+        if not _stack and timeit.default_timer() - _last > interval:
+            dump()
+        return False
+
+
+def _reset():
+    """ Clears the totals (e.g. after forking into a new process). """
+    global _pid, _last
+    _pid = os.getpid()
+    _last = timeit.default_timer()
+    _totals.clear()
+    del _stack[:]
+
+    # PINTS stops its worker processes with SIGTERM, so write the totals first
+    if multiprocessing.parent_process() is not None:
+        try:
+            signal.signal(signal.SIGTERM, _terminate)
+        except ValueError:
+            pass    # Not in the main thread
+
+
+def _terminate(signum, frame):
+    """ Writes the totals and then exits, when a worker is terminated. """
+    try:
+        dump()
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+def timer(name):
+    """
+    Returns a context manager that times the enclosed code as a section called
+    ``name``, nested in any sections that are currently running.
+
+    Returns an object that does nothing if profiling is disabled.
+    """
+    if directory is None:
+        return _null
+    return _Timer(name)
+
+
+def timed(name):
+    """
+    Decorator that times every call to a function as a section ``name``.
+    """
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            if directory is None:
+                return f(*args, **kwargs)
+            with _Timer(name):
+                return f(*args, **kwargs)
+        wrapper.__name__ = f.__name__
+        wrapper.__doc__ = f.__doc__
+        wrapper.__wrapped__ = f
+        return wrapper
+    return decorator
+
+
+def enable(path):
+    """
+    Enables profiling, and writes the results to the directory at ``path``.
+
+    The directory is also stored in the environment variable
+    ``FWOW_PROFILE``, so that subprocesses use the same setting.
+    """
+    global directory
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    directory = os.environ['FWOW_PROFILE'] = path
+
+
+def enabled():
+    """ Returns ``True`` if profiling is enabled. """
+    return directory is not None
+
+
+def totals():
+    """
+    Returns a dict mapping stacks (strings of names separated by semicolons)
+    to tuples ``(calls, time)`` for this process.
+    """
+    if _pid != os.getpid():
+        return {}
+    return dict(
+        (';'.join(key), (n, t)) for key, (n, t) in _totals.items())
+
+
+def dump():
+    """
+    Writes the totals for this process to its file in the profiling
+    directory, replacing the file atomically.
+
+    This is called automatically every ``interval`` seconds, when Python
+    exits, and when a worker process is terminated.
+    """
+    global _last
+    if directory is None or _pid != os.getpid() or not _totals:
+        return
+    _last = timeit.default_timer()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    host = socket.gethostname()
+    path = os.path.join(
+        directory, 'profile-' + host + '-' + str(_pid) + '.json')
+    fd, temp = tempfile.mkstemp(prefix='.profile-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'host': host,
+                'pid': _pid,
+                'sections': totals(),
+            }, f, sort_keys=True)
+        os.replace(temp, path)
+    except Exception:
+        os.remove(temp)
+        raise
+
+
+atexit.register(dump)
+
+
+def aggregate(path=None):
+    """
+    Reads all profiles in the directory at ``path`` (or the current profiling
+    directory), and returns a dict mapping stacks to tuples ``(calls, total,
+    self)``, summed over all processes.
+
+    Here ``total`` is the total time spent in a section, and ``self`` is the
+    time not spent in any of its nested sections (e.g. Python overhead).
+    """
+    path = path or directory
+    sums = {}
+    for filename in sorted(glob.glob(os.path.join(path, 'profile-*.json'))):
+        try:
+            with open(filename, 'r') as f:
+                sections = json.load(f)['sections']
+        except (IOError, OSError, ValueError, KeyError):
+            continue
+        for stack, (n, t) in sections.items():
+            s = sums.setdefault(stack, [0, 0])
+            s[0] += n
+            s[1] += t
+
+    # Subtract time in nested sections to get self time
+    own = dict((stack, t) for stack, (n, t) in sums.items())
+    for stack, (n, t) in sums.items():
+        parent = stack.rpartition(';')[0]
+        if parent in own:
+            own[parent] -= t
+    return dict(
+        (stack, (n, t, max(0, own[stack])))
+        for stack, (n, t) in sums.items())
+
+
+def collapsed(profile):
+    """
+    Returns a list of lines ``stack microseconds`` with the self time of each
+    stack in ``profile`` (as returned by :meth:`aggregate()`), in the
+    "collapsed stack" format used by e.g. ``flamegraph.pl`` and speedscope.
+    """
+    return [
+        stack + ' ' + str(int(round(own * 1e6)))
+        for stack, (n, t, own) in sorted(profile.items())]
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+#
+# Fast access to result metadata, for reporting scripts.
+#
+# This module reads from the results index, and only uses the standard library
+# (i.e. no NumPy, PINTS, or Myokit), so that scripts using it start quickly.
+# Results are returned as lists, instead of NumPy arrays. See results.py for
+# the full interface.
+#
+import os
+import sqlite3
+
+# Load project modules
+import names
+import store
+
+
+_index = None
+
+
+def index():
+    """
+    Returns the :class:`store.Index` of all result files.
+
+    If the index cannot be opened (e.g. on a read-only file system), a
+    temporary in-memory index is used instead.
+    """
+    global _index
+    if _index is None:
+        try:
+            _index = store.Index(names.INDEX)
+        except sqlite3.Error as e:
+            print('Unable to open results index: ' + str(e))
+            _index = store.Index(':memory:', names.ROOT)
+    return _index
+
+
+def count(cell, method, search_transformation='a', sample_transformation='a',
+          start_from_m1=False, method_1b=False, parse=True, start=None):
+    """
+    Counts the number of results available for the given configuration.
+
+    If ``parse`` is set to ``False``, unfinished and corrupt result files are
+    also included in the count.
+
+    Runs with screened or warm-started starting points are selected by setting
+    ``start``, see :meth:`names.root_name()`.
+    """
+    dirname, root = names.root_name(
+        cell, method, search_transformation, sample_transformation,
+        start_from_m1, method_1b, start=start)
+    return index().count(dirname, root, parsed=parse)
+
+
+def values(cell, method, search_transformation='a',
+           sample_transformation='a', start_from_m1=False, method_1b=False,
+           column='error', top=None, within=None, start=None):
+    """
+    Returns a list with a single ``column`` (``'run'``, ``'error'``,
+    ``'time'``, ``'evaluations'``, or ``'p1'`` to ``'p9'``) for the results
+    for the given configuration, ordered by error.
+
+    A list of cells can be given as ``cell``, in which case the values for
+    all cells are concatenated. The arguments ``top`` and ``within`` filter
+    the results for each cell, as in :meth:`results.query()`.
+
+    Runs with screened or warm-started starting points are selected by setting
+    ``start``, see :meth:`names.root_name()`.
+    """
+    cell_list = cell if isinstance(cell, (list, tuple, range)) else [cell]
+    xs = []
+    for c in cell_list:
+        dirname, root = names.root_name(
+            c, method, search_transformation, sample_transformation,
+            start_from_m1, method_1b, start=start)
+        xs.extend([row[0] for row in index().select(
+            dirname, root, [column], top, within)])
+    return xs
+
+
+def quantiles(cell, method, search_transformation='a',
+              sample_transformation='a', start_from_m1=False,
+              method_1b=False, column='time', q=(0.5, ), start=None):
+    """
+    Returns a list with the quantiles ``q`` of a ``column`` for the given
+    configuration, as in :meth:`results.quantiles()`.
+
+    Returns ``None`` for each quantile if no results are found.
+
+    Runs with screened or warm-started starting points are selected by setting
+    ``start``, see :meth:`names.root_name()`.
+    """
+    cell_list = cell if isinstance(cell, (list, tuple, range)) else [cell]
+    roots = []
+    for c in cell_list:
+        dirname, root = names.root_name(
+            c, method, search_transformation, sample_transformation,
+            start_from_m1, method_1b, start=start)
+        roots.append(root)
+    return index().quantiles(dirname, roots, column, q)
+
+
+def best_parameters(
+        cell, method, search_transformation='a', sample_transformation='a',
+        start_from_m1=False, method_1b=False, start=None):
+    """
+    Returns the best parameters (as a list) for the given configuration, or
+    ``None`` if no results are available.
+
+    Like :meth:`results.load_parameters()`, this raises a
+    ``FileNotFoundError`` if the Method 1 result for a cell is not found.
+
+    Runs with screened or warm-started starting points are selected by setting
+    ``start``, see :meth:`names.root_name()`.
+    """
+    dirname, root = names.root_name(
+        cell, method, search_transformation, sample_transformation,
+        start_from_m1, method_1b, start=start)
+    if method == 1 and not method_1b:
+        with open(os.path.join(dirname, root) + '.txt', 'r') as f:
+            p = [float(x) for x in f.readlines()]
+            assert len(p) == 9
+        return p
+
+    rows = index().select(dirname, root, store.parameter_columns, top=1)
+    return list(rows[0]) if rows else None
+
+
+def summary(cell, method, search_transformation='a',
+            sample_transformation='a', start_from_m1=False, method_1b=False,
+            start=None):
+    """
+    Returns a dict summarising the results for the given configuration, see
+    :meth:`store.Index.summary()`.
+
+    Summaries are updated when results are saved, so this only requires a
+    single lookup.
+
+    Runs with screened or warm-started starting points are selected by setting
+    ``start``, see :meth:`names.root_name()`.
+    """
+    dirname, root = names.root_name(
+        cell, method, search_transformation, sample_transformation,
+        start_from_m1, method_1b, start=start)
+    return index().summary(dirname, root)
@@ -4,87 +4,72 @@
 #
 import glob
 import fnmatch
-import inspect
 import numpy as np
 import os
-import pints
-import re
+import socket
+import sqlite3
+import tempfile
+import time
 
 # Load project modules
-import transformations
+import archive
+import logs
+import store
+from names import INDEX, ROOT, natural_sort
+from names import root_name as _root_name, find_runs as _find_runs
+from report import index, summary
 
+# Format used to store floats, as used by PINTS
+FLOAT_FORMAT = '{: .17e}'
 
-# Get root of this project
-try:
-    frame = inspect.currentframe()
-    ROOT = os.path.dirname(inspect.getfile(frame))
-finally:
-    del(frame)  # Must be manually deleted
-ROOT = os.path.abspath(os.path.join(ROOT, '..'))
+# Results returned by load(), cached per process (see :meth:`load()`)
+_loaded = {}
 
 
-def natural_sort(s):
+def _strfloat(x):
+    """ Converts a float to a string, with maximum precision. """
+    return FLOAT_FORMAT.format(float(x))
+
+
+def _archived(dirname, root):
     """
-    Key function for natural sorting.
+    Returns the :class:`archive.Record` objects stored in the archive for
+    ``root`` in ``dirname``, or an empty list if there is no archive.
     """
-    pat = re.compile('([0-9]+)')
-    return [int(t) if t.isdigit() else t.lower() for t in pat.split(s)]
+    path = os.path.join(dirname, root + 'archive.bin')
+    return archive.read(path) if os.path.isfile(path) else []
 
 
-def _root_name(cell, method,
-               search_transformation='a', sample_transformation='a',
-               start_from_m1=False, method_1b=False):
+def _read_counter(path):
     """
-    Returns a dirname and base filename for the given info: To create a full
-    filename, add a repeat number and a file extension.
+    Returns the run indice stored in the counter file at ``path``, or ``None``
+    if the file does not exist or can't be read.
     """
-    cell = int(cell)
-    method = int(method)
-    if cell < 1 or cell > 10:
-        raise ValueError('Unknown cell: ' + str(cell))
-    if method < 1 or method > 5:
-        raise ValueError('Unknown method: ' + str(method))
+    try:
+        with open(path, 'r') as f:
+            return int(f.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
 
-    # Transformation codes must exist
-    if search_transformation not in transformations.codes:
-        raise ValueError(
-            'Unknown transformation code: ' + str(search_transformation))
-    if sample_transformation not in transformations.codes:
-        raise ValueError(
-            'Unknown transformation code: ' + str(search_transformation))
 
-    # Method 1 cannot use transformations
-    if method == 1 and not method_1b:
-        if search_transformation != 'a' or sample_transformation != 'a':
-            raise ValueError(
-                'Method 1 results cannot be requested for specific parameter'
-                ' transformations.')
-
-    # Method 1 cannot use start_from_m1
-    if method == 1 and start_from_m1:
-            raise ValueError('Start-from-m1 cannot be used with method 1.')
-
-    # Method 1b cannot be used with methods other than method 1
-    if method != 1 and method_1b:
-        raise ValueError('Method-1b can only be used with method 1.')
-
-    # Get directory name
-    dirname = 'method-' + str(method) if method < 5 else 'surface-ap-fit'
-    if start_from_m1 or method_1b:
-        dirname += 'b'
-    if search_transformation != 'a' or sample_transformation != 'a':
-        dirname += '-' + search_transformation + sample_transformation
-    dirname = os.path.join(ROOT, dirname)
-
-    # Get root of file name
-    root = 'cell-' + str(cell) + '-fit-' + str(method)
-    if start_from_m1 or method_1b:
-        root += 'b'
-    # TODO Add transformation name too?
-    if method_1b or method > 1:
-        root += '-run-'
-
-    return (dirname, root)
+def _write_counter(path, indice):
+    """
+    Stores a run indice in the counter file at ``path``.
+
+    The file is replaced atomically, so that readers see either the old or the
+    new value. Failures are ignored, as the counter is only used as a hint.
+    """
+    try:
+        fd, temp = tempfile.mkstemp(
+            prefix=os.path.basename(path) + '-', dir=os.path.dirname(path))
+    except (IOError, OSError):
+        return
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(indice) + '\n')
+        os.replace(temp, path)
+    except (IOError, OSError):
+        os.remove(temp)
 
 
 class reserve_base_name(object):
@@ -92,12 +77,18 @@ class reserve_base_name(object):
     Context manager that reserves and returns a base filename (i.e. without an
     extension) for the next repeat of the fit indicated by the parameters.
 
+    Run indices are reserved by creating the result file with ``O_EXCL``, which
+    is atomic across processes (and on NFS). To avoid scanning the directory
+    for the highest indice, the last reserved indice is stored in a hidden
+    counter file per configuration, which is used as a starting point for the
+    next reservation. As a result, the indices of deleted runs are not reused.
+
     If an exception occurs within the manager's context, any files matching the
     patterns ``basename.*`` and ``basename-*`` are deleted.
     """
     def __init__(self, cell, method, search_transformation='a',
                  sample_transformation='a', start_from_m1=False,
-                 method_1b=False):
+                 method_1b=False, start=None):
 
         # Method 1 is only supported for method 1b
         if method == 1 and not method_1b:
@@ -106,7 +97,7 @@ class reserve_base_name(object):
         # Get directory and root of filename (without indice)
         dirname, root = _root_name(
             cell, method, search_transformation, sample_transformation,
-            start_from_m1, method_1b)
+            start_from_m1, method_1b, start=start)
         self._dirname = dirname
         self._root = root
 
@@ -121,16 +112,18 @@ class reserve_base_name(object):
 
     def __enter__(self):
 
-        # Find potential indice
-        fs = glob.glob(os.path.join(self._dirname, self._root + '*'))
-        if fs:
-            fs = [os.path.splitext(f)[0] for f in fs]
-            fs = [int(f.rsplit('-', 1)[1]) for f in fs]
-            indice = max(fs)
-        else:
-            indice = 0
-
-        # Reserve
+        # Start from the last reserved indice, as stored in a counter file. If
+        # no counter exists yet, scan the directory (once).
+        counter = os.path.join(self._dirname, '.' + self._root + 'counter')
+        indice = _read_counter(counter)
+        if indice is None:
+            fs = _find_runs(self._dirname, self._root, None)
+            fs = [i for i, path in fs]
+            fs += [r.run for r in _archived(self._dirname, self._root)]
+            indice = max(fs) if fs else 0
+
+        # Reserve, by creating the file. If another process got there first
+        # (or the counter is out of date), try the next indice.
         running = True
         while running:
             indice += 1
@@ -148,6 +141,9 @@ class reserve_base_name(object):
                 if f is not None:
                     f.close()
 
+        # Update counter
+        _write_counter(counter, indice)
+
         # Store
         self._indice = indice
         self._base = self._root + self._format.format(indice)
@@ -191,17 +187,220 @@ def save(base, parameters, error, time, evaluations):
 
     print('Writing results to ' + str(path))
     with open(path, 'w') as f:
-        f.write('error: ' + pints.strfloat(error) + '\n')
-        f.write('time: ' + pints.strfloat(time) + '\n')
+        f.write('error: ' + _strfloat(error) + '\n')
+        f.write('time: ' + _strfloat(time) + '\n')
         f.write('evaluations: ' + str(evaluations) + '\n')
         f.write('parameters:\n')
         for p in parameters:
-            f.write('    ' + pints.strfloat(p) + '\n')
+            f.write('    ' + _strfloat(p) + '\n')
+
+    # Update index. If this fails, make sure the next sync checks the file,
+    # as its directory's modification time hasn't changed.
+    try:
+        index().update(path)
+    except sqlite3.Error as e:
+        print('Unable to update results index: ' + str(e))
+        try:
+            index().invalidate(os.path.dirname(path))
+        except sqlite3.Error:
+            os.utime(os.path.dirname(path))
     print('Done')
 
 
+def save_start(base, parameters, error, info=None):
+    """
+    Stores the starting point (in model space) used for a run, along with its
+    initial ``error`` and an optional dict ``info`` of further details (e.g.
+    how it was chosen), in a file next to the run's results.
+    """
+    path = base + '-start.txt'
+    error = float(error)
+
+    with open(path, 'w') as f:
+        for key, value in (info or {}).items():
+            f.write(str(key) + ': ' + str(value) + '\n')
+        f.write('error: ' + _strfloat(error) + '\n')
+        f.write('parameters:\n')
+        for p in parameters:
+            f.write('    ' + _strfloat(p) + '\n')
+
+
+def load_starts(
+        cell, method, search_transformation='a', sample_transformation='a',
+        start_from_m1=False, method_1b=False, start=None):
+    """
+    Returns the starting points stored with :meth:`save_start()` for the given
+    configuration.
+
+    Returns a dict mapping run indices to tuples ``(parameters, error, info)``,
+    where ``info`` is a dict of strings. Runs without a stored starting point
+    are omitted.
+    """
+    dirname, root = _root_name(
+        cell, method, search_transformation, sample_transformation,
+        start_from_m1, method_1b, start=start)
+
+    starts = {}
+    for run, path in _find_runs(dirname, root, '-start.txt'):
+        info = {}
+        with open(path, 'r') as f:
+            lines = [line.strip() for line in f]
+        i = lines.index('parameters:')
+        for line in lines[:i]:
+            key, value = line.split(':', 1)
+            info[key] = value.strip()
+        error = float(info.pop('error'))
+        parameters = np.array([float(x) for x in lines[i + 1:] if x])
+        starts[run] = (parameters, error, info)
+    return starts
+
+
+def compact(cell, method, search_transformation='a',
+            sample_transformation='a', start_from_m1=False, method_1b=False,
+            start=None):
+    """
+    Moves all finished runs for the given configuration into a single
+    append-only archive (see :mod:`archive`), and returns the number of runs
+    moved.
+
+    See :meth:`compact_all()`.
+    """
+    dirname, root = _root_name(
+        cell, method, search_transformation, sample_transformation,
+        start_from_m1, method_1b, start=start)
+    return _compact(dirname, root)
+
+
+def compact_all():
+    """
+    Moves all finished runs, for all configurations, into per-configuration
+    archives.
+
+    Each finished run is stored as a single record containing its parameters,
+    error, time, evaluations, and optimiser log, after which its loose result
+    and log files are deleted. Unfinished runs, and starting point files, are
+    left as they are. All other functions in this module read archived and
+    loose runs transparently.
+
+    Returns the number of runs moved.
+    """
+    n = 0
+    for dirname in _result_dirs():
+        roots = set()
+        for filename in os.listdir(dirname):
+            m = store._run_file.match(filename)
+            if m is not None:
+                roots.add(m.group(1))
+        for root in sorted(roots, key=natural_sort):
+            n += _compact(dirname, root)
+    return n
+
+
+def _lock_owner(path):
+    """
+    Returns a message describing the process holding the compaction lock at
+    ``path``, and how to remove the lock if that process no longer exists.
+    """
+    host = pid = None
+    try:
+        with open(path, 'r') as f:
+            host, pid = f.read().split()
+        pid = int(pid)
+    except (IOError, OSError, ValueError):
+        pass
+
+    stale = False
+    if pid is None:
+        # Unreadable, or written by an older version
+        owner = 'unknown process'
+        try:
+            stale = time.time() - os.path.getmtime(path) > 24 * 3600
+        except OSError:
+            pass
+    else:
+        owner = 'process ' + str(pid) + ' on ' + host
+        if host == socket.gethostname():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                stale = True
+            except PermissionError:
+                pass
+
+    if stale:
+        return ('locked by ' + owner + ', which appears to have stopped. If no'
+                ' compaction is running, delete ' + path + ' and try again.')
+    return ('locked by ' + owner + '. If this process has stopped, delete '
+            + path + ' and try again.')
+
+
+def _compact(dirname, root):
+    """ Compacts the runs for ``root`` in ``dirname``, see compact(). """
+    path = os.path.join(dirname, root + 'archive.bin')
+
+    # Prevent simultaneous compaction
+    try:
+        with open(path + '.lock', 'x') as f:
+            f.write(socket.gethostname() + ' ' + str(os.getpid()) + '\n')
+    except FileExistsError:
+        print('Skipping ' + path + ': ' + _lock_owner(path + '.lock'))
+        return 0
+
+    try:
+        # Find finished runs that have not been archived
+        archived = set([r.run for r in _archived(dirname, root)])
+        records, done = [], []
+        for run, txt in sorted(_find_runs(dirname, root)):
+            base = txt[:-4]
+            if run not in archived:
+                parsed = store.parse(txt)
+                if parsed is None:
+                    continue
+                log = None
+                if os.path.isfile(base + '.bin') or os.path.isfile(
+                        base + '.csv'):
+                    log = logs.load(base)
+                p, e, t, n = parsed
+                records.append(archive.Record(run, p, e, t, n, log))
+            done.append((run, base))
+
+        # Store, and make sure the counter covers all archived runs
+        if records:
+            print('Archiving ' + str(len(records)) + ' runs in ' + path)
+        archive.append(path, records)
+        runs = archived.union([r.run for r in records])
+        if runs:
+            counter = os.path.join(dirname, '.' + root + 'counter')
+            indice = _read_counter(counter) or 0
+            if indice < max(runs):
+                _write_counter(counter, max(runs))
+
+        # Delete loose files, but only for runs that can be read back from
+        # the archive
+        stored = set([r.run for r in _archived(dirname, root)])
+        missing = [run for run, base in done if run not in stored]
+        if missing:
+            print('Unable to read back runs ' + ', '.join(
+                [str(run) for run in missing]) + ' from ' + path
+                + ', keeping their result files.')
+        for run, base in done:
+            if run not in stored:
+                continue
+            for ext in ('.txt', '.csv', '.bin'):
+                if os.path.isfile(base + ext):
+                    os.remove(base + ext)
+    finally:
+        os.remove(path + '.lock')
+
+    try:
+        index().sync(dirname, force=True)
+    except sqlite3.Error as e:
+        print('Unable to update results index: ' + str(e))
+    return len(records)
+
+
 def count(cell, method, search_transformation='a', sample_transformation='a',
-          start_from_m1=False, method_1b=False, parse=True):
+          start_from_m1=False, method_1b=False, parse=True, start=None):
     """
     Counts the number of results available for the given configuration.
 
@@ -212,17 +411,43 @@ def count(cell, method, search_transformation='a', sample_transformation='a',
         # Count parsed results
         parts = load(
             cell, method, search_transformation, sample_transformation,
-            start_from_m1, method_1b)
+            start_from_m1, method_1b, start=start)
         return len(parts[0])
     else:
         dirname, root = _root_name(
             cell, method, search_transformation, sample_transformation,
-            start_from_m1, method_1b)
-        return len(list(glob.glob(os.path.join(dirname, root + '*.txt'))))
+            start_from_m1, method_1b, start=start)
+        try:
+            return index().count(dirname, root, parsed=False)
+        except sqlite3.Error as e:
+            print('Unable to use results index: ' + str(e))
+        return len(_find_runs(dirname, root))
+
+
+def rebuild_index():
+    """
+    Discards the results index, and rebuilds it from the result files.
+
+    Method 1 results are not included, as these are stored as a single
+    parameter set per cell (see :meth:`load_parameters()`).
+    """
+    index().rebuild(_result_dirs())
+
+
+def _result_dirs():
+    """
+    Returns a list of all directories containing fit results, except method 1
+    results.
+    """
+    dirnames = [path for path in glob.glob(os.path.join(ROOT, 'method-*'))
+                + glob.glob(os.path.join(ROOT, 'surface-ap-fit*'))
+                if os.path.isdir(path)
+                and os.path.basename(path) != 'method-1']
+    return sorted(dirnames, key=natural_sort)
 
 
 def load(cell, method, search_transformation='a', sample_transformation='a',
-         start_from_m1=False, method_1b=False):
+         start_from_m1=False, method_1b=False, start=None):
     """
     Returns all results for the given configuration.
 
@@ -231,52 +456,45 @@ def load(cell, method, search_transformation='a', sample_transformation='a',
     lists of evaluation times and evaluation counts.
 
     Each list is ordered by error (lowest first).
+
+    Results are cached in the results index (see :meth:`index()`), which only
+    needs to parse new or changed files, and within each process. The process
+    cache is reused until the index changes, so that repeated calls (e.g. to
+    :meth:`load_times()` and :meth:`load_evaluations()`) are cheap.
     """
     dirname, root = _root_name(
         cell, method, search_transformation, sample_transformation,
-        start_from_m1, method_1b)
-
-    # Create empty lists
+        start_from_m1, method_1b, start=start)
+
+    # Get results from index, or parse files if the index can't be used
+    rows = stamp = None
+    try:
+        index().sync(dirname)
+        stamp = index().stamp()
+        cached = _loaded.get((dirname, root))
+        if cached is not None and cached[0] == stamp:
+            return tuple(np.copy(x) for x in cached[1])
+        rows = index().runs(dirname, root)
+    except sqlite3.Error as e:
+        print('Unable to use results index: ' + str(e))
+        stamp = None
+    if rows is None:
+        rows = []
+        records = _archived(dirname, root)
+        archived = set([r.run for r in records])
+        for run, path in _find_runs(dirname, root):
+            if run in archived:
+                continue
+            parsed = store.parse(path)
+            if parsed is not None:
+                rows.append((run, ) + parsed)
+        for r in records:
+            rows.append((r.run, r.parameters, r.error, r.time, r.evaluations))
+
+    # Create lists
     rs, ps, es, ts, ns = [], [], [], [], []
-
-    # Find matching files
-    fs = glob.glob(os.path.join(dirname, root + '*.txt'))
-    for path in fs:
-        filename = os.path.split(path)[1]
-        i = int(os.path.splitext(filename)[0].rsplit('-', 1)[1])
-
-        # Naively parse file, warn and skip unparseable files
-        p = e = t = n = None
-        try:
-            todo = 4
-            with open(path, 'r') as f:
-                for i in range(100):    # Give up after 100 lines
-                    line = f.readline().strip()
-                    if line.startswith('error:'):
-                        e = float(line[6:])
-                        todo -= 1
-                    elif line.startswith('time:'):
-                        t = float(line[5:])
-                        todo -= 1
-                    elif line.startswith('evaluations:'):
-                        n = int(line[12:])
-                        todo -= 1
-                    elif line == 'parameters:':
-                        p = [float(f.readline()) for j in range(9)]
-                        todo -= 1
-                    if todo == 0:
-                        break
-                if todo:
-                    print('Unable to find all information, skipping '
-                          + filename)
-                    continue
-        except Exception as e:
-            print('Error when parsing file, skipping ' + filename)
-            print(e)
-            continue
-
-        # Store
-        rs.append(i)
+    for r, p, e, t, n in rows:
+        rs.append(r)
         ps.append(p)
         es.append(e)
         ts.append(t)
@@ -284,19 +502,150 @@ def load(cell, method, search_transformation='a', sample_transformation='a',
 
     # Convert to arrays and sort
     es = np.array(es)
-    order = np.argsort(es)
+    order = np.argsort(es, kind='mergesort')
     rs = np.array(rs)[order]
     ps = np.array(ps)[order]
     es = es[order]
     ts = np.array(ts)[order]
     ns = np.array(ns)[order]
 
+    # Cache, if obtained from an unchanged index
+    if stamp is not None and stamp == index().stamp():
+        _loaded[(dirname, root)] = (stamp, (rs, ps, es, ts, ns))
+        return tuple(np.copy(x) for x in (rs, ps, es, ts, ns))
     return (rs, ps, es, ts, ns)
 
 
+def query(cell, method, search_transformation='a', sample_transformation='a',
+          start_from_m1=False, method_1b=False, columns='error', top=None,
+          within=None, start=None):
+    """
+    Returns selected information about the results for the given
+    configuration, without loading all results.
+
+    The ``columns`` to return can be given as a single name, or as a list of
+    names. Supported names are ``'run'``, ``'error'``, ``'time'``,
+    ``'evaluations'``, ``'parameters'`` (returned as an array of shape
+    ``(n, 9)``), and ``'cell'``.
+
+    If ``within`` is set, only results with an error within a fraction
+    ``within`` of the best are returned, i.e. results for which
+    ``error / best - 1 < within``. If ``top`` is set, at most ``top`` results
+    are returned.
+
+    A list of cells can be passed in as ``cell``, in which case the results
+    (filtered per cell) are concatenated, in the order the cells are given.
+
+    Returns a single NumPy array if ``columns`` is a string, or a tuple of
+    arrays otherwise. Within each cell, results are ordered by error (lowest
+    first).
+    """
+    names = [columns] if isinstance(columns, str) else list(columns)
+    select = []
+    for name in names:
+        if name == 'parameters':
+            select.extend(store.parameter_columns)
+        elif name != 'cell':
+            if name not in store.columns:
+                raise ValueError('Unknown column: ' + str(name))
+            select.append(name)
+
+    # Get results per cell
+    cell_list = [cell] if np.isscalar(cell) else list(cell)
+    cs, rows = [], []
+    for c in cell_list:
+        dirname, root = _root_name(
+            c, method, search_transformation, sample_transformation,
+            start_from_m1, method_1b, start=start)
+        part = index().select(dirname, root, select, top, within)
+        cs.extend([int(c)] * len(part))
+        rows.extend(part)
+    rows = np.array(rows, dtype=float).reshape((len(rows), len(select)))
+
+    # Split into columns
+    data = []
+    for name in names:
+        if name == 'cell':
+            data.append(np.array(cs, dtype=int))
+        elif name == 'parameters':
+            i = select.index(store.parameter_columns[0])
+            data.append(rows[:, i:i + 9])
+        elif name in ('run', 'evaluations'):
+            data.append(rows[:, select.index(name)].astype(int))
+        else:
+            data.append(rows[:, select.index(name)])
+    return data[0] if isinstance(columns, str) else tuple(data)
+
+
+def quantiles(cell, method, search_transformation='a',
+              sample_transformation='a', start_from_m1=False,
+              method_1b=False, column='time', q=0.5, start=None):
+    """
+    Returns the quantile(s) ``q`` (in the range ``[0, 1]``) of a ``column``
+    (``'error'``, ``'time'``, or ``'evaluations'``) for the given
+    configuration, interpolated as in ``numpy.percentile``.
+
+    A list of cells can be passed in as ``cell``, in which case the quantiles
+    are calculated over the results for all of these cells.
+
+    Returns a float if ``q`` is a single number, or an array otherwise. If no
+    results are found, ``NaN`` is returned.
+    """
+    cell_list = [cell] if np.isscalar(cell) else list(cell)
+    dirname, roots = None, []
+    for c in cell_list:
+        dirname, root = _root_name(
+            c, method, search_transformation, sample_transformation,
+            start_from_m1, method_1b, start=start)
+        roots.append(root)
+
+    qs = [q] if np.isscalar(q) else list(q)
+    xs = index().quantiles(dirname, roots, column, qs)
+    xs = np.array([float('nan') if x is None else x for x in xs])
+    return float(xs[0]) if np.isscalar(q) else xs
+
+
+def load_logs(
+        cell, method, search_transformation='a', sample_transformation='a',
+        start_from_m1=False, method_1b=False, processes=None, start=None):
+    """
+    Returns the optimisation logs for all runs with the given configuration,
+    as a :class:`logs.Traces` object, ordered by run index.
+
+    Loose logs are read in parallel (see :meth:`logs.load_many()`) and
+    consolidated into a single cache file per configuration, so that
+    subsequent calls only need to read new or changed logs. Logs for archived
+    runs are read from the archive (see :meth:`compact()`).
+    """
+    dirname, root = _root_name(
+        cell, method, search_transformation, sample_transformation,
+        start_from_m1, method_1b, start=start)
+
+    if not os.path.isdir(dirname):
+        return logs.load_many([], [])
+
+    # Find logs, preferring binary logs over CSV
+    paths = dict(_find_runs(dirname, root, '.csv'))
+    paths.update(_find_runs(dirname, root, '.bin'))
+    runs = sorted(paths)
+    paths = [paths[run] for run in runs]
+    cache = os.path.join(dirname, '.' + root + 'logs.npz')
+    traces = logs.load_cached(runs, paths, cache, processes)
+
+    # Add logs from archive
+    records = _archived(dirname, root)
+    if not records:
+        return traces
+    parts = dict([(r.run, r.log) for r in records])
+    for i, run in enumerate(traces.runs):
+        parts[run] = traces.trace(i)
+    runs = sorted(parts)
+    return logs.concatenate(runs, [parts[run] for run in runs])
+
+
 def load_parameters(
         cell, method, search_transformation='a', sample_transformation='a',
-        start_from_m1=False, method_1b=False, repeats=False):
+        start_from_m1=False, method_1b=False, repeats=False, start=None):
     """
     Returns the parameters obtained from a fit with a given ``method`` to data
     from the specified ``cell`` with the given configuration.
@@ -306,7 +655,7 @@ def load_parameters(
     if method == 1 and not method_1b:
         path = _root_name(
             cell, method, search_transformation, sample_transformation,
-            start_from_m1, method_1b)
+            start_from_m1, method_1b, start=start)
         path = os.path.join(*path) + '.txt'
         with open(path, 'r') as f:
             p = np.array([float(x) for x in f.readlines()])
@@ -315,7 +664,7 @@ def load_parameters(
 
     rs, ps, es, ts, ns = load(
         cell, method, search_transformation, sample_transformation,
-        start_from_m1, method_1b)
+        start_from_m1, method_1b, start=start)
     if repeats:
         return ps
     else:
@@ -324,37 +673,37 @@ def load_parameters(
 
 def load_errors(
         cell, method, search_transformation='a', sample_transformation='a',
-        start_from_m1=False, method_1b=False):
+        start_from_m1=False, method_1b=False, start=None):
     """
     Returns the (sorted) errors for all repeats for the given fit.
     """
     rs, ps, es, ts, ns = load(
         cell, method, search_transformation, sample_transformation,
-        start_from_m1, method_1b)
+        start_from_m1, method_1b, start=start)
     return es
 
 
 def load_times(
         cell, method, search_transformation='a', sample_transformation='a',
-        start_from_m1=False, method_1b=False):
+        start_from_m1=False, method_1b=False, start=None):
     """
     Returns the (sorted) times for all repeats for the given fit.
     """
     rs, ps, es, ts, ns = load(
         cell, method, search_transformation, sample_transformation,
-        start_from_m1, method_1b)
+        start_from_m1, method_1b, start=start)
     return ts
 
 
 def load_evaluations(
         cell, method, search_transformation='a', sample_transformation='a',
-        start_from_m1=False, method_1b=False):
+        start_from_m1=False, method_1b=False, start=None):
     """
     Returns the (sorted) evaluations for all repeats for the given fit.
     """
     rs, ps, es, ts, ns = load(
         cell, method, search_transformation, sample_transformation,
-        start_from_m1, method_1b)
+        start_from_m1, method_1b, start=start)
     return ns
 
 
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+#
+# An SQLite index of the fitting results stored as text files and archives.
+#
+import os
+import re
+import sqlite3
+import time
+
+
+# Result files: a root name, followed by a run index, followed by .txt
+_run_file = re.compile(r'^(.*[^0-9])([0-9]+)\.txt$')
+
+# Archives: a root name, followed by archive.bin
+_archive_file = re.compile(r'^(.*)archive\.bin$')
+
+# Files or directories modified less than this many nanoseconds ago may still
+# change without their modification time changing, so are re-checked later
+_racy = 2 * 10**9
+
+# Directories that this process synchronised less than this many nanoseconds
+# ago, and that have not changed since, are not re-checked (even if racy)
+_recent = 10**9
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS dirs (
+    dirname TEXT PRIMARY KEY,
+    mtime INTEGER
+);
+CREATE TABLE IF NOT EXISTS runs (
+    dirname TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    root TEXT NOT NULL,
+    run INTEGER NOT NULL,
+    mtime INTEGER,
+    size INTEGER NOT NULL,
+    error REAL,
+    time REAL,
+    evaluations INTEGER,
+    p1 REAL, p2 REAL, p3 REAL, p4 REAL, p5 REAL,
+    p6 REAL, p7 REAL, p8 REAL, p9 REAL,
+    PRIMARY KEY (dirname, filename)
+);
+CREATE INDEX IF NOT EXISTS runs_by_error ON runs (dirname, root, error);
+CREATE TABLE IF NOT EXISTS summaries (
+    dirname TEXT NOT NULL,
+    root TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    best REAL,
+    within INTEGER NOT NULL,
+    time_mean REAL, time_min REAL, time_p10 REAL, time_p50 REAL,
+    time_p90 REAL, time_max REAL,
+    evaluations_mean REAL, evaluations_min REAL, evaluations_p10 REAL,
+    evaluations_p50 REAL, evaluations_p90 REAL, evaluations_max REAL,
+    PRIMARY KEY (dirname, root)
+);
+'''
+
+# Parameter columns, and all columns that can be selected
+parameter_columns = ['p' + str(1 + i) for i in range(9)]
+columns = ['run', 'error', 'time', 'evaluations'] + parameter_columns
+
+
+# Summaries: results within this fraction of the best error are counted, and
+# these quantiles of the time and evaluations are stored
+summary_within = 0.01
+summary_quantiles = [0.1, 0.5, 0.9]
+summary_columns = ['count', 'best', 'within'] + [
+    column + '_' + stat for column in ('time', 'evaluations')
+    for stat in ('mean', 'min', 'p10', 'p50', 'p90', 'max')]
+
+
+def _check_column(column):
+    """ Raises a ``ValueError`` if ``column`` can not be selected. """
+    if column not in columns:
+        raise ValueError('Unknown column: ' + str(column))
+
+
+def parse(path):
+    """
+    Parses a result file written by :meth:`results.save()`.
+
+    Returns a tuple ``(parameters, error, time, evaluations)``, or ``None`` if
+    the file could not be parsed (e.g. because the run is still in progress).
+    """
+    filename = os.path.basename(path)
+    p = e = t = n = None
+    try:
+        todo = 4
+        with open(path, 'r') as f:
+            for i in range(100):    # Give up after 100 lines
+                line = f.readline().strip()
+                if line.startswith('error:'):
+                    e = float(line[6:])
+                    todo -= 1
+                elif line.startswith('time:'):
+                    t = float(line[5:])
+                    todo -= 1
+                elif line.startswith('evaluations:'):
+                    n = int(line[12:])
+                    todo -= 1
+                elif line == 'parameters:':
+                    p = [float(f.readline()) for j in range(9)]
+                    todo -= 1
+                if todo == 0:
+                    break
+            if todo:
+                print('Unable to find all information, skipping ' + filename)
+                return None
+    except Exception as e:
+        print('Error when parsing file, skipping ' + filename)
+        print(e)
+        return None
+    return p, e, t, n
+
+
+class Index(object):
+    """
+    An SQLite index of result files, stored at ``path``.
+
+    Each result file (``root + run + '.txt'``) is parsed once, after which its
+    parameters, error, time, and evaluations are read from the index. Before a
+    directory is queried, the index is synchronised with the files on disk:
+    this is skipped if the directory's modification time has not changed (as
+    happens when files are created or deleted), and only new or modified files
+    are parsed. Files that are rewritten in place should be passed to
+    :meth:`update()`, as :meth:`results.save()` does.
+
+    Runs stored in an archive (``root + 'archive.bin'``, see :mod:`archive`)
+    are indexed in the same way as loose result files. If a run is found both
+    in an archive and as a loose file, only the archived record is used.
+
+    The index can be deleted at any time, and is then rebuilt from the result
+    files when next used. If ``path`` is ``':memory:'``, a temporary in-memory
+    index is created, and directory names are stored relative to ``base``.
+    """
+    def __init__(self, path, base=None):
+        if path == ':memory:':
+            self._path = path
+            self._base = os.path.abspath(base or os.curdir)
+        else:
+            self._path = os.path.abspath(path)
+            self._base = os.path.dirname(self._path)
+        self._keys = {}
+        self._synced = {}
+        self._pid = None
+        self._db = None
+        self._connect()
+
+    def _connect(self):
+        """ Returns a connection, creating a new one after forking. """
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self._path, timeout=60)
+            self._db.executescript(_schema)
+            self._pid = os.getpid()
+        return self._db
+
+    def _key(self, dirname):
+        """ Returns the key used to store ``dirname``. """
+        try:
+            return self._keys[dirname]
+        except KeyError:
+            key = os.path.relpath(os.path.abspath(dirname), self._base)
+            self._keys[dirname] = key
+            return key
+
+    def count(self, dirname, root, parsed=True):
+        """
+        Returns the number of result files for ``root`` in ``dirname``.
+
+        If ``parsed`` is ``False``, unfinished and corrupt result files are
+        also included in the count.
+        """
+        db = self.sync(dirname)
+        query = 'SELECT COUNT(*) FROM runs WHERE dirname = ? AND root = ?'
+        if parsed:
+            query += ' AND error IS NOT NULL'
+        return db.execute(
+            query, (self._key(dirname), root)).fetchone()[0]
+
+    def quantiles(self, dirname, roots, column, qs):
+        """
+        Returns the quantiles ``qs`` (numbers in the range ``[0, 1]``) of a
+        ``column`` (e.g. ``'time'``), over all parsed results for any of the
+        given ``roots`` in ``dirname``.
+
+        Quantiles are linearly interpolated between order statistics, in the
+        same way as ``numpy.percentile``, but are obtained by selecting only
+        the required rows. Returns ``None`` for each quantile if no results are
+        found.
+        """
+        _check_column(column)
+        db = self.sync(dirname)
+        return self._quantiles(db, self._key(dirname), roots, column, qs)
+
+    def _quantiles(self, db, key, roots, column, qs):
+        """ Returns quantiles, without synchronising first. """
+        where = (' FROM runs WHERE dirname = ? AND root IN ('
+                 + ', '.join(['?'] * len(roots)) + ') AND error IS NOT NULL')
+        args = [key] + list(roots)
+        n = db.execute('SELECT COUNT(*)' + where, args).fetchone()[0]
+        if n == 0:
+            return [None] * len(qs)
+
+        values = []
+        query = ('SELECT ' + column + where + ' ORDER BY ' + column
+                 + ' LIMIT 2 OFFSET ?')
+        for q in qs:
+            if q < 0 or q > 1:
+                raise ValueError('Quantiles must be in the range [0, 1].')
+            h = (n - 1) * q
+            i = min(int(h), n - 1)
+            xs = [r[0] for r in db.execute(query, args + [i])]
+            x = xs[0]
+            if h > i:
+                x += (h - i) * (xs[1] - xs[0])
+            values.append(x)
+        return values
+
+    def invalidate(self, dirname):
+        """
+        Forgets when ``dirname`` was last synchronised, so that the next call
+        to :meth:`sync()` checks all its files.
+        """
+        key = self._key(dirname)
+        self._synced.pop(key, None)
+        db = self._connect()
+        with db:
+            db.execute('DELETE FROM dirs WHERE dirname = ?', (key, ))
+
+    def path(self):
+        """ Returns the path to the index database. """
+        return self._path
+
+    def rebuild(self, dirnames):
+        """
+        Discards the index and rebuilds it for the given directories.
+        """
+        db = self._connect()
+        with db:
+            db.execute('DELETE FROM runs')
+            db.execute('DELETE FROM dirs')
+            db.execute('DELETE FROM summaries')
+        for dirname in dirnames:
+            self.sync(dirname, force=True)
+
+    def runs(self, dirname, root):
+        """
+        Returns a list of tuples ``(run, parameters, error, time,
+        evaluations)`` for all parsed result files for ``root`` in
+        ``dirname``, ordered by error (lowest first).
+        """
+        db = self.sync(dirname)
+        rows = db.execute(
+            'SELECT run, error, time, evaluations, '
+            + ', '.join(parameter_columns) + ' FROM runs'
+            ' WHERE dirname = ? AND root = ? AND error IS NOT NULL'
+            ' ORDER BY error, run', (self._key(dirname), root))
+        return [(r[0], list(r[4:]), r[1], r[2], r[3]) for r in rows]
+
+    def select(self, dirname, root, columns, top=None, within=None):
+        """
+        Returns a list of tuples containing the given ``columns`` for the
+        parsed results for ``root`` in ``dirname``, ordered by error (lowest
+        first).
+
+        Columns can be ``'run'``, ``'error'``, ``'time'``, ``'evaluations'``,
+        or a parameter column (``'p1'`` to ``'p9'``).
+
+        If ``within`` is set, only results with ``error / best - 1 < within``
+        are returned, where ``best`` is the lowest error. If ``top`` is set, at
+        most ``top`` results are returned.
+        """
+        for column in columns:
+            _check_column(column)
+        db = self.sync(dirname)
+        where = ' WHERE dirname = ? AND root = ? AND error IS NOT NULL'
+        args = [self._key(dirname), root]
+        query = 'SELECT ' + ', '.join(columns) + ' FROM runs' + where
+        if within is not None:
+            query += (' AND error / (SELECT MIN(error) FROM runs' + where
+                      + ') - 1 < ?')
+            args += args + [float(within)]
+        query += ' ORDER BY error, run'
+        if top is not None:
+            query += ' LIMIT ?'
+            args.append(int(top))
+        return db.execute(query, args).fetchall()
+
+    def stamp(self):
+        """
+        Returns an object that changes whenever the index is modified, by this
+        or any other process. This can be used to check if cached query results
+        are still valid (after calling :meth:`sync()`).
+        """
+        db = self._connect()
+        version = db.execute('PRAGMA data_version').fetchone()[0]
+        return (self._pid, version, db.total_changes)
+
+    def summary(self, dirname, root):
+        """
+        Returns a dict summarising the results for ``root`` in ``dirname``.
+
+        The summary contains the number of results (``count``), the ``best``
+        error, the number of results ``within`` 1% of the best, and the mean,
+        minimum, 10th, 50th, and 90th percentile, and maximum of the ``time``
+        and ``evaluations`` (e.g. ``time_p90``). Entries are ``None`` if there
+        are no results.
+
+        Summaries are updated whenever the index changes, so that reading one
+        only requires a single lookup.
+        """
+        db = self.sync(dirname)
+        key = self._key(dirname)
+        row = db.execute(
+            'SELECT ' + ', '.join(summary_columns)
+            + ' FROM summaries WHERE dirname = ? AND root = ?',
+            (key, root)).fetchone()
+        if row is not None:
+            return dict(zip(summary_columns, row))
+        with db:
+            return self._summarise(db, key, root)
+
+    def sync(self, dirname, force=False):
+        """
+        Updates the index for all result files in ``dirname``.
+
+        Unless ``force`` is set, nothing is done if the directory has not
+        changed since it was last synchronised.
+
+        Returns the database connection.
+        """
+        db = self._connect()
+        key = self._key(dirname)
+        try:
+            mtime = os.stat(dirname).st_mtime_ns
+        except FileNotFoundError:
+            with db:
+                db.execute('DELETE FROM runs WHERE dirname = ?', (key, ))
+                db.execute('DELETE FROM dirs WHERE dirname = ?', (key, ))
+                db.execute(
+                    'DELETE FROM summaries WHERE dirname = ?', (key, ))
+            return db
+
+        now = int(time.time() * 1e9)
+        if not force:
+            row = db.execute(
+                'SELECT mtime FROM dirs WHERE dirname = ?', (key, )).fetchone()
+            if row is not None and row[0] == mtime:
+                return db
+
+            # Don't re-check directories that may still change unnoticed (e.g.
+            # while fits are running) more than once in quick succession
+            last_mtime, last_sync = self._synced.get(key, (None, 0))
+            if last_mtime == mtime and now - last_sync < _recent:
+                return db
+
+        # Compare files on disk with indexed files
+        known, roots = {}, {}
+        for filename, root, fmtime, size in db.execute(
+                'SELECT filename, root, mtime, size FROM runs'
+                ' WHERE dirname = ?', (key, )):
+            known[filename] = (fmtime, size)
+            roots[filename] = root
+        changed = set()
+        archives = False
+        with db:
+            for entry in os.scandir(dirname):
+                if _run_file.match(entry.name) is not None:
+                    st = entry.stat()
+                    stat = (st.st_mtime_ns, st.st_size)
+                    if known.pop(entry.name, None) != stat:
+                        changed.add(
+                            self._store(db, key, entry.path, st, now))
+                elif _archive_file.match(entry.name) is not None:
+                    # Archived runs are stored as "archive.bin#run"
+                    archives = True
+                    st = entry.stat()
+                    stat = (st.st_mtime_ns, st.st_size)
+                    prefix = entry.name + '#'
+                    names = [x for x in known if x.startswith(prefix)]
+                    stats = set([known.pop(x) for x in names])
+                    if stats != set([stat]):
+                        changed.add(self._store_archive(
+                            db, key, entry.path, st, now))
+
+            # Remove deleted files
+            db.executemany(
+                'DELETE FROM runs WHERE dirname = ? AND filename = ?',
+                [(key, filename) for filename in known])
+            changed.update([roots[filename] for filename in known])
+
+            # Drop loose files for runs that are also archived. These are left
+            # behind if compaction is interrupted before they are deleted, and
+            # contain the same result as the archived record.
+            if archives:
+                rows = db.execute(
+                    'SELECT filename, root, run FROM runs WHERE dirname = ?',
+                    (key, )).fetchall()
+                archived = set([
+                    (root, run) for filename, root, run in rows
+                    if '#' in filename])
+                duplicates = [
+                    (filename, root) for filename, root, run in rows
+                    if '#' not in filename and (root, run) in archived]
+                db.executemany(
+                    'DELETE FROM runs WHERE dirname = ? AND filename = ?',
+                    [(key, filename) for filename, root in duplicates])
+                changed.update([root for filename, root in duplicates])
+
+            # Update summaries
+            for root in changed:
+                self._summarise(db, key, root)
+
+            # Store directory time, unless it may still change unnoticed
+            db.execute(
+                'INSERT OR REPLACE INTO dirs VALUES (?, ?)',
+                (key, None if now - mtime < _racy else mtime))
+        self._synced[key] = (mtime, now)
+        return db
+
+    def update(self, path):
+        """
+        Parses the result file at ``path`` and updates its entry in the index.
+        """
+        db = self._connect()
+        key = self._key(os.path.dirname(path))
+        now = int(time.time() * 1e9)
+        with db:
+            root = self._store(db, key, path, os.stat(path), now)
+            self._summarise(db, key, root)
+
+    def _store_archive(self, db, key, path, st, now):
+        """ Reads an archive and stores all its runs in the index. """
+        import archive  # Imports NumPy, so only when needed
+
+        filename = os.path.basename(path)
+        root = _archive_file.match(filename).group(1)
+        mtime = None if now - st.st_mtime_ns < _racy else st.st_mtime_ns
+        try:
+            records = archive.read(path)
+        except (IOError, OSError, ValueError) as e:
+            print('Error when reading archive, skipping ' + filename)
+            print(e)
+            records = []
+        db.execute(
+            'DELETE FROM runs WHERE dirname = ? AND filename LIKE ?',
+            (key, filename + '#%'))
+        db.executemany(
+            'INSERT OR REPLACE INTO runs VALUES (' + ', '.join(['?'] * 18)
+            + ')', [[key, filename + '#' + str(r.run), root, r.run, mtime,
+                     st.st_size, r.error, r.time, r.evaluations]
+                    + list(r.parameters) for r in records])
+        return root
+
+    def _store(self, db, key, path, st, now):
+        """ Parses a single file and stores it in the index. """
+        filename = os.path.basename(path)
+        m = _run_file.match(filename)
+        if m is None:
+            raise ValueError('Not a result file: ' + path)
+        parsed = parse(path)
+        if parsed is None:
+            p, e, t, n = [None] * 9, None, None, None
+        else:
+            p, e, t, n = parsed
+
+        # Don't store a modification time that may still change unnoticed
+        mtime = st.st_mtime_ns
+        if now - mtime < _racy:
+            mtime = None
+
+        db.execute(
+            'INSERT OR REPLACE INTO runs VALUES (' + ', '.join(['?'] * 18)
+            + ')', [key, filename, m.group(1), int(m.group(2)), mtime,
+                    st.st_size, e, t, n] + list(p))
+        return m.group(1)
+
+    def _summarise(self, db, key, root):
+        """ Updates and returns the summary for a single root. """
+        where = (' FROM runs WHERE dirname = ? AND root = ?'
+                 ' AND error IS NOT NULL')
+        args = [key, root]
+        row = list(db.execute(
+            'SELECT COUNT(*), MIN(error), AVG(time), MIN(time), MAX(time),'
+            ' AVG(evaluations), MIN(evaluations), MAX(evaluations)' + where,
+            args).fetchone())
+        n, best = row[:2]
+        within = 0
+        if n:
+            within = db.execute(
+                'SELECT COUNT(*)' + where + ' AND error / ? - 1 < ?',
+                args + [best, summary_within]).fetchone()[0]
+        tq = self._quantiles(db, key, [root], 'time', summary_quantiles)
+        eq = self._quantiles(
+            db, key, [root], 'evaluations', summary_quantiles)
+        values = [n, best, within] + row[2:4] + tq + row[4:5] + row[5:7] + eq
+        values += row[7:8]
+        db.execute(
+            'INSERT OR REPLACE INTO summaries VALUES ('
+            + ', '.join(['?'] * (2 + len(values))) + ')', args + values)
+        return dict(zip(summary_columns, values))
@@ -3,12 +3,28 @@
 # Summary statistic calculations for the traditional protocols.
 #
 from __future__ import division, print_function
+import hashlib
+import os
+import shutil
+import tempfile
+
 import myokit
 import numpy as np
 
 # Import local modules
 import data
 import cells
+import profiling
+
+
+# Directory to cache the summary statistics for experimental data in. This
+# can be changed with the environment variable FWOW_SUMSTAT_CACHE, or set to
+# an empty string to disable caching.
+cache_dir = os.environ.get(
+    'FWOW_SUMSTAT_CACHE', os.path.join(data.DATA, 'summary-statistics'))
+
+# Source files that affect the summary statistics
+_sources = [__file__, data.__file__, cells.__file__]
 
 
 parameter_names = [
@@ -215,29 +231,41 @@ def split_points_nocap(protocol, variant=False):
     return list(zip(split[:-1], split[1:]))
 
 
+@profiling.timed('fit_conductance_to_iv_curve')
 def fit_conductance_to_iv_curve(cell, parameters):
     """
-    Simulates an IV curve with 8 parameters, and then finds the best fit w.r.t.
-    a given cell.
+    Simulates an IV curve with 8 parameters, and then finds the conductance
+    that gives the best fit w.r.t. a given cell.
+
+    The current is proportional to the conductance, so the IV curve is
+    simulated once with unit conductance, after which the best (least-squares)
+    conductance is calculated directly. The simulation is analytical, and only
+    logs the parts of Pr5 that the peak currents are taken from.
     """
+    import myokit.lib.hh
     assert(len(parameters) == 8)
 
-    # Load cell's IV data
-    iv1 = iv_curve(cell)[1]
+    # Load cell's IV data. Use the cached summary statistics if available, but
+    # don't calculate all statistics just to get the IV curve.
+    basename = _cache_basename(cell) if cache_dir else None
+    if basename is not None and os.path.isfile(basename + '-iv.csv'):
+        iv1 = all_summary_statistics(cell)[4][1]
+    else:
+        iv1 = iv_curve(cell)[1]
 
     # Load protocol
-    print('Loading protocol file')
     protocol = data.load_myokit_protocol(5)
 
     # Load model
     model = data.load_myokit_model()
+    model.get('membrane.V').set_label('membrane_potential')
 
     # Set reversal potential
     model.get('nernst.EK').set_rhs(
         cells.reversal_potential(cells.temperature(cell)))
 
-    # Set 8 parameters
-    for i, p in enumerate(parameters):
+    # Set 8 parameters, and unit conductance
+    for i, p in enumerate(list(parameters) + [1]):
         model.get(parameter_names[i]).set_rhs(p)
 
     # Start at steady-state for -80mV
@@ -248,40 +276,48 @@ def fit_conductance_to_iv_curve(cell, parameters):
     model.get('ikr.act').set_state_value(ai)
     model.get('ikr.rec').set_state_value(ri)
 
-    # Create simulation
-    simulation = myokit.Simulation(model, protocol)
+    # Create analytical simulation
+    m = myokit.lib.hh.HHModel.from_component(model.get('ikr'))
+    simulation = myokit.lib.hh.AnalyticalSimulation(m, protocol)
 
-    # Run simulation
+    # Get times in the peak windows, with capacitance filtering as for the
+    # data
     dt = 0.1
-    d = simulation.run(
-        protocol.characteristic_time(),
-        log_interval=dt,
-        log=['engine.time', 'ikr.IKr'],
-        ).npview()
-
-    # Capacitance filter
-    t, c = d['engine.time'], d['ikr.IKr']
-    del(d)
-    t, c = data.capacitance(protocol, dt, t, c)
-    d = myokit.DataLog()
-    d['time'] = t
-    d['current'] = c
-
-    # Calculate iv from simulation
-    vs, iv2 = iv_curve(cell, pr5_log=d)
+    t = np.arange(0, protocol.characteristic_time(), dt)
+    t = data.capacitance(protocol, dt, t)[0]
+    windows = pr5_peak_windows(cell)
+    t = np.concatenate([t[i:i + j] for i, j in windows])
+
+    # Run simulation, and find peaks
+    c = simulation.run(t[-1] + dt, log_times=t).npview()['ikr.IKr']
+    offsets = np.cumsum([0] + [j for i, j in windows])
+    iv2 = []
+    for i, j in zip(offsets[:-1], offsets[1:]):
+        iv2.append(c[i + np.argmax(np.abs(c[i:j]))])
+    iv2 = np.array(iv2)
 
     # Calculate best scaling
-    from scipy.optimize import fmin
+    return float(np.dot(iv1, iv2) / np.dot(iv2, iv2))
 
-    def f(g):
-        return np.sum((iv1 - iv2 * g[0])**2)
 
-    # Guess some exponential parameters and fit
-    best = float(fmin(f, 1, disp=False)[0])
-    g = float(model.get(parameter_names[-1]).rhs()) * best
-    return g
+def pr5_peak_windows(cell):
+    """
+    Returns a list of tuples ``(i, n)`` with the start index and length of
+    the windows in the (capacitance filtered) Pr5 data that peak currents are
+    taken from.
+    """
+    windows = []
+    for k, step in enumerate(pr5_steps):
+        i, j = step
+        if cell == 9 and k == len(pr5_steps) - 1:
+            # Weird artefact in final trace for cell 9
+            i += 100
+            j -= 100
+        windows.append((i, j))
+    return windows
 
 
+@profiling.timed('time_constant_of_activation_pr1')
 def time_constant_of_activation_pr1(cell, pr1_log=None):
     """
     Calculates the time constant of activation for a given cell's Pr1 data.
@@ -332,6 +368,7 @@ def time_constant_of_activation_pr1(cell, pr1_log=None):
     return [0], [tau]
 
 
+@profiling.timed('time_constant_of_activation_pr2')
 def time_constant_of_activation_pr2(cell, pr2_log=None):
     """
     Calculates the time constant of activation for a given cell's Pr2 data.
@@ -399,6 +436,7 @@ def time_constant_of_activation_pr2(cell, pr2_log=None):
     return [40], [tau]
 
 
+@profiling.timed('time_constants_pr5')
 def time_constants_pr5(cell, pr5_log=None):
     """
     Returns time constants of activation and inactivation, calculated from Pr5.
@@ -545,6 +583,7 @@ def time_constant_of_inactivation_pr5(cell, pr5_log=None):
     return v, tau_rec
 
 
+@profiling.timed('time_constant_of_inactivation_pr4')
 def time_constant_of_inactivation_pr4(cell, pr4_log=None):
     """
     Returns time constants of inactivation, calculated from Pr4.
@@ -603,6 +642,7 @@ def time_constant_of_inactivation_pr4(cell, pr4_log=None):
     return voltages, taus
 
 
+@profiling.timed('steady_state_activation_pr3')
 def steady_state_activation_pr3(cell, pr3_log=None):
     """
     Returns the steady state of activation, calculated from Pr3.
@@ -641,6 +681,7 @@ def steady_state_activation_pr3(cell, pr3_log=None):
     return voltages, cpeaks
 
 
+@profiling.timed('steady_state_inactivation_and_iv_curve_pr5')
 def steady_state_inactivation_and_iv_curve_pr5(
         cell, pr5_log=None, include_minus_90=False, estimate_erev=False):
     """
@@ -662,17 +703,11 @@ def steady_state_inactivation_and_iv_curve_pr5(
     pr5_log = data.load(cell, 5, pr5_log)
     current = pr5_log['current']
 
-    steps = pr5_steps
     voltages = np.array(pr5_voltages)
 
     # Find peaks
     peaks = []
-    for k, step in enumerate(steps):
-        i, j = step
-        if cell == 9 and k == len(steps) - 1:
-            # Weird artefact in final trace for cell 9
-            i += 100
-            j -= 100
+    for i, j in pr5_peak_windows(cell):
         c = current[i:i + j]
         peaks.append(current[i + np.argmax(np.abs(c))])
     peaks = np.array(peaks)
@@ -799,7 +834,24 @@ def all_summary_statistics(
     with the time constant of activation, the time constant of recovery, the
     steady-state activation, the steady-state recovery, and the iv curve.
     Each is given as a tuple ``(voltage, values)``.
+
+    If no logs are given, the statistics for the cell's experimental data are
+    cached in ``cache_dir``, using a key that changes whenever the data, the
+    protocols, or the code used to calculate the statistics change.
     """
+    # Use cached statistics for experimental data
+    basename = None
+    if (cache_dir and pr2_log is None and pr3_log is None and pr4_log is None
+            and pr5_log is None):
+        basename = _cache_basename(cell)
+        if basename is not None:
+            try:
+                stats = load_all_summary_statistics(basename)
+            except (IOError, OSError):
+                pass
+            else:
+                return tuple(tuple(np.array(x) for x in s) for s in stats)
+
     # Load all data
     pr2_log = data.load(cell, 2, pr2_log)
     pr3_log = data.load(cell, 3, pr3_log)
@@ -833,8 +885,67 @@ def all_summary_statistics(
     vtr = np.concatenate((vtr1, vtr2[7:]))
     tr = np.concatenate((tr1, tr2[7:]))
 
+    stats = ((vta, ta), (vtr, tr), (vai, ai), (vri, ri), (viv, iv))
+
+    # Store in cache
+    if basename is not None:
+        try:
+            _store_in_cache(basename, stats)
+        except (IOError, OSError) as e:
+            print('Unable to cache summary statistics: ' + str(e))
+
     # Return
-    return ((vta, ta), (vtr, tr), (vai, ai), (vri, ri), (viv, iv))
+    return stats
+
+
+def _cache_basename(cell):
+    """
+    Returns the base name for cached summary statistics for ``cell`` (see
+    :meth:`save_all_summary_statistics()`), or ``None`` if any of the data
+    files can't be found.
+
+    The name contains a hash of the data files and protocols for Pr2-Pr5, and
+    of the source files that define the summary statistics.
+    """
+    h = hashlib.sha1()
+    paths = list(_sources)
+    for protocol in (2, 3, 4, 5):
+        path = data.data_path(cell, protocol)
+        for ext in ('.zip', '.csv'):
+            if os.path.isfile(path + ext):
+                paths.append(path + ext)
+                break
+        else:
+            return None
+        paths.append(data.myokit_protocol_path(
+            protocol, data.protocol_variant(cell, protocol)))
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return os.path.join(
+        cache_dir, 'cell-' + str(cell) + '-' + h.hexdigest()[:16])
+
+
+def _store_in_cache(basename, stats):
+    """
+    Stores summary statistics ``stats`` at ``basename`` (see
+    :meth:`save_all_summary_statistics()`).
+
+    The files are written to a temporary directory first, and then moved into
+    place, so that other processes never read incomplete files.
+    """
+    dirname = os.path.dirname(basename)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname, exist_ok=True)
+    temp = tempfile.mkdtemp(prefix='.temp-', dir=dirname)
+    try:
+        name = os.path.basename(basename)
+        save_all_summary_statistics(os.path.join(temp, name), *stats)
+        for key in ('ta', 'tr', 'ai', 'ri', 'iv'):
+            os.replace(os.path.join(temp, name + '-' + key + '.csv'),
+                       basename + '-' + key + '.csv')
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
 
 
 def model_steady_state_activation(voltages, parameters):
@@ -887,6 +998,7 @@ def model_time_constant_of_inactivation(voltages, parameters):
     return 1 / (k3 + k4)
 
 
+@profiling.timed('direct_fit_linear')
 def direct_fit_linear(ta, tr, ai, ri, iv):
     """
     Performs a direct fit to the given summary statistics, and return the
@@ -944,6 +1056,7 @@ def direct_fit_linear(ta, tr, ai, ri, iv):
     return [p1, p2, p3, p4, p5, p6, p7, p8]
 
 
+@profiling.timed('direct_fit_logarithmic')
 def direct_fit_logarithmic(ta, tr, ai, ri, iv):
     """
     Performs a direct fit to the given summary statistics, and return the
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+#
+# Maps of the error surface, on 2d slices through the search space.
+#
+# Each map covers one "quadrant": a pair of parameters (p1/p2, p3/p4, p5/p6, or
+# p7/p8) that is varied on an n-by-n grid, while the remaining parameters are
+# fixed at an optimum. Grids are defined in the search space of the
+# a-transformation (log for the A-parameters), and points are ordered with the
+# second parameter varying fastest.
+#
+# Maps are stored either as CSV files, with the error and all nine parameters
+# for every point, or as binary (.npz) files with the grid axes and a 2d array
+# of errors, see save_map().
+#
+from __future__ import division, print_function
+import heapq
+import os
+import struct
+import zlib
+
+import myokit
+import numpy as np
+import pints
+
+# Load project modules
+import transformations
+
+
+# Grid limits in search space
+qalo = np.log(1e-7)
+qahi = np.log(1e3)
+qblo = 0
+
+# Partial maps start with a header and the grid size n, followed by chunks.
+# Each chunk has a marker and the number of points k, then k grid indices
+# (int64) and k errors (float64), and a CRC32 of everything before it.
+partial_header = b'FWOWMAP1'
+partial_size = struct.Struct('<q')
+chunk_start = struct.Struct('<4sq')
+chunk_marker = b'CHNK'
+chunk_crc = struct.Struct('<I')
+
+
+def quadrant(quad):
+    """
+    Returns a tuple ``(a, b, xlim, ylim)`` for the given ``quad`` (1-4), where
+    ``a`` and ``b`` are the indices of the parameters that are varied, and
+    ``xlim`` and ``ylim`` are their limits in search space.
+    """
+    quad = int(quad)
+    if quad not in (1, 2, 3, 4):
+        raise ValueError('Quadrant must be 1, 2, 3, or 4.')
+    qbhi = 0.4 if (quad == 1 or quad == 3) else 0.2
+    a = (quad - 1) * 2
+    return a, a + 1, (qalo, qahi), (qblo, qbhi)
+
+
+def axes(quad, n):
+    """
+    Returns a tuple ``(x, y)`` with the values (in search space) of the
+    varied parameters along the axes of an ``n`` by ``n`` grid for ``quad``.
+    """
+    a, b, xlim, ylim = quadrant(quad)
+    return np.linspace(xlim[0], xlim[1], n), np.linspace(ylim[0], ylim[1], n)
+
+
+def grid(qopt, quad, n, indices=None):
+    """
+    Returns an array of shape ``(n * n, 9)`` with the points (in search
+    space) of an ``n`` by ``n`` grid for the given ``quad``, through the
+    point ``qopt``.
+
+    If a sequence of grid ``indices`` is given, only the points with these
+    indices are returned.
+    """
+    a, b = quadrant(quad)[:2]
+    xs, ys = axes(quad, n)
+    if indices is None:
+        indices = np.arange(n * n)
+    indices = np.asarray(indices, dtype=int)
+    qs = np.tile(np.asarray(qopt, dtype=float), (len(indices), 1))
+    qs[:, a] = xs[indices // n]
+    qs[:, b] = ys[indices % n]
+    return qs
+
+
+def save_csv(path, transformation, qs, fs, evaluated=None):
+    """
+    Stores a map with points ``qs`` (in search space) and scores ``fs`` in a
+    CSV file at ``path``, with a column ``f`` and parameter columns ``p1`` to
+    ``p9`` (in model space).
+
+    If an array ``evaluated`` is given, it is stored in an extra column
+    indicating which scores were evaluated (1) and which were interpolated
+    (0).
+    """
+    ps = np.array([transformation.detransform(q) for q in qs])
+    d = myokit.DataLog()
+    d['f'] = np.asarray(fs)
+    for i in range(9):
+        d['p' + str(1 + i)] = ps[:, i]
+    if evaluated is not None:
+        d['evaluated'] = np.asarray(evaluated, dtype=int)
+    d.save_csv(path)
+
+
+def save_map(path, quad, qopt, x, y, fs, evaluated=None, levels=0):
+    """
+    Stores a map in a binary ``.npz`` file at ``path``.
+
+    The map is given by its ``quad``, the point ``qopt`` it passes through,
+    the grid axes ``x`` and ``y`` (all in search space), and the errors
+    ``fs``, either as an array of shape ``(len(x), len(y))`` or in the order
+    used by :meth:`grid()`. The errors are stored as 32-bit floats. An array
+    ``evaluated`` (see :meth:`adaptive()`) can be stored too.
+
+    If ``levels`` is greater than zero, lower resolution versions of the map
+    are added, each halving the resolution of the previous level and keeping
+    the lowest error in each 2 by 2 block, so that narrow valleys remain
+    visible. These can be read with :meth:`load_map()`.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    fs = np.asarray(fs, dtype=np.float32).reshape((len(x), len(y)))
+    d = {
+        'quad': np.array(int(quad)),
+        'qopt': np.asarray(qopt, dtype=float),
+        'x0': x,
+        'y0': y,
+        'f0': fs,
+        'levels': np.array(int(levels)),
+    }
+    if evaluated is not None:
+        d['evaluated'] = np.asarray(evaluated, dtype=bool).reshape(fs.shape)
+    for level in range(1, 1 + int(levels)):
+        x, y, fs = _coarsen(x), _coarsen(y), _coarsen(fs, True)
+        d['x' + str(level)] = x
+        d['y' + str(level)] = y
+        d['f' + str(level)] = fs
+    with open(path, 'wb') as f:
+        np.savez(f, **d)
+
+
+def _coarsen(a, minimum=False):
+    """
+    Halves the resolution of an axis (by taking the mean of each pair of
+    points) or of a 2d map (by taking the minimum of each 2 by 2 block, with
+    NaNs treated as infinite). Odd sizes are padded by repeating the final
+    row or column.
+    """
+    if a.ndim == 1:
+        if len(a) % 2:
+            a = np.concatenate((a, a[-1:]))
+        return 0.5 * (a[0::2] + a[1::2])
+    if a.shape[0] % 2:
+        a = np.concatenate((a, a[-1:, :]), axis=0)
+    if a.shape[1] % 2:
+        a = np.concatenate((a, a[:, -1:]), axis=1)
+    a = np.where(np.isnan(a), np.inf, a)
+    return np.minimum(
+        np.minimum(a[0::2, 0::2], a[1::2, 0::2]),
+        np.minimum(a[0::2, 1::2], a[1::2, 1::2]))
+
+
+def load_map(path, level=0):
+    """
+    Loads a map stored with :meth:`save_map()`, and returns a tuple ``(quad,
+    qopt, x, y, fs)``, where ``fs`` is an array of shape ``(len(x),
+    len(y))``.
+
+    A lower resolution version can be loaded by setting ``level``.
+    """
+    with np.load(path) as d:
+        if level > int(d['levels']):
+            raise ValueError(
+                'Map ' + path + ' has no level ' + str(level) + '.')
+        level = str(int(level))
+        return (
+            int(d['quad']),
+            d['qopt'],
+            d['x' + level],
+            d['y' + level],
+            d['f' + level].astype(float),
+        )
+
+
+def find_map(base):
+    """
+    Returns the path to the map stored at ``base + '.npz'`` or (if not
+    found) ``base + '.csv'``, or ``None`` if neither exists.
+    """
+    for ext in ('.npz', '.csv'):
+        if os.path.exists(base + ext):
+            return base + ext
+    return None
+
+
+def load_points(path):
+    """
+    Loads a map stored as a CSV file, or with :meth:`save_map()`, and returns
+    a tuple ``(qs, fs)`` with the points (in search space) and errors, in the
+    order used by :meth:`grid()`.
+    """
+    if os.path.splitext(path)[1] == '.npz':
+        quad, qopt, x, y, fs = load_map(path)
+        a, b = quadrant(quad)[:2]
+        qs = np.tile(qopt, (len(x) * len(y), 1))
+        qs[:, a] = np.repeat(x, len(y))
+        qs[:, b] = np.tile(y, len(x))
+        return qs, fs.ravel()
+
+    d = myokit.DataLog.load_csv(path).npview()
+    ps = np.array([d['p' + str(1 + i)] for i in range(9)]).T
+    return transformations.ATransformation().transform(ps), d['f']
+
+
+def append_partial(path, n, indices, fs):
+    """
+    Appends a chunk with the errors ``fs`` for the given grid ``indices`` to
+    the partial map at ``path``, for an ``n`` by ``n`` grid. The file is
+    created if it doesn't exist.
+
+    Each chunk is written with a single call, after which the file is synced
+    to disk. If this is interrupted, :meth:`read_partial()` ignores the
+    incomplete chunk.
+    """
+    indices = np.asarray(indices, dtype='<i8')
+    fs = np.asarray(fs, dtype='<f8')
+    if len(indices) != len(fs):
+        raise ValueError('Indices and errors must have the same length.')
+    data = chunk_start.pack(chunk_marker, len(indices))
+    data += indices.tobytes() + fs.tobytes()
+    data += chunk_crc.pack(zlib.crc32(data) & 0xffffffff)
+    with open(path, 'ab') as f:
+        if f.tell() == 0:
+            data = partial_header + partial_size.pack(n) + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_partial(path, n=None, repair=False):
+    """
+    Reads the partial map at ``path`` and returns a tuple ``(indices, fs)``
+    with the grid indices and errors of all points evaluated so far.
+
+    If ``n`` is given, a ``ValueError`` is raised if the file was created for
+    a different grid size. Reading stops at the first incomplete or damaged
+    chunk. If ``repair`` is ``True``, the file is then truncated after the
+    last good chunk, so that new chunks can be appended.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    i = len(partial_header) + partial_size.size
+    if len(data) < i or data[:len(partial_header)] != partial_header:
+        raise ValueError('Not a partial surface map: ' + path)
+    size = partial_size.unpack_from(data, len(partial_header))[0]
+    if n is not None and size != n:
+        raise ValueError(
+            'Partial surface map ' + path + ' has grid size ' + str(size)
+            + ', expecting ' + str(n) + '.')
+
+    indices, fs = [], []
+    while i + chunk_start.size <= len(data):
+        marker, k = chunk_start.unpack_from(data, i)
+        j = i + chunk_start.size + 16 * k
+        if marker != chunk_marker or j + chunk_crc.size > len(data):
+            break
+        crc = chunk_crc.unpack_from(data, j)[0]
+        if crc != zlib.crc32(data[i:j]) & 0xffffffff:
+            print('Damaged chunk in ' + path + ', ignoring rest of file.')
+            break
+        a = i + chunk_start.size
+        indices.append(np.frombuffer(data[a:a + 8 * k], dtype='<i8'))
+        fs.append(np.frombuffer(data[a + 8 * k:j], dtype='<f8'))
+        i = j + chunk_crc.size
+    if repair and i < len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(i)
+    if not indices:
+        return np.zeros(0, dtype=int), np.zeros(0)
+    return (np.concatenate(indices).astype(int),
+            np.concatenate(fs).astype(float))
+
+
+def uniform(f, qopt, quad, n, path, workers=None, chunk=None):
+    """
+    Maps the error ``f`` on the full ``n`` by ``n`` grid for the given
+    ``quad``, through the point ``qopt``, and streams the results to the
+    partial map at ``path``.
+
+    Points are evaluated in chunks of ``chunk`` points (default: four per
+    worker), using ``workers`` processes (or sequentially if ``workers=1``).
+    Each chunk is appended to ``path`` as soon as it is evaluated, and points
+    already stored in ``path`` (e.g. by an interrupted run) are skipped. Use
+    :meth:`finalise()` to convert the completed map to CSV.
+    """
+    n = int(n)
+    todo = np.ones(n * n, dtype=bool)
+    if os.path.exists(path):
+        todo[read_partial(path, n, repair=True)[0]] = False
+        print('Resuming with ' + str(n * n - np.sum(todo)) + ' out of '
+              + str(n * n) + ' points done')
+    todo = np.nonzero(todo)[0]
+
+    if workers == 1:
+        evaluator = pints.SequentialEvaluator(f)
+    else:
+        evaluator = pints.ParallelEvaluator(f, n_workers=workers)
+    if chunk is None:
+        chunk = 4 * (pints.ParallelEvaluator.cpu_count()
+                     if workers is None else workers)
+
+    imax = (len(todo) + chunk - 1) // chunk
+    for i in range(imax):
+        ks = todo[i * chunk:(i + 1) * chunk]
+        with np.errstate(all='ignore'):
+            fs = evaluator.evaluate(grid(qopt, quad, n, ks))
+        append_partial(path, n, ks, fs)
+        print(str(1 + i) + ' out of ' + str(imax) + ', quad ' + str(quad))
+
+
+def finalise(path, out_path, transformation, qopt, quad, remove=True,
+             levels=0):
+    """
+    Converts the completed partial map at ``path`` to a CSV file (as written
+    by :meth:`save_csv()`) or, if ``out_path`` ends in ``.npz``, to a binary
+    map with the given number of lower resolution ``levels`` (as written by
+    :meth:`save_map()`).
+
+    Raises a ``ValueError`` if any grid points are missing. If ``remove`` is
+    ``True``, the partial map is deleted after the map has been written.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(len(partial_header) + partial_size.size)
+    if header[:len(partial_header)] != partial_header:
+        raise ValueError('Not a partial surface map: ' + path)
+    n = partial_size.unpack_from(header, len(partial_header))[0]
+    indices, values = read_partial(path, n)
+
+    fs = np.zeros(n * n)
+    done = np.zeros(n * n, dtype=bool)
+    fs[indices] = values
+    done[indices] = True
+    if not np.all(done):
+        raise ValueError(
+            'Partial surface map ' + path + ' is missing '
+            + str(n * n - np.sum(done)) + ' points.')
+    if os.path.splitext(out_path)[1] == '.npz':
+        x, y = axes(quad, n)
+        save_map(out_path, quad, qopt, x, y, fs, levels=levels)
+    else:
+        save_csv(out_path, transformation, grid(qopt, quad, n), fs)
+    if remove:
+        os.remove(path)
+
+
+def adaptive(f, qopt, quad, n, budget=None, tolerance=0.5, near=1,
+             start=9, workers=None, path=None):
+    """
+    Maps the error ``f`` on an ``n`` by ``n`` grid for the given ``quad``,
+    through the point ``qopt``, but evaluates only part of the grid.
+
+    The grid is first evaluated on a coarse ``start`` by ``start`` subgrid,
+    after which cells are split into four (adding their edge midpoints and
+    centre) as long as either the logarithm of the error varies by more than
+    ``tolerance`` between its corners, or one of the corners has an error
+    within a fraction ``near`` of the lowest error found so far. Cells with a
+    finite and a non-finite corner are always split. Cells are split in
+    order of variation, in batches that are evaluated in parallel (with
+    ``workers`` processes, or sequentially if ``workers=1``), until no more
+    cells need splitting or a ``budget`` of evaluations is used up.
+
+    The remaining points are interpolated, using bilinear interpolation of
+    the logarithm of the error on the smallest cell that contains them (or
+    the nearest corner if the corners are not all finite and positive).
+
+    If a ``path`` is given, each batch of evaluated points is appended to the
+    partial map at this location (see :meth:`append_partial()`), and points
+    stored there by an earlier (interrupted) run are not evaluated again.
+
+    Returns a tuple ``(qs, fs, evaluated)``, where ``qs`` are the grid points
+    as returned by :meth:`grid()`, ``fs`` are the (evaluated or
+    interpolated) errors, and ``evaluated`` indicates which points were
+    evaluated.
+    """
+    n = int(n)
+    qs = grid(qopt, quad, n)
+    fs = np.zeros(n * n)
+    evaluated = np.zeros(n * n, dtype=bool)
+    budget = n * n if budget is None else int(budget)
+
+    # Reuse points from an interrupted run
+    used = 0
+    if path is not None and os.path.exists(path):
+        indices, values = read_partial(path, n, repair=True)
+        fs[indices] = values
+        evaluated[indices] = True
+        used = len(indices)
+        print('Resuming with ' + str(used) + ' points done')
+
+    if workers == 1:
+        evaluator = pints.SequentialEvaluator(f)
+    else:
+        evaluator = pints.ParallelEvaluator(f, n_workers=workers)
+
+    def evaluate(points):
+        """ Evaluates the grid points ``(i, j)`` that aren't done yet. """
+        ks = sorted(set(
+            [i * n + j for i, j in points if not evaluated[i * n + j]]))
+        if ks:
+            with np.errstate(all='ignore'):
+                fs[ks] = evaluator.evaluate(qs[ks])
+            evaluated[ks] = True
+            if path is not None:
+                append_partial(path, n, ks, fs[ks])
+        return len(ks)
+
+    def corners(cell):
+        i0, i1, j0, j1 = cell
+        return fs[[i0 * n + j0, i0 * n + j1, i1 * n + j0, i1 * n + j1]]
+
+    def priority(cell, best):
+        """ Returns the priority for splitting a cell, or None. """
+        i0, i1, j0, j1 = cell
+        if i1 - i0 < 2 and j1 - j0 < 2:
+            return None
+        c = corners(cell)
+        finite = np.isfinite(c) & (c > 0)
+        if not np.any(finite):
+            return None
+        if not np.all(finite):
+            return float('inf')
+        g = np.log(c)
+        variation = np.max(g) - np.min(g)
+        if variation > tolerance or np.min(c) <= best * (1 + near):
+            return variation
+        return None
+
+    def split(cell):
+        i0, i1, j0, j1 = cell
+        mi = (i0 + i1) // 2
+        mj = (j0 + j1) // 2
+        ii = [(i0, mi), (mi, i1)] if i1 - i0 > 1 else [(i0, i1)]
+        jj = [(j0, mj), (mj, j1)] if j1 - j0 > 1 else [(j0, j1)]
+        return [(a, b, c, d) for a, b in ii for c, d in jj]
+
+    # Evaluate coarse grid
+    nodes = np.unique(np.round(np.linspace(0, n - 1, start)).astype(int))
+    used += evaluate([(i, j) for i in nodes for j in nodes])
+    cells = [(a, b, c, d)
+             for a, b in zip(nodes[:-1], nodes[1:])
+             for c, d in zip(nodes[:-1], nodes[1:])]
+
+    # Refine, largest variation first
+    leaves = []
+    batch = 4 * (pints.ParallelEvaluator.cpu_count()
+                 if workers is None else workers)
+    while cells and used < budget:
+        ok = fs[evaluated & np.isfinite(fs)]
+        best = np.min(ok) if len(ok) else float('inf')
+        heap = []
+        for cell in cells:
+            p = priority(cell, best)
+            if p is None:
+                leaves.append(cell)
+            else:
+                heapq.heappush(heap, (-p, cell))
+        cells = []
+        points = []
+        while heap and len(points) < batch:
+            cell = heapq.heappop(heap)[1]
+            children = split(cell)
+            cells.extend(children)
+            for i0, i1, j0, j1 in children:
+                points.extend([(i0, j0), (i0, j1), (i1, j0), (i1, j1)])
+        used += evaluate(points)
+        cells.extend([cell for p, cell in heap])
+    leaves.extend(cells)
+
+    # Interpolate remaining points, filling the smallest cells last
+    leaves.sort(key=lambda c: (c[1] - c[0]) * (c[3] - c[2]), reverse=True)
+    for i0, i1, j0, j1 in leaves:
+        c = corners((i0, i1, j0, j1))
+        ii, jj = np.meshgrid(
+            np.arange(i0, i1 + 1), np.arange(j0, j1 + 1), indexing='ij')
+        ks = (ii * n + jj).ravel()
+        todo = ~evaluated[ks]
+        if not np.any(todo):
+            continue
+        u = ((ii - i0) / max(1, i1 - i0)).ravel()[todo]
+        v = ((jj - j0) / max(1, j1 - j0)).ravel()[todo]
+        if np.all(np.isfinite(c) & (c > 0)):
+            g = np.log(c)
+            fs[ks[todo]] = np.exp(
+                (1 - u) * (1 - v) * g[0] + (1 - u) * v * g[1]
+                + u * (1 - v) * g[2] + u * v * g[3])
+        else:
+            nearest = 2 * np.round(u).astype(int) + np.round(v).astype(int)
+            fs[ks[todo]] = c[nearest]
+
+    print('Evaluated ' + str(used) + ' out of ' + str(n * n) + ' points')
+    return qs, fs, evaluated
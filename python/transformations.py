@@ -10,28 +10,33 @@ class ATransformation(object):
     """
     Transforms from model to search space (and back), using log transforms on
     all "a" parameters.
+
+    Parameters can be given as a single vector, or as an array of shape
+    ``(n, n_parameters)``.
     """
 
     def transform(self, parameters):
         """
         Transform from model into search space.
         """
+        parameters = np.asarray(parameters)
         transformed_parameters = np.array(parameters, copy=True)
-        transformed_parameters[0] = np.log(parameters[0])
-        transformed_parameters[2] = np.log(parameters[2])
-        transformed_parameters[4] = np.log(parameters[4])
-        transformed_parameters[6] = np.log(parameters[6])
+        transformed_parameters[..., 0] = np.log(parameters[..., 0])
+        transformed_parameters[..., 2] = np.log(parameters[..., 2])
+        transformed_parameters[..., 4] = np.log(parameters[..., 4])
+        transformed_parameters[..., 6] = np.log(parameters[..., 6])
         return transformed_parameters
 
     def detransform(self, transformed_parameters):
         """
         Transform back from search space to model space.
         """
+        transformed_parameters = np.asarray(transformed_parameters)
         parameters = np.array(transformed_parameters, copy=True)
-        parameters[0] = np.exp(transformed_parameters[0])
-        parameters[2] = np.exp(transformed_parameters[2])
-        parameters[4] = np.exp(transformed_parameters[4])
-        parameters[6] = np.exp(transformed_parameters[6])
+        parameters[..., 0] = np.exp(transformed_parameters[..., 0])
+        parameters[..., 2] = np.exp(transformed_parameters[..., 2])
+        parameters[..., 4] = np.exp(transformed_parameters[..., 4])
+        parameters[..., 6] = np.exp(transformed_parameters[..., 6])
         return parameters
 
     def code(self):
@@ -47,24 +52,29 @@ class KineticTransformation(object):
     """
     Transforms from model to search space (and back), using log transforms on
     all kinetic parameters -- but not on the conductance.
+
+    Parameters can be given as a single vector, or as an array of shape
+    ``(n, n_parameters)``.
     """
 
     def transform(self, parameters):
         """
         Transform from model into search space.
         """
+        parameters = np.asarray(parameters)
         transformed_parameters = np.array(parameters, copy=True)
         for i in range(8):
-            transformed_parameters[i] = np.log(parameters[i])
+            transformed_parameters[..., i] = np.log(parameters[..., i])
         return transformed_parameters
 
     def detransform(self, transformed_parameters):
         """
         Transform back from search space to model space.
         """
+        transformed_parameters = np.asarray(transformed_parameters)
         parameters = np.array(transformed_parameters, copy=True)
         for i in range(8):
-            parameters[i] = np.exp(transformed_parameters[i])
+            parameters[..., i] = np.exp(transformed_parameters[..., i])
         return parameters
 
     def code(self):
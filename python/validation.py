@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+#
+# Cross-validation: scores the results of each method on each of the 5
+# criteria (error measures), for a set of cells.
+#
+# Methods are identified by a label: the method number, followed by ``b`` for
+# method 1b (or, for other methods, runs started from the method 1 result),
+# and optionally a dash and a transformation code, e.g. ``'1b'`` or
+# ``'2-nf'``. Single letter codes set both the search and the sample
+# transformation.
+#
+from __future__ import division, print_function
+
+import multiprocessing
+import os
+import re
+import tempfile
+import warnings
+
+import myokit
+import numpy as np
+
+import errors
+import names
+import results
+
+
+# Criteria, in the order used in the matrix
+criteria = ['E1', 'E2', 'E3', 'E4', 'EAP']
+
+# Default methods, and the method 1b variant
+default_methods = ['1', '2', '3', '4']
+variant_methods = ['1b', '2', '3', '4']
+
+# Maximum number of error measures kept in memory by each worker
+cache_size = 4
+
+# Error measures created in this process
+_errors = {}
+
+_label = re.compile(r'^([1-5])(b?)(?:-([a-z])([a-z]?))?$')
+
+
+def parse_method(label):
+    """
+    Parses a method ``label`` and returns a dict with the keyword arguments
+    to pass to e.g. :meth:`results.load_parameters()`.
+    """
+    m = _label.match(str(label))
+    if m is None:
+        raise ValueError('Unable to parse method label: ' + str(label))
+    method = int(m.group(1))
+    search = m.group(3) or 'a'
+    sample = m.group(4) or search
+    for code in (search, sample):
+        if code not in names.transformation_codes:
+            raise ValueError('Unknown transformation code: ' + code)
+    b = bool(m.group(2))
+    return {
+        'method': method,
+        'search_transformation': search,
+        'sample_transformation': sample,
+        'start_from_m1': b and method != 1,
+        'method_1b': b and method == 1,
+    }
+
+
+def method_label(method, search_transformation='a', sample_transformation='a',
+                 start_from_m1=False, method_1b=False):
+    """
+    Returns the label for a method and configuration, see
+    :meth:`parse_method()`.
+    """
+    label = str(int(method))
+    if start_from_m1 or method_1b:
+        label += 'b'
+    if search_transformation != 'a' or sample_transformation != 'a':
+        label += '-' + search_transformation + sample_transformation
+    return label
+
+
+class Matrix(object):
+    """
+    Scores for a set of ``cells``, ``methods`` (labels), and ``criteria``.
+
+    The scores are stored in an array ``scores`` of shape ``(len(cells),
+    len(methods), len(criteria))``, with ``NaN`` for missing entries. Any
+    problems encountered while scoring are listed in ``failures``.
+    """
+    def __init__(self, cells, methods, criteria, scores=None, failures=None):
+        self.cells = [int(x) for x in cells]
+        self.methods = [str(x) for x in methods]
+        self.criteria = [str(x) for x in criteria]
+        shape = (len(self.cells), len(self.methods), len(self.criteria))
+        if scores is None:
+            self.scores = np.nan * np.ones(shape)
+        else:
+            self.scores = np.array(scores, dtype=float).reshape(shape)
+        self.failures = list(failures) if failures else []
+
+    def get(self, cell, method, criterion):
+        """ Returns a single score (or ``NaN`` if not available). """
+        return self.scores[
+            self.cells.index(int(cell)),
+            self.methods.index(str(method)),
+            self.criteria.index(str(criterion))]
+
+    def merge(self, other):
+        """
+        Returns a new matrix with all cells, methods, and criteria in this and
+        the ``other`` matrix. Where both define a score, the one from
+        ``other`` is used. The failures are taken from ``other``.
+        """
+        cells = self.cells + [x for x in other.cells if x not in self.cells]
+        methods = self.methods + [
+            x for x in other.methods if x not in self.methods]
+        crits = self.criteria + [
+            x for x in other.criteria if x not in self.criteria]
+        merged = Matrix(cells, methods, crits, failures=other.failures)
+        for m in (self, other):
+            i = np.array([cells.index(x) for x in m.cells], dtype=int)
+            j = np.array([methods.index(x) for x in m.methods], dtype=int)
+            k = np.array([crits.index(x) for x in m.criteria], dtype=int)
+            ok = np.isfinite(m.scores)
+            block = merged.scores[np.ix_(i, j, k)]
+            block[ok] = m.scores[ok]
+            merged.scores[np.ix_(i, j, k)] = block
+        return merged
+
+    def relative(self):
+        """
+        Returns the scores divided by the best score for each cell and
+        criterion.
+        """
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return self.scores / np.nanmin(self.scores, axis=1, keepdims=True)
+
+    def save(self, path):
+        """
+        Stores this matrix in a NumPy ``.npz`` file at ``path``, replacing
+        any existing file atomically.
+        """
+        def write(temp):
+            with open(temp, 'wb') as f:
+                np.savez(
+                    f, cells=np.array(self.cells, dtype=int),
+                    methods=np.array(self.methods, dtype=str),
+                    criteria=np.array(self.criteria, dtype=str),
+                    scores=self.scores,
+                    failures=np.array(self.failures, dtype=str))
+        _replace(path, write)
+
+    def save_csv(self, path, cell):
+        """
+        Stores the scores for a single ``cell`` as a CSV file at ``path``,
+        replacing any existing file atomically.
+
+        The file contains a row per method, and columns ``rms1``,
+        ``rms1_rel``, ``rms2``, etc. for each criterion that has been scored.
+        """
+        i = self.cells.index(int(cell))
+        rel = self.relative()
+        d = myokit.DataLog()
+        for k, crit in enumerate(self.criteria):
+            if np.all(np.isnan(self.scores[i, :, k])):
+                continue
+            key = 'rms' + str(1 + criteria.index(crit))
+            d[key] = self.scores[i, :, k]
+            d[key + '_rel'] = rel[i, :, k]
+        _replace(path, d.save_csv)
+
+
+def load(path):
+    """ Loads a matrix stored with :meth:`Matrix.save()`. """
+    with np.load(path) as d:
+        return Matrix(
+            d['cells'], d['methods'], d['criteria'], d['scores'],
+            [str(x) for x in d['failures']])
+
+
+def load_csv(path, cell, methods):
+    """
+    Loads the scores for a single ``cell`` and list of ``methods`` from a CSV
+    file stored with :meth:`Matrix.save_csv()`, and returns a
+    :class:`Matrix`.
+    """
+    d = myokit.DataLog.load_csv(path)
+    crits = [c for i, c in enumerate(criteria) if 'rms' + str(1 + i) in d]
+    m = Matrix([cell], methods, crits)
+    for k, crit in enumerate(crits):
+        m.scores[0, :, k] = d['rms' + str(1 + criteria.index(crit))]
+    return m
+
+
+class Scores(object):
+    """
+    Scores for a list of parameter sets, e.g. all repeats of a set of fits, on
+    a list of ``criteria``.
+
+    Each parameter set is described by its ``cells``, ``methods`` (labels),
+    ``runs``, and ``errors`` (the error the fit ended on), all arrays of
+    length ``n``, and ``parameters``, an array of shape ``(n, 9)``. The scores
+    are stored in an array ``scores`` of shape ``(n, len(criteria))``, with
+    ``NaN`` for missing entries. Any problems encountered while scoring are
+    listed in ``failures``.
+    """
+    def __init__(self, criteria, cells, methods, runs, errors, parameters,
+                 scores=None, failures=None):
+        self.criteria = [str(x) for x in criteria]
+        self.cells = np.array(cells, dtype=int)
+        self.methods = np.array(methods, dtype=str)
+        self.runs = np.array(runs, dtype=int)
+        self.errors = np.array(errors, dtype=float)
+        self.parameters = np.array(parameters, dtype=float).reshape((-1, 9))
+        n = len(self.cells)
+        if scores is None:
+            self.scores = np.nan * np.ones((n, len(self.criteria)))
+        else:
+            self.scores = np.array(scores, dtype=float).reshape(
+                (n, len(self.criteria)))
+        self.failures = list(failures) if failures else []
+        if not (len(self.methods) == len(self.runs) == len(self.errors)
+                == len(self.parameters) == n):
+            raise ValueError('All arrays must have the same length.')
+
+    def __len__(self):
+        return len(self.cells)
+
+    def select(self, cell=None, method=None):
+        """
+        Returns a :class:`Scores` object with only the entries for the given
+        ``cell`` and/or ``method``.
+        """
+        i = np.ones(len(self), dtype=bool)
+        if cell is not None:
+            i &= self.cells == int(cell)
+        if method is not None:
+            i &= self.methods == str(method)
+        return Scores(
+            self.criteria, self.cells[i], self.methods[i], self.runs[i],
+            self.errors[i], self.parameters[i], self.scores[i],
+            self.failures)
+
+    def relative(self):
+        """
+        Returns the scores divided by the best score for the same cell and
+        criterion.
+        """
+        rel = np.nan * np.ones(self.scores.shape)
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for cell in np.unique(self.cells):
+                i = self.cells == cell
+                rel[i] = self.scores[i] / np.nanmin(self.scores[i], axis=0)
+        return rel
+
+    def save(self, path):
+        """
+        Stores these scores in a NumPy ``.npz`` file at ``path``, replacing
+        any existing file atomically.
+        """
+        def write(temp):
+            with open(temp, 'wb') as f:
+                np.savez(
+                    f, criteria=np.array(self.criteria, dtype=str),
+                    cells=self.cells, methods=self.methods, runs=self.runs,
+                    errors=self.errors, parameters=self.parameters,
+                    scores=self.scores,
+                    failures=np.array(self.failures, dtype=str))
+        _replace(path, write)
+
+
+def load_scores(path):
+    """ Loads scores stored with :meth:`Scores.save()`. """
+    with np.load(path) as d:
+        return Scores(
+            d['criteria'], d['cells'], d['methods'], d['runs'], d['errors'],
+            d['parameters'], d['scores'], [str(x) for x in d['failures']])
+
+
+def _replace(path, write):
+    """
+    Calls ``write`` with the path to a temporary file next to ``path``, and
+    then replaces ``path`` with the temporary file.
+    """
+    fd, temp = tempfile.mkstemp(
+        prefix='.' + os.path.basename(path) + '-',
+        dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        write(temp)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def error(criterion, cell):
+    """
+    Returns the error measure for the given ``criterion`` and ``cell``,
+    taking model parameters (no transformation).
+
+    Error measures are created once, and then reused for subsequent calls
+    from the same process. At most ``cache_size`` measures are kept.
+    """
+    key = (str(criterion), int(cell))
+    f = _errors.pop(key, None)
+    if f is None:
+        f = getattr(errors, key[0])(key[1])
+        while len(_errors) >= cache_size:
+            del _errors[next(iter(_errors))]
+    _errors[key] = f
+    return f
+
+
+def _evaluate(task):
+    """
+    Evaluates a task ``(criterion, cell, ps, tag)``, and returns a tuple
+    ``(criterion, cell, tag, fs, message)``, where ``message`` is ``None``
+    unless the task failed.
+    """
+    criterion, cell, ps, tag = task
+    try:
+        f = error(criterion, cell)
+        with np.errstate(all='ignore'):
+            fs = np.array([f(p) for p in ps], dtype=float)
+    except Exception as e:
+        return criterion, cell, tag, None, type(e).__name__ + ': ' + str(e)
+    return criterion, cell, tag, fs, None
+
+
+def parameters(cell, method):
+    """
+    Returns the best parameters (in model space) for the given ``cell`` and
+    ``method`` label, or ``None`` if not available.
+    """
+    try:
+        return results.load_parameters(cell, **parse_method(method))
+    except (IOError, OSError):
+        return None
+
+
+def run(tasks, workers=None):
+    """
+    Evaluates a list of tasks ``(criterion, cell, ps, tag)`` with ``workers``
+    processes (or in this process if ``workers=1``), and yields the results
+    (see :meth:`_evaluate()`) in the order they are completed. The ``tag``
+    can be anything, and is passed back with the results.
+
+    Tasks are handed out one at a time, starting with the slowest criteria,
+    and each worker reuses its error measures (see :meth:`error()`).
+    """
+    order = ['EAP', 'E4', 'E3', 'E2', 'E1']
+    tasks = sorted(tasks, key=lambda t: (
+        order.index(t[0]) if t[0] in order else -1, t[1]))
+    if workers is None:
+        workers = min(len(tasks), multiprocessing.cpu_count())
+    if workers <= 1:
+        for task in tasks:
+            yield _evaluate(task)
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(_evaluate, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def matrix(cell_list, method_list=None, criterion_list=None, workers=None):
+    """
+    Scores the best result of each method (a list of labels, see
+    :meth:`parse_method()`) for the given cells, on the given criteria, and
+    returns a :class:`Matrix`.
+
+    Each combination of criterion and cell is evaluated as a single task, so
+    that its error measure is created only once.
+    """
+    method_list = list(default_methods if method_list is None else method_list)
+    crit_list = list(criteria if criterion_list is None else criterion_list)
+    for crit in crit_list:
+        if crit not in criteria:
+            raise ValueError('Unknown criterion: ' + str(crit))
+    m = Matrix(cell_list, method_list, crit_list)
+
+    # Load parameters, and store the indices of the methods that have them
+    tasks, available = [], {}
+    for cell in m.cells:
+        ps, js = [], []
+        for j, method in enumerate(method_list):
+            p = parameters(cell, method)
+            if p is None:
+                m.failures.append(
+                    'No results for cell ' + str(cell) + ', method '
+                    + method + '.')
+            else:
+                ps.append(p)
+                js.append(j)
+        if ps:
+            for crit in crit_list:
+                tasks.append((crit, cell, np.array(ps), None))
+        available[cell] = js
+
+    # Evaluate
+    for crit, cell, tag, fs, message in run(tasks, workers):
+        k = crit_list.index(crit)
+        i = m.cells.index(cell)
+        if message is None:
+            m.scores[i, available[cell], k] = fs
+            print('Scored cell ' + str(cell) + ' on ' + crit)
+        else:
+            m.failures.append(
+                'Unable to score cell ' + str(cell) + ' on ' + crit + ': '
+                + message)
+            print(m.failures[-1])
+    return m
+
+
+def repeats(cell_list, method_list=None, criterion_list=None, within=None,
+            top=None, workers=None, chunk=32, reuse=True):
+    """
+    Scores all stored results for each method (a list of labels, see
+    :meth:`parse_method()`) for the given cells, on the given criteria, and
+    returns a :class:`Scores` object.
+
+    If ``within`` is set, only results with an error within a fraction
+    ``within`` of the best are used, and if ``top`` is set at most ``top``
+    results are used for each cell and method (see :meth:`results.query()`).
+
+    Parameter sets are evaluated in tasks of up to ``chunk`` points, and
+    parameter sets that occur more than once for the same cell are evaluated
+    only once. If ``reuse`` is ``True``, the stored errors of methods 2 to 5
+    are used as their scores on the criterion they were fitted with, instead
+    of evaluating them again.
+    """
+    method_list = list(default_methods if method_list is None else method_list)
+    crit_list = list(criteria if criterion_list is None else criterion_list)
+    for crit in crit_list:
+        if crit not in criteria:
+            raise ValueError('Unknown criterion: ' + str(crit))
+
+    # Load parameters
+    cs, ms, rs, es, ps, failures = [], [], [], [], [], []
+    for cell in cell_list:
+        for method in method_list:
+            kwargs = parse_method(method)
+            if kwargs['method'] == 1 and not kwargs['method_1b']:
+                p = parameters(cell, method)
+                rr, ee = [0], [float('nan')]
+                pp = [] if p is None else [p]
+            else:
+                rr, ee, pp = results.query(
+                    cell, columns=('run', 'error', 'parameters'), top=top,
+                    within=within, **kwargs)
+            if len(pp) == 0:
+                failures.append(
+                    'No results for cell ' + str(cell) + ', method '
+                    + method + '.')
+                continue
+            cs.extend([cell] * len(pp))
+            ms.extend([method] * len(pp))
+            rs.extend(rr)
+            es.extend(ee)
+            ps.extend(pp)
+    s = Scores(crit_list, cs, ms, rs, es, ps, failures=failures)
+
+    # Use stored errors, and find the points that need to be evaluated
+    tasks, todo = [], {}
+    own = np.array([parse_method(m)['method'] for m in s.methods], dtype=int)
+    for k, crit in enumerate(crit_list):
+        i = np.zeros(len(s), dtype=bool)
+        if reuse:
+            i = (own > 1) & (own == 1 + criteria.index(crit))
+            s.scores[i, k] = s.errors[i]
+        for cell in np.unique(s.cells):
+            rows = np.nonzero((s.cells == cell) & ~i)[0]
+            if len(rows) == 0:
+                continue
+            unique, inverse = np.unique(
+                s.parameters[rows], axis=0, return_inverse=True)
+            todo[(crit, cell)] = (rows, inverse.reshape(-1))
+            for lo in range(0, len(unique), chunk):
+                tasks.append((crit, cell, unique[lo:lo + chunk], lo))
+
+    # Evaluate
+    done = 0
+    for crit, cell, lo, fs, message in run(tasks, workers):
+        done += 1
+        if message is not None:
+            message = ('Unable to score cell ' + str(cell) + ' on ' + crit
+                       + ': ' + message)
+            if message not in s.failures:
+                s.failures.append(message)
+                print(message)
+            continue
+        rows, inverse = todo[(crit, cell)]
+        j = (inverse >= lo) & (inverse < lo + len(fs))
+        s.scores[rows[j], crit_list.index(crit)] = fs[inverse[j] - lo]
+        print('Completed ' + str(done) + ' out of ' + str(len(tasks))
+              + ' tasks')
+    return s
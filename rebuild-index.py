@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+#
+# Rebuild the results index from the result files.
+#
+#
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath('python'))
+import results
+
+
+print('Rebuilding ' + results.INDEX)
+results.rebuild_index()
+print('Done')
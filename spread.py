@@ -37,18 +37,15 @@ for cell in range(1, 11):
     for method in [2, 3, 4]:
         imethod = method - 1
 
-        # Get scores, parameters
-        rs, ps, es, ts, ns = results.load(cell, method)
-        if len(rs) == 0:
+        # Get parameters with scores within 1% of best
+        ps = results.query(cell, method, columns='parameters', within=0.01)
+        if len(ps) == 0:
             row.extend([0, 0, 0])
             continue
 
-        # Get scores within 1% of best
-        ies = es / es[0] - 1 < 0.01
-        es = es[ies]
-
-        # Get relative deviation of parameters within this subset
-        ps = ps[ies]
+        # Get relative deviation of parameters within this subset, relative to
+        # the best result. If several results share the best error, the one
+        # with the lowest run number is used.
         ps = np.abs(ps / ps[0] - 1)
 
         # Add max deviation for all e-close parameters
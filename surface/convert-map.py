@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+#
+# Convert a surface map from CSV to the binary format, or back.
+#
+from __future__ import division, print_function
+import os
+import sys
+import numpy as np
+
+# Load project modules
+sys.path.append(os.path.abspath(os.path.join('..', 'python')))
+import surfaces
+import transformations
+
+
+#
+# Check input arguments
+#
+base = os.path.splitext(os.path.basename(__file__))[0]
+args = sys.argv[1:]
+if len(args) != 1:
+    print('Syntax: ' + base + '.py <map.csv|map.npz>')
+    print()
+    print('Converts a map file to the other format, e.g.')
+    print('cell-5-surface-2-256-1.csv to cell-5-surface-2-256-1.npz.')
+    sys.exit(1)
+path = args[0]
+root, ext = os.path.splitext(path)
+if ext not in ('.csv', '.npz'):
+    print('Expecting a .csv or .npz file.')
+    sys.exit(1)
+
+# Quadrant is the final part of the file name
+quad = int(root.rsplit('-', 1)[1])
+a, b = surfaces.quadrant(quad)[:2]
+
+print('Loading ' + path)
+qs, fs = surfaces.load_points(path)
+n = int(round(np.sqrt(len(fs))))
+assert n * n == len(fs)
+
+if ext == '.csv':
+    fname = root + '.npz'
+    levels = max(0, int(np.log2(n / 16)))
+    surfaces.save_map(fname, quad, qs[0], qs[::n, a], qs[:n, b], fs,
+                      levels=levels)
+else:
+    fname = root + '.csv'
+    surfaces.save_csv(fname, transformations.ATransformation(), qs, fs)
+print('Stored as ' + fname)
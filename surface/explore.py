@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#
+# Explore the surface defined by an error measure in any number of dimensions,
+# using a Latin hypercube, a Sobol sequence, or random lines through the
+# optimum.
+#
+from __future__ import division, print_function
+import os
+import sys
+import pints
+
+# Load project modules
+sys.path.append(os.path.abspath(os.path.join('..', 'python')))
+import boundaries
+import cells
+import exploration
+import fitting
+import results
+import transformations
+
+
+#
+# Check input arguments
+#
+base = os.path.splitext(os.path.basename(__file__))[0]
+args = sys.argv[1:]
+if len(args) not in (4, 5, 6):
+    print('Syntax: ' + base + '.py <cell> <error> <design> <n>'
+          ' (parameters=all) (nc)')
+    print()
+    print('Designs: ' + ', '.join(exploration.designs))
+    print('Parameters are given as a list of (one-based) indices, e.g. 1,2,9.')
+    sys.exit(1)
+cell = int(args[0])
+method = int(args[1])
+design = args[2]
+if design not in exploration.designs:
+    print('Unknown design: ' + design)
+    sys.exit(1)
+n = int(args[3])
+assert n > 0
+if len(args) > 4 and args[4] != 'all':
+    indices = [int(x) - 1 for x in args[4].split(',')]
+    assert min(indices) >= 0 and max(indices) < 9
+    pname = 'p' + '-'.join([str(1 + i) for i in indices])
+else:
+    indices = list(range(9))
+    pname = 'all'
+if len(args) > 5:
+    nc = int(args[5])
+    assert(nc > 0)
+else:
+    nc = pints.ParallelEvaluator.cpu_count()
+filename = 'cell-' + str(cell) + '-explore-' + str(method) + '-' + design \
+    + '-' + pname + '-' + str(n) + '.npz'
+print('Selected cell ' + str(cell))
+print('Selected error ' + str(method))
+print('Selected design ' + design)
+print('Selected n ' + str(n))
+print('Varying parameters ' + ', '.join(['p' + str(1 + i) for i in indices]))
+print('Running with ' + str(nc) + ' worker processes')
+
+
+#
+# Define parameter transformation and boundaries
+#
+trans = transformations.ATransformation()
+bounds = boundaries.Boundaries(trans, trans, cells.lower_conductance(cell))
+
+
+#
+# Get best parameters, create error measure
+#
+popt = results.load_parameters(cell, method, trans.code())
+qopt = trans.transform(popt)                    # Search space
+f = fitting.error_measure(cell, method, trans)
+
+# Show value at optimum
+print(f(qopt))
+
+# Explore, using a fixed seed so that designs can be reproduced
+e = exploration.explore(
+    f, bounds, trans, qopt, indices, design, n, seed=1, workers=nc,
+    info={'cell': cell, 'method': method, 'transformation': trans.code()})
+print('Storing results to ' + filename)
+e.save(filename)
+
+print('Done')
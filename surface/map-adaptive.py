@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+#
+# Map (part of) the surface defined by an error measure, evaluating only the
+# parts of the grid where the error changes sharply or is near its minimum.
+#
+from __future__ import division, print_function
+import os
+import sys
+import pints
+import numpy as np
+
+# Load project modules
+sys.path.append(os.path.abspath(os.path.join('..', 'python')))
+import fitting
+import results
+import surfaces
+import transformations
+
+
+#
+# Check input arguments
+#
+base = os.path.splitext(os.path.basename(__file__))[0]
+args = sys.argv[1:]
+if len(args) not in (4, 5, 6):
+    print('Syntax: ' + base + '.py <cell> <error> <n> <quad> (budget) (nc)')
+    print()
+    print('The budget is the maximum number of evaluations per quadrant.')
+    print('Results are stored in the same format as map.py, including an')
+    print('array indicating which points were evaluated.')
+    sys.exit(1)
+cell = int(args[0])
+method = int(args[1])
+n = int(args[2])
+assert n > 0
+filename = 'cell-' + str(cell) + '-surface-' + str(method) + '-' + str(n)
+print('Selected cell ' + str(cell))
+print('Selected error ' + str(method))
+print('Selected n ' + str(n))
+if args[3] == 'all':
+    print('Selected all quadrants')
+    quads = [1, 2, 3, 4]
+else:
+    quads = [int(args[3])]
+    assert 0 < quads[0] < 5
+    print('Selected quadrant ' + str(quads[0]))
+budget = None
+if len(args) > 4:
+    budget = int(args[4])
+    assert budget > 0
+    print('Selected budget ' + str(budget))
+if len(args) > 5:
+    nc = int(args[5])
+    assert(nc > 0)
+else:
+    nc = pints.ParallelEvaluator.cpu_count()
+print('Running with ' + str(nc) + ' worker processes')
+
+# Store lower resolution versions, down to 16x16
+levels = max(0, int(np.log2(n / 16)))
+
+
+#
+# Define parameter transformation
+#
+trans = transformations.ATransformation()
+
+
+#
+# Get best parameters, create error measure
+#
+popt = results.load_parameters(cell, method, trans.code())
+qopt = trans.transform(popt)                    # Search space
+f = fitting.error_measure(cell, method, trans)
+
+# Show value at optimum
+print(f(qopt))
+
+for quad in quads:
+    fname = filename + '-' + str(quad) + '.npz'
+    found = surfaces.find_map(filename + '-' + str(quad))
+    if found:
+        print('Skipping quad ' + str(quad) + ', found ' + found)
+        continue
+
+    # Evaluate, streaming results to a partial map, so that an interrupted
+    # run can be resumed
+    partial = filename + '-' + str(quad) + '.part'
+    print('Mapping quadrant ' + str(quad))
+    qs, fs, evaluated = surfaces.adaptive(
+        f, qopt, quad, n, budget=budget, workers=nc, path=partial)
+    print('Storing results to ' + fname)
+    x, y = surfaces.axes(quad, n)
+    surfaces.save_map(fname, quad, qopt, x, y, fs, evaluated, levels)
+    os.remove(partial)
+
+print('Done')
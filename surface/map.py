@@ -7,7 +7,6 @@ import os
 import sys
 import pints
 import numpy as np
-import myokit
 
 # Load project modules
 sys.path.append(os.path.abspath(os.path.join('..', 'python')))
@@ -15,6 +14,7 @@ import boundaries
 import cells
 import errors
 import results
+import surfaces
 import transformations
 
 
@@ -48,6 +48,9 @@ else:
     nc = pints.ParallelEvaluator.cpu_count()
 print('Running with ' + str(nc) + ' worker processes')
 
+# Store lower resolution versions, down to 16x16
+levels = max(0, int(np.log2(n / 16)))
+
 
 #
 # Define parameter transformation
@@ -69,11 +72,6 @@ upper_alpha = 1e3
 lower_beta  = 1e-7
 upper_beta  = 0.4
 
-# Set boundaries in search space
-qalo = np.log(1e-7)
-qahi = np.log(1e3)
-qblo = 0
-
 # Define method
 if method == 1:
     f = errors.E1(cell, trans)
@@ -93,41 +91,21 @@ else:
 print(f(qopt))
 
 for quad in quads:
-    fname = filename + '-' + str(quad) + '.csv'
-    print('Storing results to ' + fname)
-
-    # Define grid in search space
-    qbhi = 0.4 if (quad == 1 or quad == 3) else 0.2
-    a = (quad - 1) * 2
-    b = a + 1
-    qs = []
-    for qa in np.linspace(qalo, qahi, n):
-        for qb in np.linspace(qblo, qbhi, n):
-            q = np.copy(qopt)
-            q[a] = qa
-            q[b] = qb
-            qs.append(q)
-    qs = np.array(qs)
-    ps = np.array([trans.detransform(q) for q in qs])
-
-    # Evaluate
-    e = pints.ParallelEvaluator(f, n_workers=nc)
-    z = nc * 4
-    imax = (len(qs) + z - 1) // z
-    fs = np.ones(len(qs)) * 100
+    fname = filename + '-' + str(quad) + '.npz'
+    found = surfaces.find_map(filename + '-' + str(quad))
+    if found:
+        print('Skipping quad ' + str(quad) + ', found ' + found)
+        continue
+
+    # Evaluate, streaming results to a partial map, so that an interrupted
+    # run can be resumed
+    partial = filename + '-' + str(quad) + '.part'
+    print('Storing partial results to ' + partial)
     print('Evaluating...')
-    for i in range(imax):
-        lo = i * z
-        hi = lo + z
-        fs[lo:hi] = e.evaluate(qs[lo:hi])
-        print(str(1 + i) + ' out of ' + str(imax) + ', quad ' + str(quad))
+    surfaces.uniform(f, qopt, quad, n, partial, workers=nc)
 
     # Store results
-    print('Storing results')
-    d = myokit.DataLog()
-    d['f'] = fs
-    for i in range(9):
-        d['p' + str(1 + i)] = ps[:, i]
-    d.save_csv(fname)
+    print('Storing results to ' + fname)
+    surfaces.finalise(partial, fname, trans, qopt, quad, levels=levels)
 
 print('Done')
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#
+# Score all repeats of each fit on any of the 5 criteria.
+#
+from __future__ import division, print_function
+import numpy as np
+import os
+import sys
+
+# Load project modules
+sys.path.append(os.path.abspath(os.path.join('..', 'python')))
+import validation
+
+
+#
+# Check input arguments
+#
+base = os.path.splitext(os.path.basename(__file__))[0]
+args = sys.argv[1:]
+if len(args) not in (3, 4, 5, 6):
+    print('Syntax: ' + base + '.py <cell|all> <criterium|all> <output>'
+          ' (variant|methods) (within|all) (workers)')
+    print()
+    print('Scores every stored result (or, if a fraction "within" is given,')
+    print('every result with an error within that fraction of the best) and')
+    print('stores the scores, parameters, and fit errors in <output>, a')
+    print('NumPy .npz file that can be loaded with validation.load_scores().')
+    print('Methods are given as in validate.py.')
+    sys.exit(1)
+
+if args[0] == 'all':
+    cell_list = range(1, 10)
+else:
+    cell_list = [int(x) for x in args[0].split(',')]
+
+if args[1] == 'all':
+    crit_list = range(1, 6)
+else:
+    crit_list = [int(x) for x in args[1].split(',')]
+crit_list = [validation.criteria[i - 1] for i in crit_list]
+
+path = args[2]
+
+method_list = validation.default_methods
+if len(args) > 3:
+    if args[3] == 'variant':
+        method_list = validation.variant_methods
+    elif args[3] != 'default':
+        method_list = args[3].split(',')
+        for method in method_list:
+            validation.parse_method(method)
+
+within = None
+if len(args) > 4 and args[4] != 'all':
+    within = float(args[4])
+
+workers = int(args[5]) if len(args) > 5 else None
+
+
+#
+# Run
+#
+s = validation.repeats(cell_list, method_list, crit_list, within=within,
+                       workers=workers)
+print('Saving scores to ' + path)
+s.save(path)
+
+# Show summary
+print()
+print('Cell | Method | Repeats | Median relative score per criterion')
+rel = s.relative()
+for cell in cell_list:
+    for method in method_list:
+        i = (s.cells == cell) & (s.methods == method)
+        if not np.any(i):
+            continue
+        print(' | '.join([
+            str(cell).rjust(4),
+            method.rjust(6),
+            str(np.sum(i)).rjust(7),
+            ' '.join(['{:.3g}'.format(x) for x in np.median(rel[i], axis=0)]),
+        ]))
+
+if s.failures:
+    print()
+    print('Problems found:')
+    for failure in s.failures:
+        print('  ' + failure)
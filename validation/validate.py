@@ -3,16 +3,12 @@
 # Compare fits using any of the 5 criteria.
 #
 from __future__ import division, print_function
-import myokit
-import numpy as np
 import os
 import sys
 
 # Load project modules
 sys.path.append(os.path.abspath(os.path.join('..', 'python')))
-import errors
-import results
-import sumstat
+import validation
 
 
 #
@@ -20,72 +16,86 @@ import sumstat
 #
 base = os.path.splitext(os.path.basename(__file__))[0]
 args = sys.argv[1:]
-if len(args) not in (2, 3):
-    print('Syntax: ' + base + '.py <cell|all> <criterium|all> <variant>')
+if len(args) not in (2, 3, 4):
+    print('Syntax: ' + base + '.py <cell|all> <criterium|all>'
+          ' (variant|methods) (workers)')
+    print()
+    print('Cells and criteria can be given as comma separated lists, e.g.')
+    print('1,2,3. Methods are given as a list of labels, e.g. 1b,2,3-nf,4')
+    print('(see validation.py). Results for all cells are stored (and')
+    print('updated) in a single matrix file, and in a CSV file per cell.')
     sys.exit(1)
 
 if args[0] == 'all':
     cell_list = range(1, 10)
 else:
-    cell_list = [int(args[0])]
+    cell_list = [int(x) for x in args[0].split(',')]
 
 if args[1] == 'all':
     crit_list = range(1, 6)
 else:
-    crit_list = [int(args[1])]
+    crit_list = [int(x) for x in args[1].split(',')]
+crit_list = [validation.criteria[i - 1] for i in crit_list]
+
+fname = 'rms-errors'
+suffix = ''
+method_list = validation.default_methods
+if len(args) > 2:
+    if args[2] == 'variant':
+        print('Running for method 1b variant')
+        method_list = validation.variant_methods
+        suffix = '-with-1b'
+    elif args[2] != 'default':
+        method_list = args[2].split(',')
+        for method in method_list:
+            validation.parse_method(method)
+        fname += '-' + '-'.join(method_list)
+
+workers = int(args[3]) if len(args) > 3 else None
 
-variant = False
-if len(args) == 3:
-    variant = args[2] == 'variant'
-if variant:
-    print('Running for method 1b variant')
 
 #
 # Run
 #
-criteria = [errors.E1, errors.E2, errors.E3, errors.E4, errors.EAP]
-for cell in cell_list:
-    print('Selected cell ' + str(cell))
-
-    # Load parameters
-    ps = [results.load_parameters(cell, i) for i in [1, 2, 3, 4]]
-
-    # Use method 1b instead of method 1
-    if variant:
-        ps[0] = results.load_parameters(cell, 1, method_1b=True)
+m = validation.matrix(cell_list, method_list, crit_list, workers)
 
-    for icrit in crit_list:
-        print('Validating on criterium ' + str(icrit))
-        crit = criteria[icrit - 1]
+# Show results
+for i, cell in enumerate(m.cells):
+    print('Cell ' + str(cell))
+    rel = m.relative()
+    for k, crit in enumerate(m.criteria):
+        print('  ' + crit + ' RMS errors:          ' + ' '.join(
+            ['{:.6g}'.format(x) for x in m.scores[i, :, k]]))
+        print('  ' + crit + ' relative RMS errors: ' + ' '.join(
+            ['{:.6g}'.format(x) for x in rel[i, :, k]]))
 
-        # Calculate errors
-        f = crit(cell)
-        fs = np.array([f(p) for p in ps])
-
-        print('RMS errors:')
-        print(fs[0])
-        print(fs[1])
-        print(fs[2])
-        print(fs[3])
-
-        rs = fs / np.min(fs)
-        print('Relative RMS errors:')
-        print(rs[0])
-        print(rs[1])
-        print(rs[2])
-        print(rs[3])
+# Merge with, and update, the stored matrix. Scores in the existing CSV files
+# are used as a starting point, so that criteria not scored in this run (or in
+# any run since the matrix was created) are not lost when the CSV files are
+# rewritten.
+path = fname + suffix + '.npz'
+old = None
+for cell in cell_list:
+    csv = fname + '-cell-' + str(cell) + suffix + '.csv'
+    if os.path.isfile(csv):
+        d = validation.load_csv(csv, cell, method_list)
+        old = d if old is None else old.merge(d)
+if os.path.isfile(path):
+    d = validation.load(path)
+    old = d if old is None else old.merge(d)
+if old is not None:
+    m = old.merge(m)
+print('Saving matrix to ' + path)
+m.save(path)
 
-        # Store rms errors
-        fname = 'rms-errors-cell-' + str(cell)
-        if variant:
-            fname += '-with-1b'
-        fname += '.csv'
-        if os.path.isfile(fname):
-            d = myokit.DataLog.load_csv(fname)
-        else:
-            d = myokit.DataLog()
-        d['rms' + str(icrit)] = fs
-        d['rms' + str(icrit) + '_rel'] = rs
-        print('Saving rms to ' + fname)
-        d.save_csv(fname)
+# Update CSV files
+for cell in cell_list:
+    csv = fname + '-cell-' + str(cell) + suffix + '.csv'
+    print('Saving rms to ' + csv)
+    m.save_csv(csv, cell)
 
+if m.failures:
+    print()
+    print('Problems found:')
+    for failure in m.failures:
+        print('  ' + failure)